@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.encoders import jsonable_encoder
 from app.data_layer.services.conversation_service import ConversationService
+import asyncio
 import logging
 from app.services.chat import Chat
+from app.core.reasoner.table_service import table_service
+from app.services.streaming import EventStream, sse_event, ws_event
 
 chat_router = APIRouter()
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +19,34 @@ async def respond_api(payload: dict = Body(...)):
     output , id = await Chat.process_chat_payload(payload)
     return {"conversation_id": id, "response": output}
 
+def chat_events(payload: dict):
+    """(event, data) pairs of a chat turn: reasoning steps, answer tokens and table when the knowledge search runs, then done"""
+    return EventStream().run(
+        lambda emit: Chat.process_chat_payload(payload, on_event=emit),
+        done=lambda result: {"conversation_id": result[1], "response": result[0]},
+    )
+
+@chat_router.post("/respond/stream")
+async def stream_respond_api(payload: dict = Body(...)):
+    """Server-sent events stream of /respond, the done event carrying the same body as /respond"""
+    async def events():
+        async for event, data in chat_events(payload):
+            yield sse_event(event, data)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@chat_router.websocket("/respond/ws")
+async def respond_socket(websocket: WebSocket):
+    """WebSocket variant of /respond/stream: send one chat payload per turn, receive its events"""
+    await websocket.accept()
+    try:
+        while True:
+            payload = await websocket.receive_json()
+            async for event, data in chat_events(payload):
+                await websocket.send_json(ws_event(event, data))
+    except WebSocketDisconnect:
+        logger.info("Chat websocket closed")
+
 @chat_router.get("/get/conversation")
 async def get_conversation_api(conversation_id: str):
     service = ConversationService()
@@ -24,6 +56,28 @@ async def get_conversation_api(conversation_id: str):
     else:
         return {"conversation": f"Conversation with id '{conversation_id}' not found"}
 
+@chat_router.get("/get/conversation/table")
+async def get_message_table_api(conversation_id: str, table_id: str):
+    """
+    The table of a knowledge search answer, composed on first request if not yet built
+
+    Tables are cached on their message, so once built they are served from the conversation.
+    """
+    service = ConversationService()
+    conversation = await asyncio.to_thread(service.get_conversation, conversation_id=conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail=f"Conversation with id '{conversation_id}' not found")
+    message = next((message for message in conversation.messages if getattr(message, "table_id", None) == table_id), None)
+    if message is None:
+        raise HTTPException(status_code=404, detail=f"Table '{table_id}' not found in conversation '{conversation_id}'")
+    if getattr(message, "table", None) is not None:
+        return {"table_id": table_id, "table": message.table}
+    try:
+        return {"table_id": table_id, "table": await asyncio.wrap_future(table_service.for_message(conversation_id, message))}
+    except Exception as e:
+        logger.error(f"Error composing table {table_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error composing table: {str(e)}")
+
 @chat_router.get("/get/conversation/all")
 async def get_all_conversations_api(user_id: str):
     conversations = Chat.process_get_all_conversations(user_id)
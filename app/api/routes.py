@@ -1,10 +1,15 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Body
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Body, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any
+import asyncio
 
 from app.data_layer.services import DocumentService , MemoryService
-from ..core.builder.index import Indexer
+from app.data_layer.services.conversation_service import ConversationService
+from app.services.ingestion import get_ingestion_queue
+from app.services.streaming import EventStream, sse_event, ws_event
 from ..core.reasoner.resoning_engine import ReasoningEngine
+from ..core.reasoner.table_service import table_service
 import logging
 from fastapi.encoders import jsonable_encoder
 
@@ -19,50 +24,68 @@ async def index_file(
     file: UploadFile = File(...)
 ):
     """
-    Index a file for a given project
+    Queue a file for indexing for a given user
     
     Args:
-        project_name: Name of the project (required)
+        user_name: Name of the user (required)
         file: The file to be indexed
+
+    Returns:
+        The id of the queued job; poll /index/jobs/{job_id} for progress
     """
     logger.info(f"Received indexing request for user: {user_name}, file: {file.filename}")
     
+    if not user_name.strip():
+        logger.warning("Empty user name provided")
+        raise HTTPException(
+            status_code=400,
+            detail="user_name is required"
+        )
+
+    if not file.filename:
+        logger.warning("Upload without a file name")
+        raise HTTPException(
+            status_code=400,
+            detail="The uploaded file must have a file name"
+        )
+
     try:
-        if not user_name.strip():
-            logger.warning("Empty user name provided")
-            raise HTTPException(
-                status_code=400,
-                detail="user_name is required"
-            )
-            
-        # Initialize indexer
-        logger.debug("Initializing indexer")
-        indexer = Indexer()
-        
-        # Index the file
-        logger.info(f"Starting indexing process for {file.filename}")
-        success = await indexer.index(file, user_name)
-        
-        if success:
-            logger.info(f"Successfully indexed file {file.filename} for user {user_name}")
-            return {
-                "status": "success",
-                "message": f"File {file.filename} indexed successfully for user {user_name}"
-            }
-        else:
-            logger.error(f"Failed to index file {file.filename}")
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to index file"
-            )
+        job = await get_ingestion_queue().enqueue(file, user_name)
+        logger.info(f"Queued indexing job {job.id} for file {file.filename}")
+        return {
+            "status": "queued",
+            "job_id": job.id,
+            "message": f"File {file.filename} queued for indexing for user {user_name}"
+        }
             
     except Exception as e:
-        logger.error(f"Error indexing file {file.filename}: {str(e)}", exc_info=True)
+        logger.error(f"Error queueing file {file.filename}: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
-            detail=f"Error indexing file: {str(e)}"
+            detail=f"Error queueing file: {str(e)}"
         )
 
+@router.get("/index/jobs/{job_id}")
+async def get_index_job(job_id: str):
+    job = await get_ingestion_queue().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Index job '{job_id}' not found")
+    return jsonable_encoder(job)
+
+@router.get("/index/jobs/{job_id}/events")
+async def stream_index_job(job_id: str):
+    """Server-sent events stream of an index job's stage changes, pushed as they happen and closed once the job finishes"""
+    queue = get_ingestion_queue()
+    if await queue.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Index job '{job_id}' not found")
+
+    async def job_events():
+        async for event, data in EventStream().run(lambda emit: queue.watch(job_id, emit)):
+            if event != "done":
+                yield sse_event(event, data)
+
+    return StreamingResponse(job_events(), media_type="text/event-stream")
+
 @router.get("/documents/all")
 async def get_all_documents(user_id: str):
     try:
@@ -107,9 +130,61 @@ async def retrieve_file(
         
         # Add your processing logic here
         reasoning = ReasoningEngine(username=username, query=query)
-        response = reasoning.start_reasoning()
+        response = await reasoning.astart_reasoning()
         
         return jsonable_encoder(response)
     except Exception as e:
         logger.error(f"Error processing reasoning api request: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+@router.get("/tables/{table_id}")
+async def get_table(table_id: str):
+    """
+    The table of a reasoning answer, by the table_id returned with it, composed on first request if not yet built
+
+    Handles no longer held in memory, e.g. after a restart, are looked up on the stored
+    chat messages; answers that were never stored in a conversation cannot be recovered.
+    """
+    try:
+        if table_service.has(table_id):
+            return {"table_id": table_id, "table": await table_service.get(table_id)}
+        stored = await asyncio.to_thread(ConversationService().find_table_message, table_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail=f"Table '{table_id}' not found")
+        conversation_id, message = stored
+        if getattr(message, "table", None) is not None:
+            return {"table_id": table_id, "table": message.table}
+        return {"table_id": table_id, "table": await asyncio.wrap_future(table_service.for_message(conversation_id, message))}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error composing table {table_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error composing table: {str(e)}")
+
+def reasoning_events(request: ChatRequest):
+    """(event, data) pairs of a reasoning run: steps, answer tokens, the table, then the full output"""
+    reasoning = ReasoningEngine(username=request.username, query=request.query)
+    return EventStream().run(lambda emit: reasoning.astart_reasoning(on_event=emit))
+
+@router.post("/reason/stream")
+async def stream_reasoning(request: ChatRequest = Body(...)):
+    """Server-sent events stream of /reason: step, token and table events, then done with the full output"""
+    logger.info("Received streaming chat request")
+
+    async def events():
+        async for event, data in reasoning_events(request):
+            yield sse_event(event, data)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@router.websocket("/reason/ws")
+async def reasoning_socket(websocket: WebSocket):
+    """WebSocket variant of /reason/stream: send one ChatRequest per query, receive its events"""
+    await websocket.accept()
+    try:
+        while True:
+            request = ChatRequest(**await websocket.receive_json())
+            async for event, data in reasoning_events(request):
+                await websocket.send_json(ws_event(event, data))
+    except WebSocketDisconnect:
+        logger.info("Reasoning websocket closed")
\ No newline at end of file
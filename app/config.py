@@ -22,7 +22,65 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./cortex.db"  # Default SQLite, change as needed
-    
+
+    # Ingestion job queue
+    INGESTION_DB_PATH: str = "ingestion_jobs.sqlite"
+    INGESTION_WORKERS: int = 2
+    INGESTION_MAX_JOBS_PER_USER: int = 1
+    INGESTION_POLL_INTERVAL_SECONDS: float = 1.0
+    INGESTION_HEARTBEAT_SECONDS: float = 15.0
+    INGESTION_STALE_AFTER_SECONDS: float = 60.0  # running jobs without a heartbeat this long are requeued
+    ENRICHMENT_MODE: str = "combined"  # "combined" or "separate" summary/questions calls
+
+    # Gemini quota shared by all LLM calls of a model
+    GEMINI_REQUESTS_PER_MINUTE: int = 150
+    GEMINI_TOKENS_PER_MINUTE: int = 1000000
+    LLM_MAX_CONCURRENCY: int = 16
+
+    # Retrieval fan-out of the reasoning engine
+    RETRIEVAL_MAX_CONCURRENCY: int = 8
+    RETRIEVAL_TIMEOUT_SECONDS: float = 30.0
+    RETRIEVAL_WORKERS: int = 16  # process-wide threads for retrieval calls, shared by all requests
+    # Subqueries at least this similar are retrieved and composed once, 1.0 or more disables it
+    SUBQUERY_COLLAPSE_THRESHOLD: float = 0.92
+    QUERY_DECOMPOSITION_MODE: str = "combined"  # "combined" or "separate" graph keyword calls
+    TABLE_COMPOSITION: str = "background"  # "background", "on_demand" or "eager" (inline, before returning)
+    TABLE_CACHE_MAX_ENTRIES: int = 1024
+    TABLE_WORKERS: int = 4
+    TABLE_RESULT_TIMEOUT_SECONDS: float = 60.0  # how long a tool waits for a table still being composed
+
+    # Root of every on-disk index, cache and manifest
+    STORAGE_DIRECTORY: str = "/Users/dipak/CortexProjects/storage"
+    # In-process cache of indexes loaded from disk
+    INDEX_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    KG_GRAPH_STORE: str = "sqlite"  # "sqlite" or "simple" (whole graph persisted as JSON)
+    KG_EMBEDDING_DTYPE: str = "float32"  # "float32" or "int8" memory-mapped KG node embeddings
+    KG_RETRIEVAL_MODE: str = "fast"  # "fast" (local entity linking) or "llm" (LLM synonym expansion)
+    KG_TRAVERSAL_DEPTH: int = 2
+    HYBRID_RETRIEVAL: bool = True  # fuse BM25 keyword results into vector results
+
+    # Vector store backend of the multi-vector retriever
+    VECTOR_STORE_BACKEND: str = "pinecone"  # "pinecone" or "local"
+    LOCAL_VECTOR_NPROBE: int = 8
+    PINECONE_INDEX_TTL_SECONDS: float = 300.0
+    PINECONE_READY_TIMEOUT_SECONDS: float = 120.0
+    RETRIEVER_POOL_MAX_ENTRIES: int = 64
+    RETRIEVER_POOL_IDLE_TTL_SECONDS: float = 900.0
+
+    # Embedding cache shared by every embedding call site
+    EMBEDDING_CACHE_PATH: str = "embedding_cache.sqlite"
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 50000
+
+    # Parsing
+    UPLOAD_MAX_IN_MEMORY_BYTES: int = 1024 * 1024
+    PARSE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    LLAMAPARSE_BASE_URL: str = "https://api.cloud.llamaindex.ai/api/parsing"
+    PARSER_MAX_CONNECTIONS: int = 20
+    PARSER_UPLOAD_CONCURRENCY: int = 4
+    PARSER_POLL_INITIAL_SECONDS: float = 0.25
+    PARSER_POLL_MAX_SECONDS: float = 5.0
+    PARSER_POLL_TIMEOUT_SECONDS: float = 900.0
+
     class Config:
         case_sensitive = True
         env_file = ".env"
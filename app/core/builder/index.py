@@ -1,47 +1,161 @@
+import asyncio
+import inspect
+from langchain_core.documents import Document as LangchainDocument
 from app.data_layer.models.document import Document
 from app.data_layer.services.document_service import DocumentService
+from app.core.builder.preprocessors.document_prepro import generate_document_features
+from app.core.builder.preprocessors.section_diff import SectionDiff
+from app.storage.section_manifest import SectionManifest
+from app.initialization import gemini_flash_model_langchain
 from .parser import Parser
-from .indexer import KnowledgeGraphIndexer, VectorStoreIndexer
+from .indexer import KnowledgeGraphIndexer, SparseIndexer, VectorStoreIndexer
 from app.logging_config import indexing_logger as logger
 
 class Indexer:
+    """
+    Runs ingestion as a small stage graph:
+
+        parse -> section diff -> (knowledge graph extraction || multi-vector enrichment) -> BM25 -> document features -> upsert
+
+    The two enrichment branches are synchronous and LLM bound, so they run in worker
+    threads concurrently and the event loop stays free to serve other requests.
+    """
+
     def __init__(self):
         logger.info("Initializing Indexer")
         self.knowledge_graph_indexer = KnowledgeGraphIndexer()
         self.vector_store_indexer = VectorStoreIndexer()
+        self.sparse_indexer = SparseIndexer()
         # self.analytical_indexer = AnalyticalIndexer()
 
-    async def index(self, file, index_name):
+    async def parse(self, file):
+        logger.info(f"Attempting to parse file using Parser.load_documents")
+        parsed_results = await Parser.load_data(file)
+
+        if "parsed_content" not in parsed_results:
+            logger.error(f"Error parsing file: {parsed_results['error']}")
+            return None
+
+        logger.info(f"Successfully parsed documents from file: {file.filename}")
+        return parsed_results.get("parsed_content")
+
+    async def enrich(self, file_name, index_name, documents):
+        """
+        Enrich only the sections that changed since the file was last indexed.
+
+        Sections are diffed by content hash against the file's section manifest; new
+        sections go through both branches, removed ones are retracted from the graph,
+        vector store and docstore, and unchanged ones are left as they are.
+        """
+        manifest = SectionManifest.load(index_name, file_name)
+        diff = SectionDiff.from_documents(documents, manifest)
+        logger.info(
+            f"File {file_name}: {len(diff.added)} new or changed sections, {len(diff.removed)} removed, "
+            f"{len(diff.sections) - len(diff.added)} unchanged"
+        )
+        if not diff.has_changes():
+            return True, True, diff
+
+        added_documents = diff.added_documents()
+        added_doc_ids = diff.added_doc_ids()
+        logger.info(f"Indexing documents in knowledge graph and vector store with file: {file_name}, index: {index_name}")
+        # Removed sections are retracted only once both branches succeeded, and a branch that
+        # succeeded alone is rolled back, so a retry starts from the previous state.
+        kg_status, (vector_status, summary_docs, vector_ids) = await asyncio.gather(
+            asyncio.to_thread(self.knowledge_graph_indexer.index, index_name, added_documents, added_doc_ids)
+            if diff.added else self._nothing_to_extract(),
+            asyncio.to_thread(self.vector_store_indexer.index, file_name, index_name, added_documents, added_doc_ids)
+            if diff.added else self._nothing_to_embed(),
+        )
+
+        if kg_status and vector_status:
+            if diff.removed:
+                await asyncio.to_thread(self.knowledge_graph_indexer.retract, index_name, diff.removed_doc_ids())
+                await asyncio.to_thread(
+                    self.vector_store_indexer.retract, index_name, diff.removed_doc_ids(), diff.removed_vector_ids()
+                )
+            # The keyword index is a secondary retrieval leg, so its failure does not fail the upload.
+            sparse_index = await asyncio.to_thread(
+                self.sparse_indexer.index, index_name, added_documents, added_doc_ids, diff.removed_doc_ids()
+            )
+            if sparse_index is False:
+                logger.error(f"Sparse indexing failed for file {file_name}, keyword retrieval will miss it")
+            diff.record_enrichment(vector_ids, summary_docs)
+            SectionManifest.save(index_name, file_name, diff.manifest_sections())
+        elif vector_status and diff.added:
+            # Undo the upserts so the next attempt does not index the sections twice.
+            await asyncio.to_thread(
+                self.vector_store_indexer.retract,
+                index_name,
+                added_doc_ids,
+                [vector_id for ids in vector_ids.values() for vector_id in ids],
+            )
+        elif kg_status and diff.added:
+            # Same for the graph: drop what was extracted from the new sections.
+            await asyncio.to_thread(self.knowledge_graph_indexer.retract, index_name, added_doc_ids)
+        return kg_status, vector_status, diff
+
+    @staticmethod
+    async def _nothing_to_embed():
+        return True, [], {}
+
+    @staticmethod
+    async def _nothing_to_extract():
+        return True
+
+    async def store_document(self, file_name, index_name, diff):
+        if not diff.has_changes():
+            logger.info(f"File {file_name} is unchanged, keeping the stored document features")
+            return None
+
+        summary_docs = [LangchainDocument(page_content=entry["summary"]) for entry in diff.sections if entry["summary"]]
+        document_features = await asyncio.to_thread(
+            generate_document_features, summary_docs, gemini_flash_model_langchain
+        )
+        document = Document(
+            user_id=index_name,
+            name=file_name,
+            type=document_features.document_type,
+            summary=document_features.summary,
+            highlights=document_features.highlights
+        )
+
+        service = DocumentService()
+        await asyncio.to_thread(service.upsert_document, document)
+        return document
+
+    async def index(self, file, index_name, on_stage=None):
+        """
+        Index an uploaded file into the user's knowledge graph and vector store
+
+        Args:
+            file: The uploaded file
+            index_name: Name of the user's index
+            on_stage: Optional callback invoked with the name of each stage as it starts,
+                awaited when it returns an awaitable
+        """
         logger.info(f"Starting indexing process for file with index name: {index_name}")
+
+        async def report_stage(stage):
+            if on_stage is not None:
+                result = on_stage(stage)
+                if inspect.isawaitable(result):
+                    await result
+
         try:
-            logger.info(f"Attempting to parse file using Parser.load_documents")
-            file_name = file.filename    
-            parsed_results = await Parser.load_data(file)
-            
-            if "parsed_content" not in parsed_results:
-                logger.error(f"Error parsing file: {parsed_results['error']}")
+            file_name = file.filename
+            await report_stage("parsing")
+            documents = await self.parse(file)
+            if documents is None:
                 return False
-            
-            documents = parsed_results.get("parsed_content")
-            logger.info(f"Successfully parsed documents from file: {file_name}")
-
-            logger.info(f"Indexing documents in knowledge graph with index: {index_name}")
-            kg_status = self.knowledge_graph_indexer.index(index_name, documents)
-
-            logger.info(f"Indexing documents in vector store with file: {file_name}, index: {index_name}")
-            vector_status , document_features = self.vector_store_indexer.index(file_name, index_name, documents)
-            
-            document = Document(
-                user_id=index_name,
-                name=file_name,
-                type=document_features.document_type,
-                summary=document_features.summary,
-                highlights=document_features.highlights
-            )
-            
-            service = DocumentService()
-            service.insert_document(document)
-            
+
+            await report_stage("enriching")
+            kg_status, vector_status, diff = await self.enrich(file_name, index_name, documents)
+
+            if kg_status and vector_status:
+                await report_stage("storing")
+                await self.store_document(file_name, index_name, diff)
+
             if kg_status and vector_status:
                 logger.info(f"Successfully indexed file {file_name}")
                 return True
@@ -6,8 +6,16 @@ from llama_index.core.indices.property_graph import (
 from llama_index.core import PropertyGraphIndex
 from llama_index.core.node_parser import SimpleNodeParser
 from ..preprocessors import BasicPreprocessor
+from app.config import get_settings
+from app.core.common.rate_limiter import get_rate_limiter, estimate_tokens
 import logging
+import os
+from contextlib import nullcontext, suppress
+import threading
 from app.storage import DiskStore
+from app.storage.disk_store import indexing_directory
+from app.storage.sqlite_graph_store import GRAPH_DB_FILE, SQLitePropertyGraphStore
+from app.storage.graph_lexicon import GraphLexicon
 from ...interface.base_indexer import BaseIndexer
 import nest_asyncio
 nest_asyncio.apply()
@@ -18,37 +26,121 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 index_source = "knowledge_graph"
+
+# Read-only graph stores shared by retrievers, one SQLite connection per index
+_graph_stores = {}
+_graph_stores_lock = threading.Lock()
+
+class RateLimitedPathExtractor(SimpleLLMPathExtractor):
+    """
+    SimpleLLMPathExtractor whose LLM calls go through the shared rate limiter of the model.
+    num_workers only bounds the scheduled tasks; the limiter decides how many run at once.
+    """
+
+    async def _aextract(self, node):
+        limiter = get_rate_limiter(getattr(self.llm, "model", "default"))
+        text = node.get_content(metadata_mode="llm")
+        return await limiter.call(super()._aextract, node, estimated_tokens=estimate_tokens(text))
+
 class KnowledgeGraphIndexer(BaseIndexer):
         
     def __init__(self):
         pass
 
-    def index(self, index_name, documents):
+    def index(self, index_name, documents, doc_ids=None, removed_doc_ids=None):
+        """
+        Extract the documents into the user's property graph
+
+        Args:
+            index_name: Name of the user's index
+            documents: Parsed markdown, sections separated by the section separator
+            doc_ids: Optional id per section, used as the ref_doc_id of its graph nodes
+            removed_doc_ids: Ids of previously indexed sections whose nodes should be retracted
+        """
         logger.info(f"Starting KG indexing for index_name: {index_name}")
+        index = None
         try:
             logger.debug("Retrieving index from storage")
-            index = self.get_index_from_storage(index_name)
+            # The index is mutated below, so load a private copy rather than the shared cached one.
+            index = self.get_index_from_storage(index_name, cached=False)
             logger.debug("Splitting documents by separator")
-            sub_docs = BasicPreprocessor.split_docs_by_separator(documents)
+            sub_docs = BasicPreprocessor.split_docs_by_separator(documents) if documents else []
+            if doc_ids is not None:
+                for sub_doc, doc_id in zip(sub_docs, doc_ids):
+                    sub_doc.id_ = doc_id
             logger.info(f"Number of sub-documents created: {len(sub_docs)}")
-            
-            if index:
-                logger.info(f"Index found for '{index_name}'. Inserting sub-documents.")
-                self.update_property_graph_index(index.property_graph_store, sub_docs, gemini_pro_model)
-                
-            else:
-                logger.info(f"No existing index found for '{index_name}'. Creating new property graph index.")
-                # index = await self.create_property_graph_index(sub_docs, gemini_pro_model)
-                index = self.create_property_graph_index(sub_docs, gemini_pro_model)
-                logger.info("New property graph index created successfully.")
-
-            logger.info("Persisting index to disk storage")
-            DiskStore.persist_index(index, index_source, index_name)
-            logger.info(f"Index '{index_name}' persisted successfully.")
+
+            if not sub_docs and not (index and removed_doc_ids):
+                return True
+
+            store = index.property_graph_store if index else None
+            with self.ingestion_transaction(store):
+                if sub_docs and index:
+                    logger.info(f"Index found for '{index_name}'. Inserting sub-documents.")
+                    self.update_property_graph_index(store, sub_docs, gemini_pro_model)
+                elif sub_docs:
+                    logger.info(f"No existing index found for '{index_name}'. Creating new property graph index.")
+                    # index = await self.create_property_graph_index(sub_docs, gemini_pro_model)
+                    index = self.create_property_graph_index(index_name, sub_docs, gemini_pro_model)
+                    logger.info("New property graph index created successfully.")
+
+                if removed_doc_ids:
+                    logger.info(f"Retracting {len(removed_doc_ids)} removed sections from '{index_name}'")
+                    for doc_id in removed_doc_ids:
+                        index.property_graph_store.delete(properties={"ref_doc_id": doc_id})
+
+            self.persist_index(index, index_name)
             return True
         except Exception as e:
             logger.error(f"Error in indexing for '{index_name}': {e}", exc_info=True)
             return False
+        finally:
+            # The private SQLite connection opened for this ingestion; retrievers keep their own.
+            store = getattr(index, "property_graph_store", None) if index else None
+            if isinstance(store, SQLitePropertyGraphStore):
+                store.close()
+
+    def retract(self, index_name, doc_ids):
+        """Remove the graph nodes and relations extracted from the given sections"""
+        if not doc_ids:
+            return
+        index = self.get_index_from_storage(index_name, cached=False)
+        if not index:
+            return
+        store = index.property_graph_store
+        try:
+            logger.info(f"Retracting {len(doc_ids)} sections from '{index_name}'")
+            with self.ingestion_transaction(store):
+                for doc_id in doc_ids:
+                    store.delete(properties={"ref_doc_id": doc_id})
+            self.persist_index(index, index_name)
+        finally:
+            if isinstance(store, SQLitePropertyGraphStore):
+                store.close()
+
+    @staticmethod
+    def uses_sqlite_store():
+        return get_settings().KG_GRAPH_STORE == "sqlite"
+
+    @staticmethod
+    def ingestion_transaction(store):
+        """One SQLite transaction for all the writes of an ingestion; a no-op for the JSON store."""
+        if isinstance(store, SQLitePropertyGraphStore):
+            return store.transaction()
+        return nullcontext()
+
+    def persist_index(self, index, index_name):
+        if isinstance(index.property_graph_store, SQLitePropertyGraphStore):
+            # Rows are committed as they are written; only the entity lexicon is derived here.
+            store = index.property_graph_store
+            logger.info(f"Graph store of '{index_name}' committed: {store.stats()}")
+            lexicon = GraphLexicon.build_from_store(store)
+            lexicon.save(os.path.dirname(store.db_path))
+            logger.info(f"Entity lexicon of '{index_name}' rebuilt: {lexicon.stats()}")
+            return
+        logger.info("Persisting index to disk storage")
+        DiskStore.persist_index(index, index_source, index_name)
+        logger.info(f"Index '{index_name}' persisted successfully.")
 
     def insert_into_index(self, index, sub_docs):
         node_parser = SimpleNodeParser()
@@ -63,9 +155,9 @@ class KnowledgeGraphIndexer(BaseIndexer):
                 sub_docs,
                 kg_extractors=[
                     ImplicitPathExtractor(),
-                    SimpleLLMPathExtractor(
+                    RateLimitedPathExtractor(
                         llm=llm,
-                        num_workers=4,
+                        num_workers=get_settings().LLM_MAX_CONCURRENCY,
                         max_paths_per_chunk=10,
                     ),
                 ],
@@ -79,16 +171,20 @@ class KnowledgeGraphIndexer(BaseIndexer):
             logger.error(f"Error creating property graph index: {e}", exc_info=True)
             raise
     
-    def create_property_graph_index(self, sub_docs, llm):
+    def create_property_graph_index(self, index_name, sub_docs, llm):
         logger.debug("Creating property graph index from documents")
+        if self.uses_sqlite_store():
+            store = self.open_graph_store(index_name)
+            with store.transaction():
+                return self.update_property_graph_index(store, sub_docs, llm)
         try:
             index = PropertyGraphIndex.from_documents(
                 sub_docs,
                 kg_extractors=[
                     ImplicitPathExtractor(),
-                    SimpleLLMPathExtractor(
+                    RateLimitedPathExtractor(
                         llm=llm,
-                        num_workers=4,
+                        num_workers=get_settings().LLM_MAX_CONCURRENCY,
                         max_paths_per_chunk=10,
                     ),
                 ],
@@ -101,10 +197,73 @@ class KnowledgeGraphIndexer(BaseIndexer):
             logger.error(f"Error creating property graph index: {e}", exc_info=True)
             raise
 
-    def get_index_from_storage(self, index_name):    
+    def open_graph_store(self, index_name):
+        """A new connection to the index's SQLite graph, importing a JSON-persisted graph on first open."""
+        persist_dir = f"{indexing_directory}/{index_source}/{index_name}"
+        quantize_embeddings = get_settings().KG_EMBEDDING_DTYPE == "int8"
+        if not os.path.exists(f"{persist_dir}/{GRAPH_DB_FILE}") and os.path.exists(f"{persist_dir}/docstore.json"):
+            self.migrate_into_sqlite(index_name, persist_dir, quantize_embeddings)
+        return SQLitePropertyGraphStore.from_persist_dir(persist_dir, quantize_embeddings=quantize_embeddings)
+
+    def migrate_into_sqlite(self, index_name, persist_dir, quantize_embeddings):
+        """
+        Import the JSON graph into a temporary database and move it into place once complete,
+        so a failed or interrupted import is retried on the next open instead of leaving an
+        empty graph.sqlite behind.
+        """
+        db_path = f"{persist_dir}/{GRAPH_DB_FILE}"
+        temp_path = f"{db_path}.migrating"
+        for path in (temp_path, f"{temp_path}-wal", f"{temp_path}-shm"):
+            with suppress(FileNotFoundError):
+                os.remove(path)
+        store = SQLitePropertyGraphStore(temp_path, quantize_embeddings=quantize_embeddings)
+        try:
+            self.migrate_json_graph(index_name, store)
+            # Drop any matrix rows left by an earlier failed attempt
+            store.rebuild_embedding_matrix()
+        finally:
+            # Closing the last connection checkpoints the WAL into the database file
+            store.close()
+        os.replace(temp_path, db_path)
+        for path in (f"{temp_path}-wal", f"{temp_path}-shm"):
+            with suppress(FileNotFoundError):
+                os.remove(path)
+
+    def migrate_json_graph(self, index_name, store):
+        logger.info(f"Importing JSON-persisted graph of '{index_name}' into SQLite")
+        legacy_index = DiskStore.load_index(index_source, index_name, cached=False)
+        if not legacy_index:
+            return
+        graph = legacy_index.property_graph_store.graph
+        vector_store = getattr(legacy_index, "vector_store", None)
+        embeddings = getattr(getattr(vector_store, "data", None), "embedding_dict", {})
+        store.import_graph(graph.get_all_nodes(), graph.get_triplets(), embeddings)
+        logger.info(f"Imported graph of '{index_name}': {store.stats()}")
+
+    def get_sqlite_index(self, index_name, cached=True):
+        persist_dir = f"{indexing_directory}/{index_source}/{index_name}"
+        if not os.path.exists(f"{persist_dir}/{GRAPH_DB_FILE}") and not os.path.exists(f"{persist_dir}/docstore.json"):
+            return None
+        if cached:
+            with _graph_stores_lock:
+                if index_name not in _graph_stores:
+                    _graph_stores[index_name] = self.open_graph_store(index_name)
+                store = _graph_stores[index_name]
+        else:
+            store = self.open_graph_store(index_name)
+        return PropertyGraphIndex.from_existing(
+            property_graph_store=store,
+            llm=gemini_pro_model,
+            embed_model=gemini_embeddings_model,
+        )
+
+    def get_index_from_storage(self, index_name, cached=True):    
         logger.info(f"Loading index '{index_name}' from storage")
         try:
-            loaded_index = DiskStore.load_index(index_source, index_name)
+            if self.uses_sqlite_store():
+                loaded_index = self.get_sqlite_index(index_name, cached=cached)
+            else:
+                loaded_index = DiskStore.load_index(index_source, index_name, cached=cached)
             if loaded_index:
                 logger.info(f"Index '{index_name}' loaded successfully from storage.")
             else:
@@ -1,42 +1,125 @@
 from ..preprocessors import BasicPreprocessor
-from llama_index.core.node_parser import SimpleNodeParser
-from llama_index.core import Document, SummaryIndex
-from app.storage import DiskStore
+from app.core.common.multivector_retriever import retriever_pool
+from app.storage.bm25_index import BM25_FILE, BM25Index
+from app.storage.disk_store import indexing_directory
 from ...interface.base_indexer import BaseIndexer
+from contextlib import contextmanager
+import fcntl
+import logging
+import os
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 index_source = "sparse"
+
+# Loaded indexes keyed by index_name, with the mtime of the file they were read from
+_loaded_indexes = {}
+_loaded_indexes_lock = threading.Lock()
+
 class SparseIndexer(BaseIndexer):
+    """
+    Keeps a BM25 inverted index over the sections of each user's documents.
+
+    Updates of one index are serialized by a file lock, across threads and worker
+    processes. An index that was never built, e.g. for documents ingested before the
+    sparse index existed, is first backfilled from the sections in the vector docstore.
+    """
+
     def __init__(self):
         pass
 
-    def index(self, index_name, documents=None):
+    @staticmethod
+    def _persist_dir(index_name):
+        return f"{indexing_directory}/{index_source}/{index_name}"
+
+    @contextmanager
+    def _write_lock(self, index_name):
+        persist_dir = self._persist_dir(index_name)
+        os.makedirs(persist_dir, exist_ok=True)
+        with open(f"{persist_dir}/{BM25_FILE}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
-        if documents is None:
-            index = self.get_index_from_storage(index_name)
+    @staticmethod
+    def _backfill(index_name):
+        """A BM25 index of every section already stored in the user's vector docstore"""
+        docstore = retriever_pool.get(index_name).docstore
+        doc_ids = list(docstore.yield_keys())
+        sections = [
+            (doc_id, document.page_content)
+            for doc_id, document in zip(doc_ids, docstore.mget(doc_ids))
+            if document is not None
+        ]
+        logger.info(f"Backfilling sparse index '{index_name}' with {len(sections)} stored sections")
+        return BM25Index.empty().updated(sections)
+
+    def load_or_backfill(self, index_name):
+        """The stored index, built from the vector docstore first if it does not exist yet; None if there is nothing to index"""
+        index = self.get_index_from_storage(index_name)
+        if index is not None:
             return index
+        try:
+            with self._write_lock(index_name):
+                index = self.get_index_from_storage(index_name)
+                if index is None:
+                    index = self._backfill(index_name)
+                    if not len(index):
+                        return None
+                    index.save(self._persist_dir(index_name))
+                return index
+        except Exception as e:
+            logger.error(f"Error backfilling sparse index '{index_name}': {e}", exc_info=True)
+            return None
+
+    def index(self, index_name, documents=None, doc_ids=None, removed_doc_ids=None):
+        """
+        Add sections to the user's BM25 index, or load it when no documents are given
+
+        Args:
+            index_name: Name of the user's index
+            documents: Parsed markdown, sections separated by the section separator
+            doc_ids: Id per section, the same ids the vector docstore and graph use
+            removed_doc_ids: Ids of previously indexed sections to drop
 
-        document_chunks = self.create_chunks_from_documents(documents)
-        summary_index = SummaryIndex.from_documents(document_chunks)
-        DiskStore.persist_index(summary_index, index_source, index_name)
-        return summary_index
+        Returns:
+            The updated index, or False if indexing failed
+        """
+        if documents is None and not removed_doc_ids:
+            return self.get_index_from_storage(index_name)
+
+        try:
+            sections = [doc.text for doc in BasicPreprocessor.split_docs_by_separator(documents)] if documents else []
+            doc_ids = doc_ids or [BasicPreprocessor.hash_section(section) for section in sections]
+            with self._write_lock(index_name):
+                index = self.get_index_from_storage(index_name)
+                if index is None:
+                    # An empty stored index is falsy but must not be backfilled again
+                    index = self._backfill(index_name)
+                index = index.updated(list(zip(doc_ids, sections)), removed_doc_ids)
+                index.save(self._persist_dir(index_name))
+            logger.info(f"Sparse index '{index_name}' updated: {index.stats()}")
+            return index
+        except Exception as e:
+            logger.error(f"Error in sparse indexing for '{index_name}': {e}", exc_info=True)
+            return False
 
     def get_index_from_storage(self, index_name):
-        loaded_index = DiskStore.load_index(index_source,index_name)
+        persist_dir = self._persist_dir(index_name)
+        try:
+            mtime = os.stat(f"{persist_dir}/{BM25_FILE}").st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with _loaded_indexes_lock:
+            cached = _loaded_indexes.get(index_name)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        loaded_index = BM25Index.load(persist_dir)
+        with _loaded_indexes_lock:
+            _loaded_indexes[index_name] = (mtime, loaded_index)
         return loaded_index
-
-    def convert_subdocs_to_documents(self, sub_docs):
-        # Initialize the parser with desired chunk size and overlap
-        parser = SimpleNodeParser.from_defaults(chunk_size=512, chunk_overlap=50)
-        # Get text nodes from the sub-documents
-        text_nodes = parser.get_nodes_from_documents(sub_docs)
-        # Create Document objects from text chunks
-        documents = [Document(text=chunk.text) for chunk in text_nodes]
-        return documents
-
-    def create_chunks_from_documents(self, documents):
-        sub_docs = BasicPreprocessor.split_docs_by_separator(documents)
-        return self.convert_subdocs_to_documents(sub_docs)
-
-# Example usage
-# analytical_indexer = AnalyticalIndexer()
-# documents = analytical_indexer.create_documents_from_subdocs(sub_docs)
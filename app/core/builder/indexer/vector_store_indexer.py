@@ -1,8 +1,10 @@
-from app.core.builder.preprocessors.document_prepro import generate_document_features
-from ....initialization import gemini_pro_model_langchain, gemini_flash_model_langchain
+from ....initialization import gemini_pro_model_langchain
+from app.config import get_settings
 from ...interface.base_indexer import BaseIndexer
-from ...common.multivector_retriever import MultiVectorRetrieverBuilder
+from ...common.multivector_retriever import retriever_pool
 from ..preprocessors.multivector_langchain import MultiVectorLangchain
+from ..preprocessors import BasicPreprocessor
+from collections import defaultdict
 import logging
 from uuid import uuid4
 
@@ -13,16 +15,29 @@ logger = logging.getLogger(__name__)
 class VectorStoreIndexer(BaseIndexer):
     
     def __init__(self):
-        self.retriever_builder = MultiVectorRetrieverBuilder()
+        self.retriever_pool = retriever_pool
         self.model = gemini_pro_model_langchain  # Import this from your initialization module
 
-    def index(self, file_name, index_name, documents):
-        """Index documents using MultiVectorRetriever"""
+    def index(self, file_name, index_name, documents, doc_ids=None):
+        """
+        Index documents using MultiVectorRetriever
+
+        Args:
+            file_name: Name of the source file
+            index_name: Name of the user's index
+            documents: Parsed markdown, sections separated by the section separator
+            doc_ids: Optional docstore id per section, generated when not given
+
+        Returns:
+            tuple: (status, summary documents, vector ids upserted per doc_id)
+        """
         logger.debug(f"Starting vector store indexing for file '{file_name}' with index '{index_name}'")
         try:
-            # Generate unique IDs for documents
-            logger.debug(f"Generating unique IDs for {len(documents)} documents")
-            doc_ids = [str(uuid4()) for _ in documents]
+            if doc_ids is None:
+                # Generate unique IDs for documents
+                section_count = len(BasicPreprocessor.split_docs_by_separator(documents))
+                logger.debug(f"Generating unique IDs for {section_count} documents")
+                doc_ids = [str(uuid4()) for _ in range(section_count)]
             
             # Initialize MultiVectorLangchain processor
             logger.debug("Initializing MultiVectorLangchain processor")
@@ -31,9 +46,10 @@ class VectorStoreIndexer(BaseIndexer):
                 doc_ids=doc_ids,
                 file_name=file_name,
                 model=self.model,
-                id_key="doc_id"
+                id_key="doc_id",
+                enrichment_mode=get_settings().ENRICHMENT_MODE
             )
-            retriever = self.retriever_builder.build(index_name)
+            retriever = self.retriever_pool.get(index_name)
             
             # Process documents to get chunks, summaries, and questions
             logger.debug("Processing documents to generate chunks, summaries and questions")
@@ -50,27 +66,38 @@ class VectorStoreIndexer(BaseIndexer):
             
             # Add documents to vector store
             logger.debug(f"Adding {len(combined_docs)} documents to vector store")
-            retriever.vectorstore.add_documents(combined_docs)
+            vector_ids = [str(uuid4()) for _ in combined_docs]
+            retriever.vectorstore.add_documents(combined_docs, ids=vector_ids)
+            vector_ids_by_doc = defaultdict(list)
+            for vector_id, doc in zip(vector_ids, combined_docs):
+                vector_ids_by_doc[doc.metadata["doc_id"]].append(vector_id)
             
             # Store original documents in docstore
             logger.debug("Converting and storing original documents in docstore")
             langchain_docs = processor.convert_to_langchain_docs()
             retriever.docstore.mset(list(zip(doc_ids, langchain_docs)))
             
-            document = generate_document_features(summary_docs, gemini_flash_model_langchain)
-            
             logger.info(f"Successfully indexed {len(langchain_docs)} documents for '{index_name}'")
-            return True , document
+            return True , summary_docs , dict(vector_ids_by_doc)
             
         except Exception as e:
             logger.error(f"Error indexing documents for '{index_name}': {str(e)}", exc_info=True)
-            return False
+            return False , None , None
+
+    def retract(self, index_name, doc_ids, vector_ids):
+        """Remove the vectors and docstore entries of sections that no longer exist"""
+        logger.debug(f"Retracting {len(doc_ids)} documents and {len(vector_ids)} vectors from '{index_name}'")
+        retriever = self.retriever_pool.get(index_name)
+        if vector_ids:
+            retriever.vectorstore.delete(ids=vector_ids)
+        if doc_ids:
+            retriever.docstore.mdelete(doc_ids)
 
     def get_index_from_storage(self, index_name):
         """Get existing retriever from storage"""
         try:
             # Create retriever with existing index
-            retriever = self.retriever_builder.build(index_name)
+            retriever = self.retriever_pool.get(index_name)
             return retriever
         except Exception as e:
             logger.error(f"Error loading index from storage: {e}")
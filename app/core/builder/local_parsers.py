@@ -0,0 +1,114 @@
+import logging
+import re
+from html.parser import HTMLParser
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SECTION_SEPARATOR = "\n---\n"
+SECTION_CHARS = 4000
+# A text-layer PDF yields at least this many characters per page on average;
+# below it the PDF is most likely scanned and needs OCR.
+MIN_PDF_CHARS_PER_PAGE = 50
+
+def paginate(text: str, section_chars: int = SECTION_CHARS) -> str:
+    """Group paragraphs into page-sized sections joined by the section separator."""
+    if SECTION_SEPARATOR in text:
+        return text
+    sections, current, current_length = [], [], 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and current_length + len(paragraph) > section_chars:
+            sections.append("\n\n".join(current))
+            current, current_length = [], 0
+        current.append(paragraph)
+        current_length += len(paragraph)
+    if current:
+        sections.append("\n\n".join(current))
+    return SECTION_SEPARATOR.join(sections)
+
+# Local backends expose a name and parse(file) -> markdown, where file is a binary
+# file object positioned at the start. Returning None hands the file to LlamaParse.
+
+class TextParser:
+    """Plain text and markdown, which need no conversion."""
+
+    name = "text"
+
+    @staticmethod
+    def parse(file):
+        return paginate(file.read().decode("utf-8", errors="replace"))
+
+class _MarkdownHTMLConverter(HTMLParser):
+    BLOCK_TAGS = {"p", "div", "section", "article", "table", "tr", "br", "ul", "ol", "blockquote", "pre"}
+    HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+    SKIPPED_TAGS = {"script", "style", "head", "noscript"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in self.HEADING_TAGS:
+            self.parts.append("\n\n" + "#" * int(tag[1]) + " ")
+        elif tag == "li":
+            self.parts.append("\n- ")
+        elif tag in ("td", "th"):
+            self.parts.append(" | ")
+        elif tag == "hr":
+            self.parts.append(SECTION_SEPARATOR)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in self.BLOCK_TAGS or tag in self.HEADING_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+    def markdown(self):
+        text = "".join(self.parts)
+        return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+class HtmlParser:
+    """HTML converted to markdown headings, lists and paragraphs."""
+
+    name = "html"
+
+    @staticmethod
+    def parse(file):
+        converter = _MarkdownHTMLConverter()
+        converter.feed(file.read().decode("utf-8", errors="replace"))
+        converter.close()
+        return paginate(converter.markdown())
+
+class PdfParser:
+    """PDFs with a text layer, one section per page. Scanned PDFs are left to LlamaParse."""
+
+    name = "pdf"
+
+    @staticmethod
+    def parse(file):
+        if PdfReader is None:
+            logger.info("pypdf is not installed, PDF parsing falls back to LlamaParse")
+            return None
+        reader = PdfReader(file)
+        pages = [(page.extract_text() or "").strip() for page in reader.pages]
+        if not pages or sum(len(page) for page in pages) < MIN_PDF_CHARS_PER_PAGE * len(pages):
+            logger.info("PDF has no usable text layer, falling back to LlamaParse")
+            return None
+        return SECTION_SEPARATOR.join(pages)
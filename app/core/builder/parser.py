@@ -4,6 +4,13 @@ import os
 import logging
 import httpx
 import asyncio
+import mimetypes
+import random
+import time
+from app.config import get_settings
+from app.storage.parse_cache import get_parse_cache
+from .spooled_upload import SpooledUpload
+from .local_parsers import TextParser, HtmlParser, PdfParser
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -14,32 +21,132 @@ class Parser:
     """
     A static class for parsing documents and queries.
     """
-    
+
+    PARSE_OPTIONS = {"result_type": "markdown"}
+    _client = None
+
+    # MIME type -> in-process backend. Types not listed here are parsed by LlamaParse.
+    LOCAL_BACKENDS = {
+        "text/plain": TextParser,
+        "text/markdown": TextParser,
+        "text/x-markdown": TextParser,
+        "text/html": HtmlParser,
+        "application/xhtml+xml": HtmlParser,
+        "application/pdf": PdfParser,
+    }
+
+    @staticmethod
+    def _route(file):
+        mime_type = (file.content_type or "").split(";")[0].strip().lower()
+        if mime_type not in Parser.LOCAL_BACKENDS:
+            # Browsers often send application/octet-stream, fall back to the file extension.
+            guessed_type, _ = mimetypes.guess_type(file.filename or "")
+            mime_type = guessed_type or mime_type
+        return Parser.LOCAL_BACKENDS.get(mime_type)
+
+    @staticmethod
+    async def startup():
+        """Open the process-wide HTTP/2 connection pool used for all LlamaParse calls."""
+        if Parser._client is None:
+            settings = get_settings()
+            Parser._client = httpx.AsyncClient(
+                base_url=settings.LLAMAPARSE_BASE_URL,
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=settings.PARSER_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.PARSER_MAX_CONNECTIONS,
+                ),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+            )
+            logger.info("Parser HTTP client pool started")
+        return Parser._client
+
+    @staticmethod
+    async def shutdown():
+        if Parser._client is not None:
+            await Parser._client.aclose()
+            Parser._client = None
+            logger.info("Parser HTTP client pool closed")
+
+    @staticmethod
+    async def load_many(files, concurrency=None):
+        """
+        Parse several files concurrently over the shared client, uploading at most
+        `concurrency` (PARSER_UPLOAD_CONCURRENCY by default) at a time
+
+        Returns:
+            list: One load_data result per file, in the order of the input
+        """
+        semaphore = asyncio.Semaphore(concurrency or get_settings().PARSER_UPLOAD_CONCURRENCY)
+
+        async def load_one(file):
+            async with semaphore:
+                return await Parser.load_data(file)
+
+        return await asyncio.gather(*(load_one(file) for file in files))
+
     @staticmethod
     async def load_data(file):
+        """
+        Parse an uploaded file to markdown
+
+        Args:
+            file: An UploadFile, or a SpooledUpload that was already spooled and hashed
+        """
+        if isinstance(file, SpooledUpload):
+            return await Parser._load_spooled(file)
+
+        spooled = await SpooledUpload.from_upload(file)
+        try:
+            return await Parser._load_spooled(spooled)
+        finally:
+            spooled.close()
+
+    @staticmethod
+    async def _load_spooled(file):
+        backend = Parser._route(file)
+        if backend is not None:
+            try:
+                parsed_content = await asyncio.to_thread(backend.parse, file.file)
+            except Exception as e:
+                logger.warning(f"Local {backend.name} parser failed for {file.filename}: {e}")
+                parsed_content = None
+            file.file.seek(0)
+            if parsed_content is not None:
+                logger.info(f"Parsed file {file.filename} locally with the {backend.name} parser")
+                return {"message": "File processed successfully", "parsed_content": parsed_content}
+
+        parse_cache = get_parse_cache()
+        cache_key = parse_cache.make_key(file.sha256, Parser.PARSE_OPTIONS)
+        cached_content = parse_cache.get(cache_key)
+        if cached_content is not None:
+            logger.info(f"Parse cache hit for file {file.filename}, skipping LlamaParse")
+            return {"message": "File processed successfully", "parsed_content": cached_content}
+
         logger.info(f"Uploading file {file.filename} to LlamaParse")
-        llama_url = "https://api.cloud.llamaindex.ai/api/parsing/upload"
         headers = {
             "Authorization": f"Bearer {os.getenv('LLAMAPARSER_API_KEY')}",
             "accept": "application/json",
         }
+        # The file object is streamed to LlamaParse in chunks by the multipart encoder.
         files = {
-            "file": (file.filename, await file.read(), file.content_type),
-            "result_type": "markdown"
+            "file": (file.filename, file.file, file.content_type),
+            **Parser.PARSE_OPTIONS
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                job_id = await Parser._upload_file(client, llama_url, headers, files, file.filename)
-                await Parser._poll_job(client, job_id, headers, file.filename)
-                parsed_content = await Parser._retrieve_result(client, job_id, headers, file.filename)
-                return {"message": "File processed successfully", "parsed_content": parsed_content}
-            except Exception as e:
-                return Parser._handle_exception(e, file.filename)
+        client = await Parser.startup()
+        try:
+            job_id = await Parser._upload_file(client, headers, files, file.filename)
+            await Parser._poll_job(client, job_id, headers, file.filename)
+            parsed_content = await Parser._retrieve_result(client, job_id, headers, file.filename)
+            parse_cache.put(cache_key, parsed_content)
+            return {"message": "File processed successfully", "parsed_content": parsed_content}
+        except Exception as e:
+            return Parser._handle_exception(e, file.filename)
 
     @staticmethod
-    async def _upload_file(client, url, headers, files, filename):
-        response = await client.post(url, headers=headers, files=files)
+    async def _upload_file(client, headers, files, filename):
+        response = await client.post("/upload", headers=headers, files=files)
         response.raise_for_status()
         result = response.json()
         job_id = result.get("id")
@@ -50,9 +157,15 @@ class Parser:
 
     @staticmethod
     async def _poll_job(client, job_id, headers, filename):
-        status_url = f"https://api.cloud.llamaindex.ai/api/parsing/job/{job_id}"
+        """
+        Poll the job until it finishes, checking quickly at first and then backing off
+        exponentially with full jitter, up to an overall deadline.
+        """
+        settings = get_settings()
+        delay = settings.PARSER_POLL_INITIAL_SECONDS
+        deadline = time.monotonic() + settings.PARSER_POLL_TIMEOUT_SECONDS
         while True:
-            status_response = await client.get(status_url, headers=headers)
+            status_response = await client.get(f"/job/{job_id}", headers=headers)
             status_response.raise_for_status()
             status_result = status_response.json()
             status = status_result.get("status")
@@ -64,13 +177,19 @@ class Parser:
                 logger.error(f"Parsing failed for job ID {job_id}")
                 raise ValueError("Parsing failed")
             
-            logger.info(f"Parsing in progress for job ID {job_id}. Retrying in 2 seconds...")
-            await asyncio.sleep(2)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error(f"Parsing timed out for job ID {job_id}")
+                raise TimeoutError(f"Parsing did not finish within {settings.PARSER_POLL_TIMEOUT_SECONDS} seconds")
+
+            sleep_for = min(random.uniform(0, delay), remaining)
+            logger.info(f"Parsing in progress for job ID {job_id}. Retrying in {sleep_for:.2f} seconds...")
+            await asyncio.sleep(sleep_for)
+            delay = min(delay * 2, settings.PARSER_POLL_MAX_SECONDS)
 
     @staticmethod
     async def _retrieve_result(client, job_id, headers, filename):
-        result_url = f"https://api.cloud.llamaindex.ai/api/parsing/job/{job_id}/result/markdown"
-        result_response = await client.get(result_url, headers=headers)
+        result_response = await client.get(f"/job/{job_id}/result/markdown", headers=headers)
         result_response.raise_for_status()
         parsed_content = result_response.json().get("markdown", "")
         return parsed_content
@@ -1,3 +1,4 @@
+import hashlib
 import logging
 from llama_index.core import Document
 
@@ -22,4 +23,9 @@ class BasicPreprocessor:
                 return sub_docs
             except Exception as e:
                 logger.error(f"Error splitting documents: {e}")
-                raise
\ No newline at end of file
+                raise
+
+    @staticmethod
+    def hash_section(section: str) -> str:
+        """Content hash of a section, used to detect changed sections between document versions."""
+        return hashlib.sha256(section.encode("utf-8")).hexdigest()
@@ -1,3 +1,4 @@
+import asyncio
 from langchain_core.documents import Document
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
@@ -6,14 +7,40 @@ from typing import List
 from pydantic import BaseModel, Field
 
 from app.core.builder.preprocessors.basic import BasicPreprocessor
+from app.core.common.rate_limiter import get_rate_limiter
+from app.logging_config import indexing_logger as logger
+
+class SectionEnrichment(BaseModel):
+    summary: str = Field(..., description="A detailed summary of the document capturing every important detail")
+    questions: List[str] = Field(..., description="Exactly 3 hypothetical questions the document could be used to answer")
 
 class MultiVectorLangchain:
-    def __init__(self, documents, doc_ids, file_name, model, id_key):
+    ENRICHMENT_TEMPLATE = """Read the following document and return two things:
+1. summary: Summarize the document and make sure to capture each important detail from the document which will be usefull for you to do a vetore search and retrieve as this will be stored for performing RAG.
+2. questions: Generate a list of exactly 3 hypothetical questions that the document could be used to answer.
+
+{doc}"""
+
+    def __init__(self, documents, doc_ids, file_name, model, id_key, enrichment_mode="combined"):
+        """
+        Args:
+            enrichment_mode: "combined" asks for the summary and the questions of a section in one
+                structured call, "separate" runs a summary pass and a questions pass
+        """
         self.documents = documents
         self.doc_ids = doc_ids
         self.file_name = file_name
         self.model = model
         self.id_key = id_key
+        self.enrichment_mode = enrichment_mode
+
+    def run_batch(self, chain, langchain_docs):
+        """
+        Run the chain over the documents with abatch-style concurrency governed by the
+        shared rate limiter of the model, instead of a fixed max_concurrency.
+        """
+        limiter = get_rate_limiter(getattr(self.model, "model", "default"))
+        return asyncio.run(limiter.abatch(chain, langchain_docs))
 
     def convert_to_langchain_docs(self):
         """Convert parsed documents to LangChain Document format."""
@@ -37,23 +64,25 @@ class MultiVectorLangchain:
             document_chunks.extend(_sub_docs)
         return document_chunks
 
-    def generate_summaries(self, langchain_docs):
-        """Generate summaries for the LangChain documents."""
+    def generate_summaries(self, langchain_docs, doc_ids=None):
+        """Generate summaries for the LangChain documents, doc_ids defaults to those of all documents."""
+        doc_ids = doc_ids or self.doc_ids
         chain = (
             {"doc": lambda x: x.page_content}
             | ChatPromptTemplate.from_template("Summarize the following document and make sure to capture each important detail from the document which will be usefull for you to do a vetore search and retrieve as this will be stored for performing RAG:\n\n{doc}")
             | self.model
             | StrOutputParser()
         )
-        summaries = chain.batch(langchain_docs, {"max_concurrency": 5})
+        summaries = self.run_batch(chain, langchain_docs)
         summary_docs = [
-            Document(page_content=s, metadata={self.id_key: self.doc_ids[i], "source" : self.file_name})
+            Document(page_content=s, metadata={self.id_key: doc_ids[i], "source" : self.file_name})
             for i, s in enumerate(summaries)
         ]
         return summary_docs
 
-    def generate_hypothetical_questions(self, langchain_docs):
-        """Generate hypothetical questions based on the LangChain documents."""
+    def generate_hypothetical_questions(self, langchain_docs, doc_ids=None):
+        """Generate hypothetical questions based on the LangChain documents, doc_ids as in generate_summaries."""
+        doc_ids = doc_ids or self.doc_ids
         class HypotheticalQuestions(BaseModel):
             questions: List[str] = Field(..., description="List of questions")
 
@@ -63,24 +92,64 @@ class MultiVectorLangchain:
                 "Generate a list of exactly 3 hypothetical questions that the below document could be used to answer:\n\n{doc}"
             )
             | self.model.with_structured_output(HypotheticalQuestions)
-            | (lambda x: x.questions)
+            # Structured output is None when the model's reply does not parse
+            | (lambda x: x.questions if x is not None else [])
         )
 
-        hypothetical_questions = chain.batch(langchain_docs, {"max_concurrency": 5})
+        hypothetical_questions = self.run_batch(chain, langchain_docs)
         question_docs = []
         for i, question_list in enumerate(hypothetical_questions):
             question_docs.extend(
-                [Document(page_content=s, metadata={self.id_key: self.doc_ids[i], "source" : self.file_name}) for s in question_list]
+                [Document(page_content=s, metadata={self.id_key: doc_ids[i], "source" : self.file_name}) for s in question_list]
             )
 
         return question_docs
 
+    def generate_enrichments(self, langchain_docs):
+        """
+        Generate the summary and hypothetical questions of each document in a single call.
+
+        Sections whose structured output does not parse come back as None; they are
+        retried through the separate summary and questions chains.
+        """
+        chain = (
+            {"doc": lambda x: x.page_content}
+            | ChatPromptTemplate.from_template(self.ENRICHMENT_TEMPLATE)
+            | self.model.with_structured_output(SectionEnrichment)
+        )
+
+        enrichments = self.run_batch(chain, langchain_docs)
+        summary_docs = []
+        question_docs = []
+        failed = []
+        for i, enrichment in enumerate(enrichments):
+            if enrichment is None:
+                failed.append(i)
+                continue
+            metadata = {self.id_key: self.doc_ids[i], "source" : self.file_name}
+            summary_docs.append(Document(page_content=enrichment.summary, metadata=dict(metadata)))
+            question_docs.extend(
+                [Document(page_content=q, metadata=dict(metadata)) for q in enrichment.questions]
+            )
+
+        if failed:
+            logger.warning(f"Enrichment of {len(failed)} sections of {self.file_name} did not parse, retrying them separately")
+            retry_docs = [langchain_docs[i] for i in failed]
+            retry_ids = [self.doc_ids[i] for i in failed]
+            summary_docs.extend(self.generate_summaries(retry_docs, retry_ids))
+            question_docs.extend(self.generate_hypothetical_questions(retry_docs, retry_ids))
+
+        return summary_docs, question_docs
+
     def process_documents(self):
         """Process the documents by calling the other methods."""
         langchain_docs = self.convert_to_langchain_docs()
         document_chunks = self.split_into_smaller_chunks(langchain_docs)
-        summary_docs = self.generate_summaries(langchain_docs)
-        question_docs = self.generate_hypothetical_questions(langchain_docs)
+        if self.enrichment_mode == "combined":
+            summary_docs, question_docs = self.generate_enrichments(langchain_docs)
+        else:
+            summary_docs = self.generate_summaries(langchain_docs)
+            question_docs = self.generate_hypothetical_questions(langchain_docs)
         return document_chunks, summary_docs, question_docs
 
 # Example usage
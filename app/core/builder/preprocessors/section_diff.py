@@ -0,0 +1,63 @@
+from typing import List
+from uuid import uuid4
+from .basic import BasicPreprocessor
+
+class SectionDiff:
+    """
+    Difference between the sections of a parsed document and its previously indexed version.
+
+    sections holds the manifest entries of the new version in document order, added the
+    entries whose content was not indexed before and removed the previous entries that
+    no longer appear in the document.
+    """
+
+    def __init__(self, sections: List[dict], added: List[dict], removed: List[dict]):
+        self.sections = sections
+        self.added = added
+        self.removed = removed
+
+    @classmethod
+    def from_documents(cls, documents: str, manifest: dict, separator="\n---\n"):
+        previous = {entry["hash"]: entry for entry in manifest.get("sections", [])}
+        sections, added, seen = [], [], set()
+        for text in documents.split(separator):
+            section_hash = BasicPreprocessor.hash_section(text)
+            # Identical sections share one entry, they carry no extra information.
+            if section_hash in seen:
+                continue
+            seen.add(section_hash)
+            if section_hash in previous:
+                entry = previous[section_hash]
+            else:
+                entry = {"hash": section_hash, "doc_id": str(uuid4()), "vector_ids": [], "summary": "", "text": text}
+                added.append(entry)
+            sections.append(entry)
+        removed = [entry for section_hash, entry in previous.items() if section_hash not in seen]
+        return cls(sections, added, removed)
+
+    def added_documents(self, separator="\n---\n") -> str:
+        """The added sections joined back into the separator-delimited markdown the indexers take."""
+        return separator.join(entry["text"] for entry in self.added)
+
+    def added_doc_ids(self) -> List[str]:
+        return [entry["doc_id"] for entry in self.added]
+
+    def removed_doc_ids(self) -> List[str]:
+        return [entry["doc_id"] for entry in self.removed]
+
+    def removed_vector_ids(self) -> List[str]:
+        return [vector_id for entry in self.removed for vector_id in entry.get("vector_ids", [])]
+
+    def record_enrichment(self, vector_ids_by_doc: dict, summary_docs: list):
+        """Store the vector ids and summaries produced for the added sections on their entries."""
+        summaries = {doc.metadata["doc_id"]: doc.page_content for doc in summary_docs}
+        for entry in self.added:
+            entry["vector_ids"] = vector_ids_by_doc.get(entry["doc_id"], [])
+            entry["summary"] = summaries.get(entry["doc_id"], "")
+
+    def manifest_sections(self) -> List[dict]:
+        """The section entries to persist, without the section text."""
+        return [{key: value for key, value in entry.items() if key != "text"} for entry in self.sections]
+
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed)
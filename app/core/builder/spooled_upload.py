@@ -0,0 +1,68 @@
+import hashlib
+import io
+import os
+import tempfile
+import logging
+from app.config import get_settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+class SpooledUpload:
+    """
+    An uploaded file streamed to disk in chunks, hashed in the same pass.
+
+    Uploads up to max_in_memory bytes stay in memory; larger ones are written to a
+    temporary file, so memory use stays flat regardless of the file size.
+    """
+
+    def __init__(self, filename, content_type, file, sha256, size):
+        self.filename = filename
+        self.content_type = content_type
+        self.file = file
+        self.sha256 = sha256
+        self.size = size
+
+    @classmethod
+    async def from_upload(cls, upload, max_in_memory=None):
+        """Spool a FastAPI UploadFile (or any object with an async read(size))."""
+        max_in_memory = max_in_memory if max_in_memory is not None else get_settings().UPLOAD_MAX_IN_MEMORY_BYTES
+        digest = hashlib.sha256()
+        buffer = bytearray()
+        disk_file = None
+        size = 0
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+            if disk_file is None and size > max_in_memory:
+                disk_file = tempfile.TemporaryFile()
+                disk_file.write(buffer)
+                buffer = None
+            if disk_file is None:
+                buffer.extend(chunk)
+            else:
+                disk_file.write(chunk)
+
+        file = disk_file if disk_file is not None else io.BytesIO(bytes(buffer))
+        file.seek(0)
+        logger.info(f"Spooled upload {upload.filename} ({size} bytes, {'disk' if disk_file else 'memory'})")
+        return cls(upload.filename, upload.content_type, file, digest.hexdigest(), size)
+
+    @classmethod
+    def from_path(cls, path, filename, content_type, sha256=None):
+        """Wrap a file that was already spooled to disk, e.g. by the ingestion queue, hashing it if needed."""
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(path, "rb") as spooled:
+                while chunk := spooled.read(UPLOAD_CHUNK_SIZE):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+        return cls(filename, content_type, open(path, "rb"), sha256, os.path.getsize(path))
+
+    async def read(self, size=-1):
+        return self.file.read(size)
+
+    def close(self):
+        self.file.close()
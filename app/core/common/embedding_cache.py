@@ -0,0 +1,219 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, List, Optional
+from langchain_core.embeddings import Embeddings
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import PrivateAttr
+from app.config import get_settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+class EmbeddingStore:
+    """
+    Embedding vectors keyed by (model, kind, normalized text hash).
+
+    Vectors live in a local SQLite file, fronted by an in-memory LRU. `kind` separates
+    query and document embeddings, which Gemini computes with different task types.
+    """
+
+    def __init__(self, db_path: str = None, memory_entries: int = None):
+        settings = get_settings()
+        self.db_path = db_path or settings.EMBEDDING_CACHE_PATH
+        self.memory_entries = memory_entries or settings.EMBEDDING_CACHE_MEMORY_ENTRIES
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self.db.commit()
+
+    @staticmethod
+    def make_key(model: str, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{kind}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        results = [None] * len(keys)
+        with self.lock:
+            disk_lookups = {}
+            for i, key in enumerate(keys):
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    results[i] = self.memory[key]
+                    self.memory_hits += 1
+                else:
+                    disk_lookups.setdefault(key, []).append(i)
+            if disk_lookups:
+                placeholders = ",".join("?" * len(disk_lookups))
+                rows = self.db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", list(disk_lookups)
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f", blob).tolist()
+                    self._remember(key, vector)
+                    for i in disk_lookups.pop(key):
+                        results[i] = vector
+                        self.disk_hits += 1
+                self.misses += sum(len(positions) for positions in disk_lookups.values())
+        return results
+
+    def put_many(self, keys: List[str], vectors: List[List[float]]):
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in zip(keys, vectors)],
+            )
+            self.db.commit()
+            for key, vector in zip(keys, vectors):
+                self._remember(key, list(vector))
+
+    def _lookup(self, model: str, kind: str, texts: List[str]):
+        keys = [self.make_key(model, kind, text) for text in texts]
+        vectors = self.get_many(keys)
+        missing = OrderedDict()
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[i], []).append(i)
+        return vectors, missing
+
+    def _fill(self, vectors, missing, computed):
+        self.put_many(list(missing), computed)
+        for positions, vector in zip(missing.values(), computed):
+            for i in positions:
+                vectors[i] = vector
+        return vectors
+
+    def embed(self, model: str, kind: str, texts: List[str], compute: Callable[[List[str]], List[List[float]]]):
+        """Return cached vectors for texts, computing all misses with a single compute call."""
+        vectors, missing = self._lookup(model, kind, texts)
+        if not missing:
+            return vectors
+        return self._fill(vectors, missing, compute([texts[positions[0]] for positions in missing.values()]))
+
+    async def aembed(self, model: str, kind: str, texts: List[str], acompute):
+        vectors, missing = self._lookup(model, kind, texts)
+        if not missing:
+            return vectors
+        return self._fill(vectors, missing, await acompute([texts[positions[0]] for positions in missing.values()]))
+
+    def stats(self) -> dict:
+        with self.lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+            }
+
+_embedding_store = None
+_embedding_store_lock = threading.Lock()
+
+def get_embedding_store() -> EmbeddingStore:
+    """The process-wide embedding store, whose SQLite file is opened on first use."""
+    global _embedding_store
+    with _embedding_store_lock:
+        if _embedding_store is None:
+            _embedding_store = EmbeddingStore()
+        return _embedding_store
+
+def model_cache_key(embeddings) -> str:
+    model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", "default")
+    return f"{type(embeddings).__name__}:{model}"
+
+class CachedEmbeddings(Embeddings):
+    """LangChain embeddings wrapper that serves repeated texts from the embedding store."""
+
+    def __init__(self, embeddings: Embeddings, store: EmbeddingStore = None):
+        self.embeddings = embeddings
+        self._store = store
+        self.model = model_cache_key(embeddings)
+
+    @property
+    def store(self) -> EmbeddingStore:
+        return self._store or get_embedding_store()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.store.embed(self.model, "document", texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.store.embed(self.model, "query", [text], lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Query embeddings of several texts, the uncached ones computed in one batched call."""
+        return self.store.embed(self.model, "query", texts, self._compute_queries)
+
+    def _compute_queries(self, texts: List[str]) -> List[List[float]]:
+        try:
+            # Gemini embeds a batch with the query task type when asked to
+            return self.embeddings.embed_documents(texts, task_type="retrieval_query")
+        except TypeError:
+            return [self.embeddings.embed_query(text) for text in texts]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.store.aembed(self.model, "document", texts, self.embeddings.aembed_documents)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        async def compute(texts):
+            return [await self.embeddings.aembed_query(texts[0])]
+        return (await self.store.aembed(self.model, "query", [text], compute))[0]
+
+class CachedLlamaIndexEmbedding(BaseEmbedding):
+    """LlamaIndex embedding wrapper backed by the same embedding store."""
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _store: Optional[EmbeddingStore] = PrivateAttr()
+    _model_key: str = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, store: EmbeddingStore = None, **kwargs):
+        super().__init__(model_name=embed_model.model_name, embed_batch_size=embed_model.embed_batch_size, **kwargs)
+        self._embed_model = embed_model
+        self._store = store
+        self._model_key = model_cache_key(embed_model)
+
+    @property
+    def store(self) -> EmbeddingStore:
+        return self._store or get_embedding_store()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedLlamaIndexEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self.store.embed(
+            self._model_key, "query", [query], lambda texts: [self._embed_model.get_query_embedding(texts[0])]
+        )[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        async def compute(texts):
+            return [await self._embed_model.aget_query_embedding(texts[0])]
+        return (await self.store.aembed(self._model_key, "query", [query], compute))[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self.store.embed(self._model_key, "document", texts, self._embed_model.get_text_embedding_batch)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self.store.aembed(
+            self._model_key, "document", texts, self._embed_model.aget_text_embedding_batch
+        )
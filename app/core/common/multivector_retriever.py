@@ -1,10 +1,13 @@
 from typing import Dict, Any
+from collections import OrderedDict
 from langchain.retrievers import MultiVectorRetriever
-from langchain.storage import LocalFileStore
-from app.storage.pinecone import PineconeStore
+from app.config import get_settings
 from app.storage.disk_store import indexing_directory
+from app.storage.packed_byte_store import PackedByteStore
 import os
 import logging
+import threading
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,26 +17,39 @@ class MultiVectorRetrieverBuilder:
     """Builder class for creating MultiVectorRetriever instances"""
     
     def __init__(self):
-        self.pinecone_store = PineconeStore()
+        self.vector_backend = self.get_vector_backend()
         self.storage_path = indexing_directory + "/vector_docstore"
+        self.packed_storage_path = indexing_directory + "/packed_docstore"
+        
+    @staticmethod
+    def get_vector_backend():
+        """Pinecone or the local IVF store, chosen per deployment by VECTOR_STORE_BACKEND."""
+        if get_settings().VECTOR_STORE_BACKEND == "local":
+            from app.storage.local_vector_store import local_vector_backend
+            return local_vector_backend
+        from app.storage.pinecone import PineconeStore
+        return PineconeStore()
         
     def build(self, index_name: str, id_key: str = "doc_id") -> MultiVectorRetriever:
         """
         Build a MultiVectorRetriever with the specified index name
         
         Args:
-            index_name: Name of the Pinecone index to use
+            index_name: Name of the user's vector index
             id_key: Key to use for document IDs (default: "doc_id")
             
         Returns:
             MultiVectorRetriever instance
         """
         try:
-            # Get vector store from Pinecone
-            vector_store = self.pinecone_store.get_vector_store(index_name)
+            # Get vector store from the configured backend
+            vector_store = self.vector_backend.get_vector_store(index_name)
             
-            # Initialize local file store
-            store = LocalFileStore(root_path=self.storage_path + f"/{index_name}")
+            # Parent documents live in one packed segment per index, migrated from the
+            # per-document LocalFileStore directory on first use
+            store = PackedByteStore.from_directory(
+                self.packed_storage_path + f"/{index_name}.seg", self.storage_path + f"/{index_name}"
+            )
             
             # Create and return the retriever
             retriever = MultiVectorRetriever(
@@ -48,3 +64,89 @@ class MultiVectorRetrieverBuilder:
         except Exception as e:
             logger.error(f"Error creating MultiVectorRetriever: {e}")
             raise
+
+class RetrieverPool:
+    """
+    Keyed pool of ready MultiVectorRetrievers, one per index_name.
+
+    Entries idle for longer than idle_ttl_seconds are evicted on access, and the least
+    recently used entry goes once max_entries is exceeded. A retriever is built at most
+    once at a time per index; other callers for the same index wait for it.
+    """
+
+    def __init__(self, max_entries: int, idle_ttl_seconds: float, builder: MultiVectorRetrieverBuilder = None):
+        self.max_entries = max_entries
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.builder = builder
+        self.entries = OrderedDict()
+        self.build_locks = {}
+        self.lock = threading.Lock()
+        self.reuses = 0
+        self.constructions = 0
+        self.construction_seconds = 0.0
+        self.evictions = 0
+
+    def _evict_idle(self, now):
+        for index_name in [name for name, (_, used_at) in self.entries.items() if now - used_at > self.idle_ttl_seconds]:
+            del self.entries[index_name]
+            self.evictions += 1
+
+    def _lookup(self, index_name):
+        now = time.monotonic()
+        self._evict_idle(now)
+        entry = self.entries.get(index_name)
+        if entry is None:
+            return None
+        self.entries[index_name] = (entry[0], now)
+        self.entries.move_to_end(index_name)
+        self.reuses += 1
+        return entry[0]
+
+    def get(self, index_name: str) -> MultiVectorRetriever:
+        """Borrow the pooled retriever of an index, building it on first use"""
+        with self.lock:
+            retriever = self._lookup(index_name)
+            if retriever is not None:
+                return retriever
+            build_lock = self.build_locks.setdefault(index_name, threading.Lock())
+
+        with build_lock:
+            with self.lock:
+                retriever = self._lookup(index_name)
+                if retriever is not None:
+                    return retriever
+                if self.builder is None:
+                    self.builder = MultiVectorRetrieverBuilder()
+            started = time.perf_counter()
+            retriever = self.builder.build(index_name)
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.entries[index_name] = (retriever, time.monotonic())
+                self.constructions += 1
+                self.construction_seconds += elapsed
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+            return retriever
+
+    def invalidate(self, index_name: str):
+        with self.lock:
+            self.entries.pop(index_name, None)
+
+    def stats(self) -> dict:
+        with self.lock:
+            borrows = self.reuses + self.constructions
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "reuses": self.reuses,
+                "constructions": self.constructions,
+                "reuse_rate": self.reuses / borrows if borrows else 0.0,
+                "avg_construction_ms": 1000 * self.construction_seconds / self.constructions if self.constructions else 0.0,
+                "evictions": self.evictions,
+            }
+
+retriever_pool = RetrieverPool(
+    max_entries=get_settings().RETRIEVER_POOL_MAX_ENTRIES,
+    idle_ttl_seconds=get_settings().RETRIEVER_POOL_IDLE_TTL_SECONDS,
+)
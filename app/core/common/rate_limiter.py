@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from app.config import get_settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+WAIT_INTERVAL_SECONDS = 0.05
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Gemini surfaces quota errors as 429 / RESOURCE_EXHAUSTED through several client libraries."""
+    message = f"{type(error).__name__} {error}"
+    return "429" in message or "ResourceExhausted" in message or "RESOURCE_EXHAUSTED" in message
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+class TokenBucket:
+    def __init__(self, capacity_per_minute: float):
+        self.capacity = capacity_per_minute
+        self.available = capacity_per_minute
+        self.refill_per_second = capacity_per_minute / 60.0
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def can_take(self, amount: float) -> bool:
+        # A single request larger than the bucket is let through once the bucket is full.
+        return self.available >= min(amount, self.capacity)
+
+class RateLimiter:
+    """
+    Shared Gemini quota guard for one model.
+
+    Calls wait for a request/min and a token/min bucket and for a concurrency slot.
+    The concurrency limit grows additively while calls succeed and is halved on every
+    429, so overlapping uploads share the quota instead of triggering 429 storms.
+
+    State is guarded by a threading lock and waits use asyncio.sleep, so the same
+    limiter can be used from the event loop and from event loops in worker threads.
+    """
+
+    def __init__(self, model: str, requests_per_minute: int, tokens_per_minute: int,
+                 max_concurrency: int, min_concurrency: int = 1, max_retries: int = 5):
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(min(max_concurrency, max(min_concurrency, max_concurrency // 2)))
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.throttled = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+
+    def _try_acquire(self, estimated_tokens: int) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            if self.in_flight >= int(self.concurrency_limit):
+                return False
+            if not self.requests.can_take(1) or not self.tokens.can_take(estimated_tokens):
+                return False
+            self.requests.available -= 1
+            self.tokens.available -= estimated_tokens
+            self.in_flight += 1
+            return True
+
+    async def acquire(self, estimated_tokens: int):
+        started = time.monotonic()
+        with self.lock:
+            self.waiting += 1
+        try:
+            while not self._try_acquire(estimated_tokens):
+                await asyncio.sleep(WAIT_INTERVAL_SECONDS)
+        finally:
+            with self.lock:
+                self.waiting -= 1
+                self.wait_seconds += time.monotonic() - started
+
+    def release(self, outcome: str):
+        with self.lock:
+            self.in_flight -= 1
+            if outcome == "success":
+                self.completed += 1
+                self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+            elif outcome == "throttled":
+                self.throttled += 1
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+            else:
+                self.failed += 1
+
+    async def call(self, fn, *args, estimated_tokens: int = 1, **kwargs):
+        """Await fn(*args, **kwargs) under the limiter, retrying with backoff on 429 responses."""
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(estimated_tokens)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if is_rate_limit_error(e) and attempt < self.max_retries:
+                    self.release("throttled")
+                    backoff = min(60.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+                    logger.warning(f"Rate limited on {self.model}, retrying in {backoff:.1f}s (attempt {attempt + 1})")
+                    await asyncio.sleep(backoff)
+                    continue
+                self.release("throttled" if is_rate_limit_error(e) else "failed")
+                raise
+            self.release("success")
+            return result
+
+    async def stream(self, fn, *args, estimated_tokens: int = 1, **kwargs):
+        """
+        Iterate the async stream fn(*args, **kwargs) under the limiter.
+
+        The slot is held until the stream ends or its consumer stops. A 429 is retried
+        with backoff only before the first chunk, so no chunk is ever delivered twice.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(estimated_tokens)
+            outcome, started = "failed", False
+            try:
+                async for chunk in fn(*args, **kwargs):
+                    started = True
+                    yield chunk
+                outcome = "success"
+                return
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                outcome = "throttled"
+                if started or attempt == self.max_retries:
+                    raise
+                backoff = min(60.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+                logger.warning(f"Rate limited on {self.model}, retrying stream in {backoff:.1f}s (attempt {attempt + 1})")
+            finally:
+                self.release(outcome)
+            await asyncio.sleep(backoff)
+
+    async def abatch(self, chain, inputs, input_text=lambda x: getattr(x, "page_content", str(x))):
+        """Run chain.ainvoke over inputs concurrently under the limiter, preserving input order."""
+        return await asyncio.gather(*(
+            self.call(chain.ainvoke, item, estimated_tokens=estimate_tokens(input_text(item)))
+            for item in inputs
+        ))
+
+    def metrics(self) -> dict:
+        with self.lock:
+            return {
+                "concurrency_limit": round(self.concurrency_limit, 2),
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "completed": self.completed,
+                "throttled": self.throttled,
+                "failed": self.failed,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "requests_available": int(self.requests.available),
+                "tokens_available": int(self.tokens.available),
+            }
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(model: str) -> RateLimiter:
+    """The process-wide limiter for a model, created from settings on first use."""
+    with _limiters_lock:
+        if model not in _limiters:
+            settings = get_settings()
+            _limiters[model] = RateLimiter(
+                model,
+                requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.GEMINI_TOKENS_PER_MINUTE,
+                max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            )
+        return _limiters[model]
+
+def rate_limiter_metrics() -> dict:
+    with _limiters_lock:
+        return {model: limiter.metrics() for model, limiter in _limiters.items()}
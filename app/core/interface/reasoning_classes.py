@@ -1,20 +1,25 @@
 from pydantic import BaseModel
-from typing import Any, List
+from typing import Any, List, Optional
 
 class SubQueryContext:
-    def __init__(self, subquery: str, graph_query: str, vector_context: Any, knowledge_graph_context: Any):
+    def __init__(self, subquery: str, graph_query: str, vector_context: Any, knowledge_graph_context: Any, merged_queries: Optional[List[str]] = None):
         self.subquery = subquery
         self.graph_query = graph_query
         self.vector_context = vector_context
         self.knowledge_graph_context = knowledge_graph_context
+        # Near-duplicate subqueries answered by this context
+        self.merged_queries = merged_queries or []
 
 class ReasoningStep(BaseModel):
     query: str
     properties: str
     context: Any
+    merged_queries: List[str] = []
 
 class ThinkingOutput(BaseModel):
     reasoning: List[ReasoningStep]
     final_answer: str
-    table: List[dict]
+    table: Optional[List[dict]] = None
+    # Handle to fetch the table from when it is composed after the answer
+    table_id: Optional[str] = None
   
\ No newline at end of file
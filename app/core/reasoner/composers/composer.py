@@ -2,6 +2,7 @@ from app.initialization import gemini_pro_model_langchain
 from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from app.core.interface.reasoning_classes import SubQueryContext
 from langchain_core.output_parsers import JsonOutputParser
+from app.core.common.rate_limiter import estimate_tokens, get_rate_limiter
 
 class Composer:
     
@@ -102,6 +103,7 @@ class Composer:
 
     def __init__(self):
         self.general_llm = gemini_pro_model_langchain
+        self.limiter = get_rate_limiter(getattr(self.general_llm, "model", "default"))
         
     def build_context_composer_prompt(self, context : SubQueryContext):
         # Combine the system and human templates into a chat prompt
@@ -110,8 +112,11 @@ class Composer:
             HumanMessagePromptTemplate.from_template(self.CONTEXT_COMPOSER_INPUT_TEMPLATE)
         ])
 
+        query = context.subquery
+        if context.merged_queries:
+            query += "\n" + "\n".join(context.merged_queries)
         formatted_prompt = chat_prompt.format(
-            query=context.subquery,
+            query=query,
             knowledge_graph=context.knowledge_graph_context,
             vector_store_context=context.vector_context
         )
@@ -131,7 +136,21 @@ class Composer:
         final_table = parser.parse(table_response.content)
         return final_table
     
+    async def aget_table_from_output(self, input_text: str):
+        table_prompt = self.build_table_composer_prompt(input_text)
+        table_response = await self.limiter.call(
+            self.general_llm.ainvoke, table_prompt, estimated_tokens=estimate_tokens(table_prompt)
+        )
+        return JsonOutputParser().parse(table_response.content)
+    
     def get_context_from_subquery(self, subquery_context: SubQueryContext):
         context_prompt = self.build_context_composer_prompt(subquery_context)
         context_response = self.general_llm.invoke(context_prompt)
+        return context_response.content
+
+    async def aget_context_from_subquery(self, subquery_context: SubQueryContext):
+        context_prompt = self.build_context_composer_prompt(subquery_context)
+        context_response = await self.limiter.call(
+            self.general_llm.ainvoke, context_prompt, estimated_tokens=estimate_tokens(context_prompt)
+        )
         return context_response.content
\ No newline at end of file
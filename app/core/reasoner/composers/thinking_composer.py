@@ -3,6 +3,7 @@ from app.initialization import google_client, gemini_pro_model_langchain
 from langchain.prompts import PromptTemplate
 from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from app.core.interface.reasoning_classes import ReasoningStep 
+from app.core.common.rate_limiter import estimate_tokens, get_rate_limiter
 import logging
 
 class ThinkingComposer:
@@ -35,6 +36,7 @@ class ThinkingComposer:
             input_variables=["original_query", "formatted_reasoning_steps"],
             template=self.QUERY_COMPOSER_TEMPLATE
         )
+        self.limiter = get_rate_limiter(getattr(self.thinking_client, "model", "default"))
         
     def format_reasoning_steps(self, reasoning_steps: List[ReasoningStep]) -> str:
         """
@@ -88,4 +90,20 @@ class ThinkingComposer:
         # logging.info("Extracted thinking output: %s", thinking_output)
         
         return thinking_output
+
+    async def athink(self, original_query: str, reasoning_steps: List[ReasoningStep]):
+        context = self.generate_thinking_context(original_query, reasoning_steps)
+        logging.info("Generating thinking output.")
+        output = await self.limiter.call(self.thinking_client.ainvoke, context, estimated_tokens=estimate_tokens(context))
+        return output.content
+
+    async def astream(self, original_query: str, reasoning_steps: List[ReasoningStep]):
+        """Final answer tokens as the model generates them"""
+        context = self.generate_thinking_context(original_query, reasoning_steps)
+        logging.info("Streaming thinking output.")
+        async for chunk in self.limiter.stream(
+            self.thinking_client.astream, context, estimated_tokens=estimate_tokens(context)
+        ):
+            if chunk.content:
+                yield chunk.content
         
\ No newline at end of file
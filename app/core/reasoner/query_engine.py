@@ -5,6 +5,7 @@ from langchain.chains import LLMChain
 from pydantic import BaseModel, Field
 from typing import List
 from app.initialization import gemini_pro_model_langchain
+from app.config import get_settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -47,6 +48,12 @@ class QueryEngine:
     Here is the user query: {subquery}
     """
 
+    DECOMPOSITION_TEMPLATE = COMBINED_TEMPLATE + """
+    3. Extract graph keywords: For each sub-question, also list only the possible nodes (key entities) it refers to, for a property graph index.
+    Do not include relationships, explanations, or additional context, and return them as: <node_1>, <node_2>, <node_3>, ...
+    For example, for the sub-question "How do LLMs work?" the graph keywords are: LLMs, Working
+    """
+
     def __init__(self):
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", self.COMBINED_TEMPLATE),
@@ -54,6 +61,11 @@ class QueryEngine:
         ])
         self.parser = PydanticToolsParser(tools=[self.SubQuery])
         self.query_analyzer = self.prompt | gemini_pro_model_langchain.with_structured_output(self.SubQuery)
+        self.decomposition_prompt = ChatPromptTemplate.from_messages([
+            ("system", self.DECOMPOSITION_TEMPLATE),
+            ("human", "{query}"),
+        ])
+        self.query_decomposer = self.decomposition_prompt | gemini_pro_model_langchain.with_structured_output(self.DecomposedQuery)
 
     class SubQuery(BaseModel):
         sub_queries: List[str] = Field(
@@ -61,6 +73,12 @@ class QueryEngine:
             description="A list of very specific subqueries against the database.",
         )
 
+    class DecomposedQuery(BaseModel):
+        sub_queries: List[SubQueryResult] = Field(
+            ...,
+            description="A list of very specific subqueries against the database, each with its property graph keywords.",
+        )
+
     def build_property_graph_chain(self, llm):
         prompt_template = PromptTemplate(
             template=self.PROPERTY_GRAPH_TEMPLATE,
@@ -80,8 +98,29 @@ class QueryEngine:
         
         return results
 
+    def decompose_query(self, query: str) -> List[SubQueryResult]:
+        """
+        Subqueries and their graph keywords from a single structured call
+
+        Subqueries that came back without keywords get them from the property graph chain.
+        """
+        decomposed = self.query_decomposer.invoke({"query": query})
+        if not decomposed or not decomposed.sub_queries:
+            raise ValueError("Query decomposition returned no subqueries")
+        results = decomposed.sub_queries
+        missing = [result.sub_query for result in results if not result.graph_query.strip()]
+        if missing:
+            completed = iter(self.process_subqueries(gemini_pro_model_langchain, missing))
+            results = [result if result.graph_query.strip() else next(completed) for result in results]
+        return results
+
     def process_query(self, query: str):
         logger.info(f"Processing query: {query}")
+        if get_settings().QUERY_DECOMPOSITION_MODE == "combined":
+            try:
+                return self.decompose_query(query)
+            except Exception as e:
+                logger.warning(f"Combined query decomposition failed, falling back to per-subquery calls: {e}")
         subqueries = self.query_analyzer.invoke({"query": query})
         results = self.process_subqueries(gemini_pro_model_langchain, subqueries.sub_queries)
         
@@ -1,23 +1,37 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from app.core.interface.reasoning_classes import SubQueryContext , ReasoningStep, ThinkingOutput
 from app.core.reasoner.query_engine import QueryEngine , SubQueryResult
 from app.core.reasoner.retrievers.vector_retriever import VectorRetriever
 from app.core.reasoner.retrievers.knowledge_graph_retriever import KnowledgeGraphRetriever
+from app.core.reasoner.retrievers.sparse_retriever import SparseRetriever
+from app.core.reasoner.retrievers.fusion import reciprocal_rank_fusion
+from app.core.reasoner.subquery_clusters import collapse_subqueries
+from app.initialization import gemini_langchain_embeddings
+from app.config import get_settings
 from .composers.composer import Composer
 from .composers.thinking_composer import ThinkingComposer
+from .table_service import table_service
 import logging
 import json
 from app.logging_config import reasoning_logger
 logger = logging.getLogger(__name__)
 
+# Retrieval calls run here rather than on the default executor. A call that times out
+# is abandoned, not cancelled, and holds its thread until it returns; the bounded pool
+# caps how many can pile up and keeps them from starving asyncio.to_thread callers.
+retrieval_executor = ThreadPoolExecutor(max_workers=get_settings().RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
 # subqueries = [SubQueryResult(sub_query='What are the unique characteristics of Large Language Models (LLMs)?', graph_query='Large Language Models, Characteristics'), SubQueryResult(sub_query='What factors have contributed to the success of LLMs?', graph_query='Factors, Success, LLMs'), SubQueryResult(sub_query='Are the unique characteristics of LLMs the sole reason for their success?', graph_query='LLMs, Unique_characteristics, Success')]
 
 
 class ReasoningEngine:
     
-    def __init__(self, username: str, query: str):
+    def __init__(self, username: str, query: str, hybrid: bool = None):
         self.username = username
         self.query = query
+        self.hybrid = get_settings().HYBRID_RETRIEVAL if hybrid is None else hybrid
         reasoning_logger.info("Reasoning Engine initialized for project: %s", username)
         reasoning_logger.info("Query provided: %s", query)
 
@@ -27,66 +41,164 @@ class ReasoningEngine:
         logger.info("Subqueries generated: %s", subqueries)
         return subqueries
 
-    def send_subqueries_to_retrievers(self, subqueries: List[SubQueryResult], index_name) -> List[SubQueryContext]:
-        logger.info("Sending subqueries to retrievers for index: %s", index_name)
-        vector_retriever = VectorRetriever(index_name=index_name)
-        kg_retriever = KnowledgeGraphRetriever(index_name=index_name)
-        
-        results = []
-        for subquery in subqueries:
-            logger.info("Processing subquery: %s", subquery)
-            vector_results = vector_retriever.retrieve(subquery.sub_query)
-            kg_results = kg_retriever.retrieve(subquery.graph_query)
-            result_struct = SubQueryContext(
-                subquery=subquery.sub_query,
-                graph_query=subquery.graph_query,
-                vector_context=vector_results,
-                knowledge_graph_context=kg_results
-            )
-            results.append(result_struct)
-        
-        logger.info("All subqueries processed with results: %s", results)
-        return results
-    
-    def compose_subqueries(self, subqueries: List[SubQueryContext]) -> List[ReasoningStep]:
-        logger.info("Composing reasoning steps for original query: %s", self.query)
-        composer = Composer()
-        reasoning_steps = []
-        for subquery in subqueries:
-            logger.info("Composing reasoning step for subquery: %s", subquery)
-            context = composer.get_context_from_subquery(subquery)
-            reasoning_step = ReasoningStep(
+    def collapse_subqueries(self, subqueries: List[SubQueryResult]):
+        """
+        Embed all subqueries in one batch and fold near-paraphrases together
+
+        Returns (subqueries, embeddings, merged_queries) with one entry per distinct
+        subquery. If embedding fails, every subquery is kept and embedded at retrieval.
+        """
+        if not subqueries:
+            return [], [], []
+        try:
+            vectors = gemini_langchain_embeddings.embed_queries([subquery.sub_query for subquery in subqueries])
+        except Exception as e:
+            logger.error("Batched subquery embedding failed, retrieving every subquery: %s", e)
+            return subqueries, [None] * len(subqueries), [[] for _ in subqueries]
+        collapsed = collapse_subqueries(subqueries, vectors, get_settings().SUBQUERY_COLLAPSE_THRESHOLD)
+        if len(collapsed) < len(subqueries):
+            logger.info("Collapsed %d subqueries into %d", len(subqueries), len(collapsed))
+        return tuple(list(column) for column in zip(*collapsed))
+
+    async def open_retrievers(self, index_name):
+        """(vector, knowledge graph, sparse) retrievers of the index, loaded concurrently"""
+        return await asyncio.gather(
+            asyncio.to_thread(VectorRetriever, index_name=index_name),
+            asyncio.to_thread(KnowledgeGraphRetriever, index_name=index_name),
+            asyncio.to_thread(SparseRetriever, index_name=index_name) if self.hybrid else self._no_retriever(),
+        )
+
+    @staticmethod
+    async def _no_retriever():
+        return None
+
+    async def retrieve_subquery(self, retrievers, semaphore, subquery: SubQueryResult, embedding=None, merged_queries=None) -> SubQueryContext:
+        logger.info("Processing subquery: %s", subquery)
+        vector_retriever, kg_retriever, sparse_retriever = retrievers
+        vector_results, kg_results = await asyncio.gather(
+            self._bounded_retrieval(
+                semaphore, "Vector", subquery.sub_query,
+                self.retrieve_passages, vector_retriever, sparse_retriever, subquery.sub_query, 3, embedding
+            ),
+            self._bounded_retrieval(semaphore, "Knowledge graph", subquery.graph_query, kg_retriever.retrieve, subquery.graph_query),
+        )
+        return SubQueryContext(
+            subquery=subquery.sub_query,
+            graph_query=subquery.graph_query,
+            vector_context=vector_results,
+            knowledge_graph_context=kg_results,
+            merged_queries=merged_queries
+        )
+
+    @staticmethod
+    async def _bounded_retrieval(semaphore, name, query, func, *args):
+        """
+        Run one retrieval call on the shared retrieval pool
+
+        The request's semaphore caps its concurrent calls at RETRIEVAL_MAX_CONCURRENCY and
+        each call is bounded by RETRIEVAL_TIMEOUT_SECONDS. A call that fails or times out
+        contributes empty context instead of failing the whole query; a timed-out call is
+        abandoned and finishes in the background.
+        """
+        timeout = get_settings().RETRIEVAL_TIMEOUT_SECONDS
+        async with semaphore:
+            try:
+                call = asyncio.get_running_loop().run_in_executor(retrieval_executor, func, *args)
+                return await asyncio.wait_for(call, timeout)
+            except asyncio.TimeoutError:
+                logger.error("%s retrieval timed out after %ss for: %s", name, timeout, query)
+            except Exception as e:
+                logger.error("%s retrieval failed for %s: %s", name, query, e)
+            return ""
+
+    def retrieve_passages(self, vector_retriever, sparse_retriever, query: str, max_results: int = 3, embedding=None) -> str:
+        """Vector results, fused with BM25 keyword results by reciprocal rank when the user has a sparse index."""
+        if not (sparse_retriever and sparse_retriever.available):
+            return vector_retriever.retrieve(query, max_results=max_results, embedding=embedding)
+        fused = reciprocal_rank_fusion([
+            vector_retriever.retrieve_ranked(query, max_results, embedding),
+            sparse_retriever.search(query, max_results),
+        ])
+        logger.info("Fused %d vector and keyword passages for: %s", len(fused), query)
+        return " ".join(text for _, text in fused[:max_results])
+
+    async def acompose_subquery(self, composer: Composer, subquery: SubQueryContext) -> ReasoningStep:
+        logger.info("Composing reasoning step for subquery: %s", subquery)
+        context = await composer.aget_context_from_subquery(subquery)
+        return self.reasoning_step(subquery, context)
+
+    def reasoning_step(self, subquery: SubQueryContext, context) -> ReasoningStep:
+        reasoning_step = ReasoningStep(
             query=subquery.subquery,
             properties=subquery.graph_query,
-            context=context
-            )
-            logger.info("Reasoning step created: %s", reasoning_step)
-            reasoning_logger.info("Reasoning step created: %s", reasoning_step)
-            reasoning_steps.append(reasoning_step)
-        
-        return reasoning_steps
-    
-    def compose_answer(self, reasoning_steps: List[ReasoningStep]) -> str:
-        logger.info("Composing final answer for original query: %s", self.query)
-        composer = ThinkingComposer()
-        final_answer = composer.think(self.query ,reasoning_steps)
-        return final_answer    
-    
-    def compose_table(self, final_answer: str) -> str:
-        logger.info("Composing table for final answer: ")
-        composer = Composer()
-        table = composer.get_table_from_output(final_answer)
-        reasoning_logger.info("Table composed: %s", table)
-        return table
+            context=context,
+            merged_queries=subquery.merged_queries
+        )
+        logger.info("Reasoning step created: %s", reasoning_step)
+        reasoning_logger.info("Reasoning step created: %s", reasoning_step)
+        return reasoning_step
     
-    def start_reasoning(self):
+    def start_reasoning(self, on_event=None):
+        return asyncio.run(self.astart_reasoning(on_event))
+
+    async def astart_reasoning(self, on_event=None):
+        """
+        Run the pipeline as a DAG
+
+        Retrievers load while the query is decomposed. Each subquery then runs its own
+        retrieve -> compose chain concurrently with the others, the composer calls sharing
+        the model's rate limiter as the global LLM concurrency cap. Synthesis starts once
+        the last chain finishes, so latency is about one chain plus synthesis.
+
+        Args:
+            on_event: Optional callback invoked with (event, data) as results become
+                available: "step" per composed reasoning step, "token" per final answer
+                chunk, which is then streamed from the model, and a trailing "table",
+                or "table_handle" when the table is composed after the answer
+        """
+        emit = on_event or (lambda event, data: None)
         logger.info("Starting process_reasoning for project: %s", self.username)
-        subqueries = self.generate_reasoning()
-        retrieved_results = self.send_subqueries_to_retrievers(subqueries, self.username)
-        reasoning_steps = self.compose_subqueries(retrieved_results)
-        final_answer = self.compose_answer(reasoning_steps)
+        opening_retrievers = asyncio.create_task(self.open_retrievers(self.username))
+        try:
+            subqueries = await asyncio.to_thread(self.generate_reasoning)
+            subqueries, embeddings, merged_queries = await asyncio.to_thread(self.collapse_subqueries, subqueries)
+        except BaseException:
+            opening_retrievers.cancel()
+            raise
+        retrievers = await opening_retrievers
+
+        semaphore = asyncio.Semaphore(get_settings().RETRIEVAL_MAX_CONCURRENCY)
+        composer = Composer()
+
+        async def subquery_chain(index, subquery, embedding, merged):
+            context = await self.retrieve_subquery(retrievers, semaphore, subquery, embedding, merged)
+            reasoning_step = await self.acompose_subquery(composer, context)
+            emit("step", {"index": index, "step": reasoning_step})
+            return reasoning_step
+
+        reasoning_steps = list(await asyncio.gather(*(
+            subquery_chain(index, subquery, embedding, merged)
+            for index, (subquery, embedding, merged) in enumerate(zip(subqueries, embeddings, merged_queries))
+        )))
+
+        logger.info("Composing final answer for original query: %s", self.query)
+        thinking_composer = ThinkingComposer()
+        if on_event:
+            chunks = []
+            async for chunk in thinking_composer.astream(self.query, reasoning_steps):
+                chunks.append(chunk)
+                emit("token", {"text": chunk})
+            final_answer = "".join(chunks)
+        else:
+            final_answer = await thinking_composer.athink(self.query, reasoning_steps)
         reasoning_logger.info("Final answer composed: %s", final_answer)
-        output_table = self.compose_table(final_answer)
+        output_table, table_id = None, None
+        if get_settings().TABLE_COMPOSITION == "eager":
+            output_table = await composer.aget_table_from_output(final_answer)
+            reasoning_logger.info("Table composed: %s", output_table)
+            emit("table", output_table)
+        else:
+            table_id = table_service.submit(final_answer)
+            emit("table_handle", {"table_id": table_id})
         logger.info("Process_reasoning completed for project: %s", self.username)
-        return ThinkingOutput(reasoning=reasoning_steps, final_answer=final_answer, table=output_table)
-
+        return ThinkingOutput(reasoning=reasoning_steps, final_answer=final_answer, table=output_table, table_id=table_id)
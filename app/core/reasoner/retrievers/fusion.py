@@ -0,0 +1,19 @@
+from typing import Dict, List, Tuple
+
+# Damping constant of reciprocal rank fusion, 60 as in Cormack et al.
+RRF_K = 60
+
+def reciprocal_rank_fusion(rankings: List[List[Tuple[str, str]]], k: int = RRF_K) -> List[Tuple[str, str]]:
+    """
+    Fuse ranked (key, text) lists by summing 1 / (k + rank) per key.
+
+    Keys found by several retrievers rise to the top; the text of the first list a key
+    appears in is kept.
+    """
+    scores: Dict[str, float] = {}
+    texts: Dict[str, str] = {}
+    for ranking in rankings:
+        for rank, (key, text) in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            texts.setdefault(key, text)
+    return [(key, texts[key]) for key in sorted(scores, key=scores.get, reverse=True)]
@@ -1,15 +1,23 @@
 import logging
+import os
 from llama_index.core.indices.property_graph import (
     PGRetriever,
     VectorContextRetriever,
     LLMSynonymRetriever,
 )
 
+from app.config import get_settings
+from app.initialization import gemini_embeddings_model
 from app.core.builder.indexer.knowledge_graph_indexer import KnowledgeGraphIndexer
+from app.storage.graph_lexicon import GraphLexicon, load_graph_lexicon
+from app.storage.sqlite_graph_store import SQLitePropertyGraphStore
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Relations expanded around the linked entities in fast mode
+FAST_PATH_LIMIT = 30
+
 class KnowledgeGraphRetriever:
     """Retriever class for knowledge graph based retrieval"""
     
@@ -17,6 +25,19 @@ class KnowledgeGraphRetriever:
         """Initialize the retriever with a knowledge graph index"""
         kg_index = KnowledgeGraphIndexer()
         self.index = kg_index.get_index_from_storage(index_name)
+        self.fast_mode = get_settings().KG_RETRIEVAL_MODE == "fast" and isinstance(
+            getattr(self.index, "property_graph_store", None), SQLitePropertyGraphStore
+        )
+
+    def _get_lexicon(self):
+        """The entity lexicon of the index, built on first use for graphs indexed before it existed."""
+        store = self.index.property_graph_store
+        persist_dir = os.path.dirname(store.db_path)
+        lexicon = load_graph_lexicon(persist_dir)
+        if lexicon is None:
+            GraphLexicon.build_from_store(store).save(persist_dir)
+            lexicon = load_graph_lexicon(persist_dir)
+        return lexicon
         
     def _process_source_nodes(self, source_nodes):
         """
@@ -52,6 +73,8 @@ class KnowledgeGraphRetriever:
             List of relevant nodes/documents from the knowledge graph
         """
         try:
+            if self.fast_mode:
+                return self.retrieve_fast(query, max_results)
             logger.info(f"Retrieving results for query from KG retriever: {query}")
             sub_retrievers = [
                 VectorContextRetriever(self.index.property_graph_store, ...),
@@ -73,4 +96,28 @@ class KnowledgeGraphRetriever:
             logger.error(f"Error retrieving results: {e}")
             raise
 
+    def retrieve_fast(self, query, max_results=5):
+        """
+        Retrieve without the per-query LLM synonym expansion
+
+        The comma-separated keywords of the query are linked to entities through the
+        precomputed lexicon and expanded over the adjacency, alongside the vector
+        context retriever over node embeddings.
+
+        Returns:
+            str: Graph paths followed by the text of the sections they were extracted from
+        """
+        logger.info(f"Retrieving results for query from fast KG retriever: {query}")
+        store = self.index.property_graph_store
+        lexicon = self._get_lexicon()
+        entity_ids = lexicon.link_keywords(query)
+        paths = lexicon.expand(entity_ids, depth=get_settings().KG_TRAVERSAL_DEPTH, limit=FAST_PATH_LIMIT)
+        logger.info(f"Linked {len(entity_ids)} entities, expanded {len(paths)} paths")
+
+        path_lines = [f"{source} -> {label} -> {target}" for source, label, target, _ in paths]
+        chunk_ids = list(dict.fromkeys(chunk_id for *_, chunk_id in paths if chunk_id))[:max_results]
+        chunk_texts = [node.text for node in store.get(ids=chunk_ids) if getattr(node, "text", None)]
 
+        vector_retriever = VectorContextRetriever(store, include_text=True, embed_model=gemini_embeddings_model)
+        source_nodes = vector_retriever.retrieve(query)[:max_results]
+        return " ".join(filter(None, ["\n".join(path_lines), " ".join(chunk_texts), self._process_source_nodes(source_nodes)]))
@@ -0,0 +1,34 @@
+import logging
+from typing import List, Tuple
+
+from app.core.builder.indexer.sparse_indexer import SparseIndexer
+
+logger = logging.getLogger(__name__)
+
+class SparseRetriever:
+    """Retriever class for BM25 keyword retrieval over the user's sections"""
+
+    def __init__(self, index_name: str):
+        """Initialize the retriever with the user's BM25 index, backfilled from the docstore if never built"""
+        self.index = SparseIndexer().load_or_backfill(index_name)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.index)
+
+    def search(self, query: str, max_results: int = 5) -> List[Tuple[str, str]]:
+        """
+        Ranked (doc_id, text) sections matching the query terms
+
+        Args:
+            query (str): The query string to search for
+            max_results (int): Maximum number of results to return (default: 5)
+        """
+        if not self.available:
+            return []
+        hits = self.index.search(query, top_k=max_results)
+        logger.info(f"Retrieved {len(hits)} keyword results for query: {query}")
+        return [(doc_id, text) for doc_id, text, _ in hits]
+
+    def retrieve(self, query: str, max_results: int = 5) -> str:
+        return " ".join(text for _, text in self.search(query, max_results))
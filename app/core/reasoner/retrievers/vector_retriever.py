@@ -1,8 +1,8 @@
 import logging
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from collections import defaultdict
 
-from app.core.common.multivector_retriever import MultiVectorRetrieverBuilder
+from app.core.common.multivector_retriever import retriever_pool
 
 
 logger = logging.getLogger(__name__)
@@ -16,8 +16,7 @@ class VectorRetriever:
         Args:
             index_name (str): Name of the vector index to use
         """
-        multi_vector_retriever = MultiVectorRetrieverBuilder()
-        self.retriever = multi_vector_retriever.build(index_name)
+        self.retriever = retriever_pool.get(index_name)
         
     def retrieve_with_threshold(self,search_results: List,score_threshold: float = 0.7) -> Tuple[List, str]:
         """
@@ -40,11 +39,12 @@ class VectorRetriever:
                         doc.metadata["score"] = score
                         id_to_doc[doc_id].append(doc)
             
-            # Fetch parent documents and attach sub-documents
+            # Fetch all parent documents in one batch and attach sub-documents
             filtered_docs = []
-            for doc_id, sub_docs in id_to_doc.items():
-                docstore_docs = self.retriever.docstore.mget([doc_id])
-                if docstore_docs and (doc := docstore_docs[0]):
+            docstore_docs = self.retriever.docstore.mget(list(id_to_doc)) if id_to_doc else []
+            for (doc_id, sub_docs), doc in zip(id_to_doc.items(), docstore_docs):
+                if doc:
+                    doc.metadata["doc_id"] = doc_id
                     doc.metadata["sub_docs"] = sub_docs
                     filtered_docs.append(doc)
             
@@ -54,20 +54,27 @@ class VectorRetriever:
             logger.error(f"Error retrieving results with threshold: {e}")
             raise
     
-    def retrieve(self, query: str, max_results: int = 3) -> Tuple[List, str]:
+    def search(self, query: str, max_results: int, embedding: Optional[List[float]] = None) -> List:
+        """Scored sub-documents for the query, searched by its precomputed embedding when given"""
+        if embedding is not None:
+            return self.retriever.vectorstore.similarity_search_by_vector_with_score(embedding, k=max_results)
+        return self.retriever.vectorstore.similarity_search_with_score(query, k=max_results)
+
+    def retrieve(self, query: str, max_results: int = 3, embedding: Optional[List[float]] = None) -> Tuple[List, str]:
         """
         Retrieve relevant information from the vector store based on the query
         
         Args:
             query (str): The query string to search for
             max_results (int): Maximum number of results to return (default: 5)
+            embedding (List[float]): Precomputed query embedding, skips embedding the query
             
         Returns:
             tuple: (List of source nodes, Combined text string)
         """
         try:
             logger.info(f"Retrieving results for query: {query}")
-            source_nodes = self.retriever.vectorstore.similarity_search_with_score(query , k = max_results)
+            source_nodes = self.search(query, max_results, embedding)
             filtered_docs = self.retrieve_with_threshold(source_nodes)
             combined_text = self._process_source_nodes(filtered_docs)
             logger.info(f"Retrieved {len(filtered_docs)} results for query")
@@ -77,6 +84,19 @@ class VectorRetriever:
             logger.error(f"Error retrieving results: {e}")
             raise
             
+    def retrieve_ranked(self, query: str, max_results: int = 3, embedding: Optional[List[float]] = None) -> List[Tuple[str, str]]:
+        """
+        Retrieve parent documents as ranked (doc_id, text) pairs, best match first
+
+        Args:
+            query (str): The query string to search for
+            max_results (int): Maximum number of results to return (default: 3)
+            embedding (List[float]): Precomputed query embedding, skips embedding the query
+        """
+        source_nodes = self.search(query, max_results, embedding)
+        filtered_docs = self.retrieve_with_threshold(source_nodes)
+        return [(doc.metadata["doc_id"], self._process_source_nodes([doc])) for doc in filtered_docs]
+
     def _process_source_nodes(self, source_nodes: List) -> str:
         """
         Process source nodes and concatenate their text content
@@ -0,0 +1,55 @@
+from typing import List, Sequence, Tuple
+import numpy as np
+
+def cluster_by_similarity(vectors: Sequence[Sequence[float]], threshold: float) -> List[List[int]]:
+    """
+    Greedy single-pass clustering by cosine similarity
+
+    Each vector joins the first cluster whose representative (its first member) it
+    matches with similarity >= threshold, and otherwise starts a new cluster. Clusters
+    and their members keep the input order.
+    """
+    if not len(vectors):
+        return []
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.where(norms == 0, 1.0, norms)
+    similarities = matrix @ matrix.T
+
+    clusters = []
+    for i in range(len(matrix)):
+        for cluster in clusters:
+            if similarities[i, cluster[0]] >= threshold:
+                cluster.append(i)
+                break
+        else:
+            clusters.append([i])
+    return clusters
+
+def merge_graph_queries(graph_queries: Sequence[str]) -> str:
+    """Union of comma-separated graph keywords, first occurrence order, case-insensitively deduplicated."""
+    seen, keywords = set(), []
+    for graph_query in graph_queries:
+        for keyword in graph_query.split(","):
+            keyword = keyword.strip()
+            if keyword and keyword.lower() not in seen:
+                seen.add(keyword.lower())
+                keywords.append(keyword)
+    return ", ".join(keywords)
+
+def collapse_subqueries(subqueries, vectors, threshold: float) -> List[Tuple[object, List[float], List[str]]]:
+    """
+    Collapse near-duplicate subqueries before retrieval
+
+    Returns one (subquery, embedding, merged_queries) per cluster: the first subquery of
+    the cluster with the graph keywords of all its members, its embedding, and the text
+    of the subqueries folded into it.
+    """
+    collapsed = []
+    for cluster in cluster_by_similarity(vectors, threshold):
+        members = [subqueries[i] for i in cluster]
+        representative = members[0].model_copy(
+            update={"graph_query": merge_graph_queries([member.graph_query for member in members])}
+        )
+        collapsed.append((representative, vectors[cluster[0]], [member.sub_query for member in members[1:]]))
+    return collapsed
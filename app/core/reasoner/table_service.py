@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+from app.config import get_settings
+from app.data_layer.services.conversation_service import ConversationService
+from .composers.composer import Composer
+
+logger = logging.getLogger(__name__)
+
+class TableService:
+    """
+    Builds answer tables off the critical path of reasoning.
+
+    submit registers a final answer under a table handle and, in background mode,
+    starts composing its table in a worker thread right away; in on_demand mode the
+    table is composed on the first get. Handles are kept in a bounded LRU that never
+    evicts a table still being composed. A handle attached to a stored chat message gets
+    its table written onto that message once built, so later reads, including after a
+    restart, come from the conversation instead of the LLM.
+    """
+
+    def __init__(self, mode: str, max_entries: int, workers: int):
+        self.mode = mode
+        self.max_entries = max_entries
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="table")
+        self.entries = OrderedDict()
+        # Reentrant: a future that is already done runs its done callback in _start
+        self.lock = threading.RLock()
+        self.built = 0
+        self.failed = 0
+        self.requested = 0
+
+    def submit(self, final_answer: str, table_id: str = None) -> str:
+        table_id = table_id or str(uuid.uuid4())
+        with self.lock:
+            self._register(table_id, final_answer)
+            if self.mode == "background":
+                self._start(table_id)
+        return table_id
+
+    def _register(self, table_id: str, final_answer: str):
+        self.entries[table_id] = {"final_answer": final_answer, "future": None, "attachments": []}
+        excess = len(self.entries) - self.max_entries
+        if excess > 0:
+            # Least recently used first, skipping the new handle and tables being composed
+            evictable = [
+                key for key, entry in self.entries.items()
+                if key != table_id and (entry["future"] is None or entry["future"].done())
+            ]
+            for key in evictable[:excess]:
+                del self.entries[key]
+
+    def _start(self, table_id: str) -> Future:
+        entry = self.entries[table_id]
+        if entry["future"] is None:
+            entry["future"] = self.executor.submit(self._compose, entry["final_answer"])
+            entry["future"].add_done_callback(lambda future: self._persist(entry, future))
+        return entry["future"]
+
+    def _compose(self, final_answer: str) -> List[dict]:
+        try:
+            table = Composer().get_table_from_output(final_answer)
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        with self.lock:
+            self.built += 1
+        return table
+
+    def attach(self, table_id: str, conversation_id: str, message_id: str):
+        """Write the table onto the stored message once it is built"""
+        with self.lock:
+            entry = self.entries.get(table_id)
+            if entry is None:
+                return
+            entry["attachments"].append((str(conversation_id), message_id))
+            future = entry["future"]
+        if future is not None and future.done():
+            self._persist(entry, future)
+
+    def _persist(self, entry: dict, future: Future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self.lock:
+            attachments, entry["attachments"] = entry["attachments"], []
+        if not attachments:
+            return
+        service = ConversationService()
+        for conversation_id, message_id in attachments:
+            try:
+                service.set_message_table(conversation_id, message_id, future.result())
+            except Exception as e:
+                logger.error(f"Failed to store table on message {message_id}: {e}")
+
+    def for_message(self, conversation_id: str, message) -> Future:
+        """
+        The table of a stored chat message that has a table_id but no table yet
+
+        The handle is registered again from the message content if it was evicted or
+        did not survive a restart, and the table is written onto the message once built.
+        """
+        with self.lock:
+            if message.table_id not in self.entries:
+                self._register(message.table_id, message.content)
+            entry = self.entries[message.table_id]
+            entry["attachments"].append((str(conversation_id), message.id))
+            self.entries.move_to_end(message.table_id)
+            self.requested += 1
+            future = self._start(message.table_id)
+        if future.done():
+            self._persist(entry, future)
+        return future
+
+    def has(self, table_id: str) -> bool:
+        with self.lock:
+            return table_id in self.entries
+
+    async def get(self, table_id: str) -> Optional[List[dict]]:
+        """The table of a handle, composing it now if it was not started; None for unknown handles"""
+        with self.lock:
+            if table_id not in self.entries:
+                return None
+            self.entries.move_to_end(table_id)
+            self.requested += 1
+            future = self._start(table_id)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "mode": self.mode,
+                "entries": len(self.entries),
+                "built": self.built,
+                "failed": self.failed,
+                "requested": self.requested,
+            }
+
+table_service = TableService(
+    mode=get_settings().TABLE_COMPOSITION,
+    max_entries=get_settings().TABLE_CACHE_MAX_ENTRIES,
+    workers=get_settings().TABLE_WORKERS,
+)
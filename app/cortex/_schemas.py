@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-from typing import List
+from typing import Any, Callable, List, Optional
 
 from langchain_core.messages import AnyMessage
 from langgraph.graph import add_messages
-from typing_extensions import Annotated, TypedDict
+from typing_extensions import Annotated, NotRequired, TypedDict
 
 from app.data_layer.models.conversation import Message
 
@@ -14,6 +14,8 @@ class GraphConfig(TypedDict):
     """The thread ID of the conversation."""
     user_id: str
     """The ID of the user to remember in the conversation."""
+    on_event: NotRequired[Optional[Callable[[str, Any], None]]]
+    """Callback receiving the reasoning events of a knowledge search, for streamed runs."""
 
 
 # Define the schema for the state maintained throughout the conversation
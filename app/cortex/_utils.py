@@ -10,6 +10,7 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from lang_memgpt import _schemas as schemas
 from lang_memgpt import _settings as settings
 from app.storage.pinecone import PineconeStore
+from app.core.common.embedding_cache import CachedEmbeddings
 import os
 
 _DEFAULT_DELAY = 60  # seconds
@@ -40,7 +41,7 @@ class utils:
     @lru_cache
     @staticmethod
     def get_embeddings():
-        return GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key = os.getenv("GEMINI_API_KEY"))
+        return CachedEmbeddings(GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key = os.getenv("GEMINI_API_KEY")))
 
     @staticmethod
     def get_llm(model):
@@ -10,6 +10,7 @@ from langchain_core.messages import AIMessage
 from app.data_layer.services.conversation_service import ConversationService
 from app.data_layer.models.conversation import Message
 from ..core.reasoner.resoning_engine import ReasoningEngine
+from ..core.reasoner.table_service import table_service
 from langchain_core.runnables.config import (
     RunnableConfig,
     ensure_config,
@@ -43,20 +44,23 @@ def internal_knowledge_search(query: str) -> str:
     config = ensure_config()
     configurable = utils.ensure_configurable(config)
     reasoning = ReasoningEngine(username=configurable["user_id"], query=query)
-    response = reasoning.start_reasoning()
+    response = reasoning.start_reasoning(on_event=configurable.get("on_event"))
     conversation_service = ConversationService()
     reasoning_message = Message(
         sender="cortex",
         type="internal_knowledge",
         content=response.final_answer,
         reasoning=response.reasoning,
-        table=response.table
+        table=response.table,
+        table_id=response.table_id
     )
     conversation_service.store_message(
         message=reasoning_message,
         user_id=configurable["user_id"],
         conversation_id=configurable["thread_id"]
     )
+    if response.table_id:
+        table_service.attach(response.table_id, configurable["thread_id"], reasoning_message.id)
     return reasoning_message
 
 def format_thought_output(thought: Message) -> str:
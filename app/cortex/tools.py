@@ -1,9 +1,12 @@
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from typing import List
 from langchain_core.runnables.config import (
     ensure_config,
 )
+from app.config import get_settings
 from app.data_layer.models.conversation import Message
 from app.data_layer.services.conversation_service import ConversationService
+from app.core.reasoner.table_service import table_service
 from ._utils import utils
 from app.core.tools.table_operator import TableOperator
 from langchain.tools import Tool
@@ -32,7 +35,17 @@ def table_operator(input_text: str, table_modification_instruction:str) -> str:
     configurable = utils.ensure_configurable(config)
     conversation_service = ConversationService()
     current_conversation = conversation_service.get_conversation(configurable["thread_id"])
-    table = TableOperator.update_table_data(input_text=current_conversation, current_table=current_conversation.output_table, instructions=table_modification_instruction)
+    current_table = current_conversation.output_table
+    latest = conversation_service.latest_table_message(current_conversation)
+    if latest is not None and getattr(latest, "table", None) is None:
+        # The table of the latest answer is still being composed, or was never requested
+        try:
+            current_table = table_service.for_message(configurable["thread_id"], latest).result(
+                timeout=get_settings().TABLE_RESULT_TIMEOUT_SECONDS
+            )
+        except FutureTimeoutError:
+            return "The table of the latest answer is not ready yet. Tell the user to try the table change again in a moment."
+    table = TableOperator.update_table_data(input_text=current_conversation, current_table=current_table, instructions=table_modification_instruction)
     table_update_messsage = Message(
         sender="cortex",
         type="internal_knowledge",
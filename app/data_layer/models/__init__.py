@@ -1 +1,2 @@
-from .conversation import Message, Conversation
\ No newline at end of file
+from .conversation import Message, Conversation
+from .index_job import IndexJob
\ No newline at end of file
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Literal, Optional
+import uuid
+
+JobStatus = Literal["queued", "running", "completed", "failed"]
+
+class JobStage(BaseModel):
+    name: str
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+
+class IndexJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    file_name: str
+    content_type: Optional[str] = None
+    file_path: str
+    content_hash: Optional[str] = None
+    status: JobStatus = "queued"
+    stage: str = "queued"
+    stages: List[JobStage] = Field(default_factory=list)
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
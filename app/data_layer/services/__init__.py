@@ -1,3 +1,4 @@
 from .conversation_service import ConversationService
 from .document_service import DocumentService
-from .memory_service import MemoryService
\ No newline at end of file
+from .memory_service import MemoryService
+from .index_job_service import IndexJobService
\ No newline at end of file
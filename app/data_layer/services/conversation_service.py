@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from pymongo import ReturnDocument
 from app.data_layer.db_config import MongoDBConfig
@@ -26,12 +26,15 @@ class ConversationService:
         logger.debug("Processing message for user_id: %s; conversation_id: %s", user_id, conversation_id)
         if conversation_id:
             logger.info("Updating conversation with id '%s' for user '%s'", conversation_id, user_id)
+            updates = {"last_updated": datetime.utcnow()}
+            if getattr(message, "table", None) is not None:
+                updates["output_table"] = message.table
             # Directly update the conversation document without fetching it first.
             updated_doc = self.db["conversation"].find_one_and_update(
                 {"_id": ObjectId(conversation_id)},
                 {
                     "$push": {"messages": message.model_dump()},
-                    "$set": {"last_updated": datetime.utcnow()},
+                    "$set": updates,
                 },
                 return_document=ReturnDocument.AFTER,
             )
@@ -39,9 +42,6 @@ class ConversationService:
                 logger.error("Conversation with id '%s' not found", conversation_id)
                 raise ValueError(f"Conversation with id '{conversation_id}' not found.")
             
-            if hasattr(message, "table") and message.table is not None:
-                updated_doc["output_table"] = message.table
-            
             # updated_doc["_id"] = str(updated_doc["_id"])
             conversation = Conversation(**updated_doc)
             logger.info(conversation)
@@ -49,13 +49,54 @@ class ConversationService:
         else:
             logger.info("Creating new conversation for user '%s'", user_id)
             # Create a new conversation document if no conversation_id is provided.
-            conversation = Conversation(user_id=user_id, messages=[message])
+            conversation = Conversation(user_id=user_id, messages=[message], output_table=getattr(message, "table", None) or [])
             result = self.db["conversation"].insert_one(conversation.model_dump())
             conversation.id = result.inserted_id
             logger.info("Created new conversation with id '%s' for user '%s'", result.inserted_id, user_id)
         
         return conversation
     
+    def set_message_table(self, conversation_id: str, message_id: str, table: List[Dict]) -> None:
+        """
+        Store a table composed after the answer on its message.
+
+        The table also becomes the conversation's current table, unless a later message
+        already has or awaits one, so a slow composition never overwrites a newer table.
+        """
+        logger.info("Storing table on message '%s' of conversation '%s'", message_id, conversation_id)
+        document = self.db["conversation"].find_one_and_update(
+            {"_id": ObjectId(conversation_id)},
+            {"$set": {"messages.$[message].table": table}},
+            array_filters=[{"message.id": message_id}],
+            projection={"messages.id": 1, "messages.table_id": 1, "messages.table": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if document is None:
+            return
+        latest = next(
+            (message for message in reversed(document.get("messages", []))
+             if message.get("table") is not None or message.get("table_id")),
+            None,
+        )
+        if latest is not None and latest.get("id") == message_id:
+            self.db["conversation"].update_one({"_id": ObjectId(conversation_id)}, {"$set": {"output_table": table}})
+
+    def find_table_message(self, table_id: str) -> Optional[Tuple[str, Message]]:
+        """The conversation id and message carrying a table handle, None if no stored message has it."""
+        document = self.db["conversation"].find_one({"messages.table_id": table_id}, {"messages.$": 1})
+        if document is None:
+            return None
+        return str(document["_id"]), Message(**document["messages"][0])
+
+    @staticmethod
+    def latest_table_message(conversation: Conversation) -> Optional[Message]:
+        """The last message of a conversation that has or awaits a table."""
+        return next(
+            (message for message in reversed(conversation.messages)
+             if getattr(message, "table", None) is not None or getattr(message, "table_id", None)),
+            None,
+        )
+    
     def get_user_conversations(self, user_id: str) -> List[Conversation]:
         """Retrieve all conversations for a specific user."""
         logger.info("Retrieving conversations for user_id: %s", user_id)
@@ -1,5 +1,6 @@
 import logging
 from typing import List
+from pymongo import ReturnDocument
 from app.data_layer.db_config import MongoDBConfig
 from app.data_layer.models.document import Document
 
@@ -22,6 +23,17 @@ class DocumentService:
         # Return a new Document instance with the inserted data
         return document
     
+    def upsert_document(self, document: Document) -> Document:
+        """Insert the document, or replace the user's existing document with the same name."""
+        result = self.db["documents"].find_one_and_replace(
+            {"user_id": document.user_id, "name": document.name},
+            document.model_dump(exclude={"id"}),
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        document.id = str(result["_id"])
+        return document
+    
     def get_user_documents(self, user_id: str) -> List[Document]:
         """Retrieve all conversations for a specific user."""
         logger.info("Retrieving conversations for user_id: %s", user_id)
@@ -0,0 +1,171 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+from app.data_layer.sqlite_config import SQLiteConfig
+from app.data_layer.models.index_job import IndexJob, JobStage
+
+# Configure a logger for this module.
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class IndexJobService:
+    """
+    Persists ingestion jobs in the local SQLite store so queued work survives restarts.
+
+    Methods are called from worker threads and share one connection, so each runs
+    under a lock to keep its statements and commit together. Running jobs record the
+    queue that claimed them and a heartbeat it refreshes, so a job is only put back
+    on the queue once its owner has stopped or stopped beating.
+    """
+
+    def __init__(self):
+        db_config = SQLiteConfig()
+        self.db = db_config.connect()
+        self.lock = threading.RLock()
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS index_jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                body TEXT NOT NULL
+            )
+            """
+        )
+        # Added after the first release; stores created before carry no claim columns yet
+        columns = {row["name"] for row in self.db.execute("PRAGMA table_info(index_jobs)")}
+        if "claimed_by" not in columns:
+            self.db.execute("ALTER TABLE index_jobs ADD COLUMN claimed_by TEXT")
+        if "heartbeat_at" not in columns:
+            self.db.execute("ALTER TABLE index_jobs ADD COLUMN heartbeat_at REAL")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_index_jobs_status ON index_jobs (status, created_at)")
+        self.db.commit()
+
+    def _save(self, job: IndexJob) -> IndexJob:
+        with self.lock:
+            job.updated_at = datetime.utcnow()
+            self.db.execute(
+                "INSERT INTO index_jobs (id, user_id, status, created_at, body) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET status = excluded.status, body = excluded.body",
+                (job.id, job.user_id, job.status, job.created_at.isoformat(), job.model_dump_json()),
+            )
+            self.db.commit()
+            return job
+
+    def insert_job(self, job: IndexJob) -> IndexJob:
+        with self.lock:
+            job.stages.append(JobStage(name="queued"))
+            logger.info("Queued index job '%s' for user '%s'", job.id, job.user_id)
+            return self._save(job)
+
+    def get_job(self, job_id: str) -> Optional[IndexJob]:
+        with self.lock:
+            row = self.db.execute("SELECT body FROM index_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            return IndexJob(**json.loads(row["body"]))
+
+    def get_user_jobs(self, user_id: str) -> List[IndexJob]:
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT body FROM index_jobs WHERE user_id = ? ORDER BY created_at DESC", (user_id,)
+            ).fetchall()
+            return [IndexJob(**json.loads(row["body"])) for row in rows]
+
+    def claim_next_job(self, max_jobs_per_user: int, owner: str) -> Optional[IndexJob]:
+        """Atomically move the oldest queued job of a user below the concurrency cap to running for owner."""
+        with self.lock:
+            running = {
+                row["user_id"]: row["count"]
+                for row in self.db.execute(
+                    "SELECT user_id, COUNT(*) AS count FROM index_jobs WHERE status = 'running' GROUP BY user_id"
+                )
+            }
+            rows = self.db.execute(
+                "SELECT id, user_id FROM index_jobs WHERE status = 'queued' ORDER BY created_at"
+            ).fetchall()
+            for row in rows:
+                if running.get(row["user_id"], 0) >= max_jobs_per_user:
+                    continue
+                cursor = self.db.execute(
+                    "UPDATE index_jobs SET status = 'running', claimed_by = ?, heartbeat_at = ? "
+                    "WHERE id = ? AND status = 'queued'",
+                    (owner, time.time(), row["id"]),
+                )
+                self.db.commit()
+                if cursor.rowcount == 1:
+                    job = self.get_job(row["id"])
+                    job.status = "running"
+                    return self._save(job)
+            return None
+
+    def update_stage(self, job_id: str, stage: str) -> Optional[IndexJob]:
+        with self.lock:
+            job = self.get_job(job_id)
+            if job is None:
+                return None
+            job.stage = stage
+            job.stages.append(JobStage(name=stage))
+            return self._save(job)
+
+    def finish_job(self, job_id: str, success: bool, error: str = None) -> Optional[IndexJob]:
+        with self.lock:
+            job = self.get_job(job_id)
+            if job is None:
+                return None
+            job.status = "completed" if success else "failed"
+            job.stage = job.status
+            job.stages.append(JobStage(name=job.status))
+            job.error = error
+            return self._save(job)
+
+    def heartbeat(self, owner: str) -> int:
+        """Mark the running jobs claimed by owner as still alive."""
+        with self.lock:
+            cursor = self.db.execute(
+                "UPDATE index_jobs SET heartbeat_at = ? WHERE claimed_by = ? AND status = 'running'",
+                (time.time(), owner),
+            )
+            self.db.commit()
+            return cursor.rowcount
+
+    def requeue_stale_jobs(self, stale_after_seconds: float) -> int:
+        """Put running jobs whose owner has not beaten for stale_after_seconds back on the queue."""
+        with self.lock:
+            return self._requeue(
+                "heartbeat_at IS NULL OR heartbeat_at < ?", (time.time() - stale_after_seconds,)
+            )
+
+    def release_jobs(self, owner: str) -> int:
+        """Put the running jobs of an owner that is shutting down back on the queue."""
+        with self.lock:
+            return self._requeue("claimed_by = ?", (owner,))
+
+    def _requeue(self, condition: str, params: tuple) -> int:
+        rows = self.db.execute(
+            f"SELECT id FROM index_jobs WHERE status = 'running' AND ({condition})", params
+        ).fetchall()
+        requeued = 0
+        for row in rows:
+            # Re-check in the update, another process may have beaten or requeued it meanwhile
+            cursor = self.db.execute(
+                "UPDATE index_jobs SET status = 'queued', claimed_by = NULL, heartbeat_at = NULL "
+                f"WHERE id = ? AND status = 'running' AND ({condition})",
+                (row["id"], *params),
+            )
+            self.db.commit()
+            if cursor.rowcount != 1:
+                continue
+            job = self.get_job(row["id"])
+            job.status = "queued"
+            job.stage = "queued"
+            job.stages.append(JobStage(name="requeued"))
+            self._save(job)
+            requeued += 1
+        if requeued:
+            logger.info("Requeued %d interrupted index jobs", requeued)
+        return requeued
@@ -0,0 +1,31 @@
+import sqlite3
+import logging
+from app.config import get_settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SQLiteConfig:
+    """Local SQLite store for process-side state that must survive restarts."""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or get_settings().INGESTION_DB_PATH
+        self.connection = None
+
+    def connect(self):
+        """Open a connection to the SQLite database."""
+        try:
+            self.connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self.connection.row_factory = sqlite3.Row
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            return self.connection
+        except sqlite3.Error as e:
+            logger.error(f"Could not connect to SQLite database {self.db_path}: {e}")
+            raise
+
+    def disconnect(self):
+        """Close the SQLite connection."""
+        if self.connection:
+            self.connection.close()
+            self.connection = None
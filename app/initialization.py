@@ -8,6 +8,7 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from google import genai
 import os
 from llama_index.core import Settings
+from app.core.common.embedding_cache import CachedEmbeddings, CachedLlamaIndexEmbedding
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -42,15 +43,15 @@ class LLMInitializer:
         # Initialize the LLM model using gemini_pro_model
         logger.info(f"Initializing langchain embedding model: {gemini_pro_model}")
         embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key = os.getenv("GEMINI_API_KEY_PROD"))
-        return embeddings
+        return CachedEmbeddings(embeddings)
 
     def initialize_llamaindex_embedding_model(self):    
         # Initialize the embedding model using gemini_embeddings_model
         logger.info(f"Initializing Embedding model: {gemini_embeddings_model}")
-        gemini_embeddings = GeminiEmbedding(
+        gemini_embeddings = CachedLlamaIndexEmbedding(GeminiEmbedding(
             model_name=gemini_embeddings_model,
             api_key=os.getenv("GEMINI_API_KEY_PROD"),
-        )
+        ))
         Settings.embed_model = gemini_embeddings
         return gemini_embeddings
 
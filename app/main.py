@@ -1,9 +1,13 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .api import api_router
 from .api import chat_router
 from .synapse import synapse_router
 from .logging_config import reasoning_logger
+from .services.ingestion import start_ingestion_queue, stop_ingestion_queue
+from .core.builder.parser import Parser
+from .config import get_settings
 import logging
 import uvicorn
 import os
@@ -31,10 +35,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await Parser.startup()
+    await start_ingestion_queue()
+    yield
+    await stop_ingestion_queue()
+    await Parser.shutdown()
+    if get_settings().VECTOR_STORE_BACKEND == "pinecone":
+        from .storage.pinecone import pinecone_registry
+        pinecone_registry.close()
+
 app = FastAPI(
     title="Cortex API",
     description="AI-powered document processing and analysis API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
@@ -14,7 +15,14 @@ from app.logging_config import memory_logger
 class Chat: 
     
     @staticmethod
-    async def process_chat_message(payload: dict):
+    async def process_chat_message(payload: dict, on_event=None):
+        """
+        Answer a chat message through the cortex graph and persist the conversation
+
+        Args:
+            payload: The incoming chat message
+            on_event: Optional callback receiving the reasoning events of a knowledge search
+        """
         # Create the Message object from the incoming JSON payload
         message = Message(
             sender=payload["sender"],
@@ -34,50 +42,60 @@ class Chat:
                 "configurable": GraphConfig(
                     user_id=payload["user_id"],
                     thread_id=conversation.id,
+                    # Travels with this run only, so concurrent runs of a thread keep their own listener
+                    on_event=on_event,
                 ),
             }
         
-        cortex.invoke(
-            {
-                "messages": ("human", payload["content"]),
-            },
-            config,
-            stream_mode="values",
-        )
-        cortex_state = cortex.get_state(config)
-        state = cortex_state.values
         id = str(conversation.id)
-        memory_service = MemoryService()
-        memory = memory_service.get_memory_for_conversation(id)
-        messages = state["messages"]
 
-        if memory: 
-            if len(messages) - memory.last_update_count > 2:
-                memory_logger.info(f"Updating memory for conversation {id}")
-                updated_summary , _ = observer(messages[-3:], memory.summary, payload["user_id"], id)
-                memory.summary = updated_summary
-                memory.last_update_count = memory.last_update_count + 3
-                memory_service.insert_memory(memory, False)
-        else:
-            if len(messages) > 2:
-                memory_logger.info(f"Creating new memory for conversation {id}")
-                updated_summary , title = observer(messages, "", payload["user_id"], id)
-                memory = Memory(
-                    conversation_id=id,
-                    user_id=payload["user_id"],
-                    summary=updated_summary,
-                    title=title,
-                    highlights="",
-                    last_update_count=3,
-                )
-                memory_service.insert_memory(memory, True)
-       
-        return state["output"] , id
+        def answer_and_remember():
+            cortex.invoke(
+                {
+                    "messages": ("human", payload["content"]),
+                },
+                config,
+                stream_mode="values",
+            )
+            cortex_state = cortex.get_state(config)
+            state = cortex_state.values
+            memory_service = MemoryService()
+            memory = memory_service.get_memory_for_conversation(id)
+            messages = state["messages"]
+
+            if memory: 
+                if len(messages) - memory.last_update_count > 2:
+                    memory_logger.info(f"Updating memory for conversation {id}")
+                    updated_summary , _ = observer(messages[-3:], memory.summary, payload["user_id"], id)
+                    memory.summary = updated_summary
+                    memory.last_update_count = memory.last_update_count + 3
+                    memory_service.insert_memory(memory, False)
+            else:
+                if len(messages) > 2:
+                    memory_logger.info(f"Creating new memory for conversation {id}")
+                    updated_summary , title = observer(messages, "", payload["user_id"], id)
+                    memory = Memory(
+                        conversation_id=id,
+                        user_id=payload["user_id"],
+                        summary=updated_summary,
+                        title=title,
+                        highlights="",
+                        last_update_count=3,
+                    )
+                    memory_service.insert_memory(memory, True)
+
+            return state["output"]
+
+        # The graph is synchronous, so the answer and the memory update run in a worker thread
+        # off the event loop. Shielded so a client that disconnects mid-stream still gets its
+        # conversation memory persisted.
+        output = await asyncio.shield(asyncio.to_thread(answer_and_remember))
+        return output , id
 
     @staticmethod
-    def process_chat_payload(payload: dict):
+    def process_chat_payload(payload: dict, on_event=None):
         try:
-            return Chat.process_chat_message(payload)
+            return Chat.process_chat_message(payload, on_event)
         except Exception as e:
             logging.error(f"Error processing chat payload: {e}")
             raise HTTPException(status_code=500, detail=str(e))
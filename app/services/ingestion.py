@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import socket
+import uuid
+from collections import defaultdict
+from fastapi import UploadFile
+from app.config import get_settings
+from app.core.builder.index import Indexer
+from app.core.builder.spooled_upload import SpooledUpload, UPLOAD_CHUNK_SIZE
+from app.data_layer.models.index_job import IndexJob
+from app.data_layer.services.index_job_service import IndexJobService
+from app.storage.disk_store import indexing_directory
+from app.logging_config import indexing_logger as logger
+
+spool_directory = indexing_directory + "/ingestion_spool"
+
+TERMINAL_STATUSES = ("completed", "failed")
+# How often a watched job is re-read from the store, for jobs run by another process
+JOB_WATCH_FALLBACK_SECONDS = 10.0
+
+class IngestionQueue:
+    """
+    Bounded worker pool that runs Indexer.index for queued upload jobs.
+
+    Uploads are spooled to disk and the job is persisted in the local SQLite store,
+    so the HTTP request returns immediately and queued jobs survive a restart. Store
+    calls run in worker threads to keep the event loop free. Created and started by
+    the application lifespan, see start_ingestion_queue. Status changes of the jobs
+    run here are pushed to their watchers as they are saved. Jobs are claimed under
+    a per-process owner id and kept alive by a heartbeat, so several processes can
+    share the store and only the jobs of a dead process are requeued.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.worker_count = settings.INGESTION_WORKERS
+        self.max_jobs_per_user = settings.INGESTION_MAX_JOBS_PER_USER
+        self.poll_interval = settings.INGESTION_POLL_INTERVAL_SECONDS
+        self.heartbeat_interval = settings.INGESTION_HEARTBEAT_SECONDS
+        self.stale_after = settings.INGESTION_STALE_AFTER_SECONDS
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.job_service = IndexJobService()
+        self.workers = []
+        self.heartbeat_task = None
+        self.wakeup = asyncio.Event()
+        self.listeners = defaultdict(list)
+
+    async def start(self):
+        await asyncio.to_thread(self.job_service.requeue_stale_jobs, self.stale_after)
+        self.heartbeat_task = asyncio.create_task(self._heartbeat())
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        logger.info(f"Started {self.worker_count} ingestion workers as {self.owner}")
+
+    async def stop(self):
+        tasks = [*self.workers, self.heartbeat_task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self.heartbeat_task = None
+        # Jobs interrupted here are handed back right away instead of waiting to go stale
+        await asyncio.to_thread(self.job_service.release_jobs, self.owner)
+        logger.info("Stopped ingestion workers")
+
+    async def _heartbeat(self):
+        """Keep the jobs of this process alive and requeue those of processes that died."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await asyncio.to_thread(self.job_service.heartbeat, self.owner)
+                if await asyncio.to_thread(self.job_service.requeue_stale_jobs, self.stale_after):
+                    self.wakeup.set()
+            except Exception as e:
+                logger.error(f"Ingestion heartbeat failed: {e}", exc_info=True)
+
+    async def enqueue(self, file: UploadFile, user_id: str) -> IndexJob:
+        job = IndexJob(user_id=user_id, file_name=file.filename, content_type=file.content_type, file_path="")
+        job_directory = os.path.join(spool_directory, job.id)
+        await asyncio.to_thread(os.makedirs, job_directory, exist_ok=True)
+        job.file_path = os.path.join(job_directory, os.path.basename(file.filename))
+
+        # Disk writes of large uploads run in a worker thread so they never stall the event loop
+        digest = hashlib.sha256()
+        spool_file = await asyncio.to_thread(open, job.file_path, "wb")
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                await asyncio.to_thread(spool_file.write, chunk)
+        finally:
+            await asyncio.to_thread(spool_file.close)
+        job.content_hash = digest.hexdigest()
+
+        await asyncio.to_thread(self.job_service.insert_job, job)
+        self.wakeup.set()
+        return job
+
+    async def get_job(self, job_id: str) -> IndexJob:
+        return await asyncio.to_thread(self.job_service.get_job, job_id)
+
+    async def watch(self, job_id: str, on_event) -> IndexJob:
+        """
+        Call on_event("progress", job) on every status change of a job until it finishes
+
+        Starts with the job's current state and returns the finished job, or None for an
+        unknown job. Changes are pushed by the workers of this process; the store is only
+        re-read every JOB_WATCH_FALLBACK_SECONDS, for jobs run by another process.
+        """
+        finished = asyncio.Event()
+        last_update = None
+
+        def listener(job: IndexJob):
+            nonlocal last_update
+            if job.updated_at != last_update:
+                last_update = job.updated_at
+                on_event("progress", job)
+            if job.status in TERMINAL_STATUSES:
+                finished.set()
+
+        # Subscribe before the first read so no change falls in between
+        self.listeners[job_id].append(listener)
+        try:
+            while (job := await self.get_job(job_id)) is not None:
+                listener(job)
+                if finished.is_set():
+                    return job
+                try:
+                    await asyncio.wait_for(finished.wait(), JOB_WATCH_FALLBACK_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            return None
+        finally:
+            self.listeners[job_id].remove(listener)
+            if not self.listeners[job_id]:
+                del self.listeners[job_id]
+
+    def _publish(self, job: IndexJob):
+        if job is not None:
+            for listener in list(self.listeners.get(job.id, ())):
+                listener(job)
+
+    async def _save_stage(self, job_id: str, stage: str):
+        self._publish(await asyncio.to_thread(self.job_service.update_stage, job_id, stage))
+
+    async def _finish(self, job_id: str, success: bool, error: str = None):
+        self._publish(await asyncio.to_thread(self.job_service.finish_job, job_id, success, error))
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await asyncio.to_thread(self.job_service.claim_next_job, self.max_jobs_per_user, self.owner)
+            if job is None:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            logger.info(f"Worker {worker_id} picked up index job {job.id} for user {job.user_id}")
+            self._publish(job)
+            await self._run_job(job)
+            # A finished job may free a per-user slot for another queued job.
+            self.wakeup.set()
+
+    async def _run_job(self, job: IndexJob):
+        try:
+            indexer = await asyncio.to_thread(Indexer)
+            upload = SpooledUpload.from_path(
+                job.file_path, job.file_name, job.content_type or "application/octet-stream", job.content_hash
+            )
+            try:
+                success = await indexer.index(
+                    upload,
+                    job.user_id,
+                    on_stage=lambda stage: self._save_stage(job.id, stage),
+                )
+            finally:
+                upload.close()
+            await self._finish(job.id, success, None if success else "Failed to index file")
+        except asyncio.CancelledError:
+            # Leave the job as running; stop() hands it back to the queue.
+            raise
+        except Exception as e:
+            logger.error(f"Index job {job.id} failed: {e}", exc_info=True)
+            await self._finish(job.id, False, str(e))
+        shutil.rmtree(os.path.dirname(job.file_path), ignore_errors=True)
+
+_ingestion_queue = None
+
+async def start_ingestion_queue() -> IngestionQueue:
+    """Create and start the process-wide ingestion queue, inside the running event loop."""
+    global _ingestion_queue
+    if _ingestion_queue is None:
+        _ingestion_queue = IngestionQueue()
+        await _ingestion_queue.start()
+    return _ingestion_queue
+
+async def stop_ingestion_queue():
+    global _ingestion_queue
+    if _ingestion_queue is not None:
+        await _ingestion_queue.stop()
+        _ingestion_queue = None
+
+def get_ingestion_queue() -> IngestionQueue:
+    if _ingestion_queue is None:
+        raise RuntimeError("The ingestion queue is not running; it is started by the application lifespan")
+    return _ingestion_queue
@@ -0,0 +1,54 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Tuple
+from fastapi.encoders import jsonable_encoder
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class EventStream:
+    """
+    Bridges on_event callbacks to an async iterator of (event, data) pairs.
+
+    emit may be called from the request's event loop or from any worker thread, so
+    the same stream serves the reasoning engine directly and the cortex graph running
+    in a thread. Must be created inside the request's event loop.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def emit(self, event: str, data: Any):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+    async def run(self, start: Callable[[Callable[[str, Any], None]], Awaitable[Any]], done: Callable[[Any], Any] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Run start(emit) and yield its events as they arrive
+
+        Ends with ("done", done(result)) once start completes, or ("error", ...) if it
+        raised. Closing the iterator, e.g. on client disconnect, cancels the work.
+        """
+        task = asyncio.ensure_future(start(self.emit))
+        # Queued behind every event emitted before completion
+        task.add_done_callback(lambda _: self.loop.call_soon_threadsafe(self.queue.put_nowait, None))
+        try:
+            while (item := await self.queue.get()) is not None:
+                yield item
+            try:
+                result = task.result()
+            except Exception as e:
+                logger.error(f"Streamed request failed: {e}", exc_info=True)
+                yield "error", {"detail": str(e)}
+                return
+            yield "done", done(result) if done else result
+        finally:
+            if not task.done():
+                task.cancel()
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+def ws_event(event: str, data: Any) -> dict:
+    return {"event": event, "data": jsonable_encoder(data)}
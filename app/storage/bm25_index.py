@@ -0,0 +1,172 @@
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+BM25_FILE = "bm25.npz"
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its of on or that the their there "
+    "these they this to was were what when where which who why will with".split()
+)
+# Words joined by - . / _ or : such as ISO-9001, v2.3 or HTTP/2 are kept whole and also split
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./:]\w+)*")
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        parts = re.split(r"[-./:_]", token)
+        if len(parts) > 1:
+            tokens.append(token)
+        tokens.extend(part for part in parts if part and part not in STOPWORDS)
+    return tokens
+
+class BM25Index:
+    """
+    Inverted index with BM25 scoring over the sections of one user's documents.
+
+    Postings are array-backed: a sorted vocabulary, a CSR table of (section, term
+    frequency) per term, and per-section lengths. Section texts are kept as one UTF-8
+    blob with offsets so hits can be returned without another store. Updates rebuild the
+    arrays from the existing postings plus the new sections, without re-tokenizing.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.doc_ids: List[str] = arrays["doc_ids"].tolist()
+        self.terms = {term: i for i, term in enumerate(arrays["terms"].tolist())}
+        lengths = arrays["doc_lengths"]
+        self.average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    @classmethod
+    def empty(cls) -> "BM25Index":
+        return cls({
+            "doc_ids": np.array([], dtype=str),
+            "doc_lengths": np.zeros(0, dtype=np.int32),
+            "text_offsets": np.zeros(1, dtype=np.int64),
+            "text_blob": np.zeros(0, dtype=np.uint8),
+            "terms": np.array([], dtype=str),
+            "indptr": np.zeros(1, dtype=np.int64),
+            "postings_docs": np.zeros(0, dtype=np.int32),
+            "postings_tfs": np.zeros(0, dtype=np.int32),
+        })
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def text(self, position: int) -> str:
+        offsets = self.arrays["text_offsets"]
+        return self.arrays["text_blob"][offsets[position]:offsets[position + 1]].tobytes().decode("utf-8")
+
+    # Updating
+
+    def updated(self, sections: List[Tuple[str, str]], removed_doc_ids: Optional[List[str]] = None) -> "BM25Index":
+        """
+        A new index with the given (doc_id, text) sections added and removed_doc_ids dropped.
+
+        Sections whose doc_id already exists replace the old section.
+        """
+        drop = set(removed_doc_ids or []) | {doc_id for doc_id, _ in sections}
+        keep = np.array([doc_id not in drop for doc_id in self.doc_ids], dtype=bool)
+        new_positions = np.cumsum(keep) - 1
+
+        # Existing postings as (term, position, tf) triples, filtered and renumbered
+        old_terms = self.arrays["terms"]
+        posting_terms = np.repeat(np.arange(len(old_terms)), np.diff(self.arrays["indptr"]))
+        posting_docs = self.arrays["postings_docs"]
+        kept_postings = keep[posting_docs]
+        kept_ids = [doc_id for doc_id, kept in zip(self.doc_ids, keep) if kept]
+        kept_texts = [self.text(i).encode("utf-8") for i in np.flatnonzero(keep)]
+        lengths = self.arrays["doc_lengths"][keep].tolist()
+
+        new_terms, new_docs, new_tfs = [], [], []
+        for doc_id, text in sections:
+            counts = Counter(tokenize(text))
+            new_terms.extend(counts)
+            new_docs.extend([len(kept_ids)] * len(counts))
+            new_tfs.extend(counts.values())
+            kept_ids.append(doc_id)
+            kept_texts.append(text.encode("utf-8"))
+            lengths.append(sum(counts.values()))
+
+        # Merge the vocabularies once, then remap both posting sets onto it
+        terms, inverse = np.unique(np.concatenate([old_terms, np.array(new_terms, dtype=str)]), return_inverse=True)
+        term_index = np.concatenate([inverse[:len(old_terms)][posting_terms[kept_postings]], inverse[len(old_terms):]])
+        docs = np.concatenate([new_positions[posting_docs[kept_postings]], new_docs]).astype(np.int32)
+        tfs = np.concatenate([self.arrays["postings_tfs"][kept_postings], new_tfs]).astype(np.int32)
+        # Terms only the dropped sections used have no postings left
+        counts = np.bincount(term_index, minlength=len(terms))
+        used = counts > 0
+        terms, counts, term_index = terms[used], counts[used], (np.cumsum(used) - 1)[term_index]
+        order = np.lexsort((docs, term_index))
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(counts)
+        text_offsets = np.zeros(len(kept_texts) + 1, dtype=np.int64)
+        text_offsets[1:] = np.cumsum([len(text) for text in kept_texts])
+
+        return BM25Index({
+            "doc_ids": np.array(kept_ids, dtype=str),
+            "doc_lengths": np.array(lengths, dtype=np.int32),
+            "text_offsets": text_offsets,
+            "text_blob": np.frombuffer(b"".join(kept_texts), dtype=np.uint8),
+            "terms": terms,
+            "indptr": indptr,
+            "postings_docs": docs[order],
+            "postings_tfs": tfs[order],
+        })
+
+    # Persistence
+
+    def save(self, persist_dir: str):
+        os.makedirs(persist_dir, exist_ok=True)
+        path = os.path.join(persist_dir, BM25_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as index_file:
+            np.savez_compressed(index_file, **self.arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, persist_dir: str) -> Optional["BM25Index"]:
+        try:
+            with np.load(os.path.join(persist_dir, BM25_FILE)) as data:
+                return cls({key: data[key] for key in data.files})
+        except FileNotFoundError:
+            return None
+
+    # Scoring
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, str, float]]:
+        """(doc_id, text, score) of the best BM25 matches, highest score first."""
+        if not self.doc_ids:
+            return []
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        indptr, lengths = self.arrays["indptr"], self.arrays["doc_lengths"]
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(self.average_length, 1.0))
+        for term in set(tokenize(query)):
+            i = self.terms.get(term)
+            if i is None:
+                continue
+            docs = self.arrays["postings_docs"][indptr[i]:indptr[i + 1]]
+            tfs = self.arrays["postings_tfs"][indptr[i]:indptr[i + 1]]
+            idf = math.log(1 + (len(self.doc_ids) - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + length_norm[docs])
+        matched = np.flatnonzero(scores > 0)
+        if not len(matched):
+            return []
+        best = matched[np.argsort(-scores[matched])[:top_k]]
+        return [(self.doc_ids[i], self.text(i), float(scores[i])) for i in best]
+
+    def stats(self) -> dict:
+        return {
+            "sections": len(self.doc_ids),
+            "terms": len(self.terms),
+            "postings": int(len(self.arrays["postings_docs"])),
+        }
@@ -1,32 +1,139 @@
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
 from llama_index.core import load_index_from_storage , ServiceContext
 from llama_index.core import StorageContext
-from app.initialization import gemini_embeddings_model
+from app.config import get_settings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-indexing_directory = "/Users/dipak/CortexProjects/storage"
+indexing_directory = get_settings().STORAGE_DIRECTORY
+VERSION_FILE = "version"
+
+class IndexCache:
+    """
+    Memory-bounded LRU of deserialized indexes keyed by (index_source, index_name).
+
+    Each entry remembers the on-disk version stamp it was loaded from, so an index
+    persisted by another worker is reloaded instead of served stale. The size of an
+    entry is approximated by the size of its persisted files.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, version, size, index, refresh=False):
+        with self.lock:
+            if key in self.entries:
+                self.size_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (version, size, index)
+            self.size_bytes += size
+            if refresh:
+                self.refreshes += 1
+            while self.size_bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.size_bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+            }
+
+index_cache = IndexCache(get_settings().INDEX_CACHE_MAX_BYTES)
 
 class DiskStore:
+    @staticmethod
+    def _persist_dir(indexing_source, index_name):
+        return f"{indexing_directory}/{indexing_source}/{index_name}"
+
+    @staticmethod
+    def _read_version(persist_dir):
+        """The version stamp written by persist_index, or the newest file mtime for older indexes."""
+        try:
+            with open(f"{persist_dir}/{VERSION_FILE}", "r") as version_file:
+                return version_file.read().strip()
+        except FileNotFoundError:
+            mtimes = [entry.stat().st_mtime_ns for entry in os.scandir(persist_dir) if entry.is_file()]
+            return str(max(mtimes)) if mtimes else None
+
+    @staticmethod
+    def _persisted_size(persist_dir):
+        return sum(entry.stat().st_size for entry in os.scandir(persist_dir) if entry.is_file())
+
     @staticmethod
     def persist_index(index,indexing_source, index_name):
         try:
-            index.storage_context.persist(f"{indexing_directory}/{indexing_source}/{index_name}")
+            persist_dir = DiskStore._persist_dir(indexing_source, index_name)
+            index.storage_context.persist(persist_dir)
+            version = str(time.time_ns())
+            with open(f"{persist_dir}/{VERSION_FILE}", "w") as version_file:
+                version_file.write(version)
+            index_cache.put(
+                (indexing_source, index_name), version, DiskStore._persisted_size(persist_dir), index, refresh=True
+            )
             logger.info(f"Index created and saved as {index_name}")
         except Exception as e:
             logger.error(f"Error saving index: {e}")
-            return False    
+            return False
 
     @staticmethod
-    def load_index(indexing_source,index_name):
+    def load_index(indexing_source,index_name, cached=True):
+        """
+        Load a persisted index
+
+        Args:
+            cached: Serve the index from the in-process cache when its version is current.
+                Callers that mutate the index before persisting it should pass False.
+        """
         try:
+            persist_dir = DiskStore._persist_dir(indexing_source, index_name)
+            version = DiskStore._read_version(persist_dir) if os.path.isdir(persist_dir) else None
+            if cached and version is not None:
+                cached_index = index_cache.get((indexing_source, index_name), version)
+                if cached_index is not None:
+                    logger.info(f"Index served from cache: {index_name}")
+                    return cached_index
+
             loaded_storage = StorageContext.from_defaults(
-                persist_dir=f"{indexing_directory}/{indexing_source}/{index_name}"
+                persist_dir=persist_dir
             )
             # service_context = ServiceContext.from_defaults(embed_model=gemini_embeddings_model)
             loaded_index = load_index_from_storage(loaded_storage)
+            if cached and version is not None:
+                index_cache.put(
+                    (indexing_source, index_name), version, DiskStore._persisted_size(persist_dir), loaded_index
+                )
             logger.info(f"Index loaded from storage: {index_name}")
             return loaded_index
         except Exception as e:
@@ -0,0 +1,225 @@
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Rows scored per matrix multiply, bounds the float32 scratch space of int8 matrices
+SEARCH_BLOCK_ROWS = 65536
+
+def normalize_rows(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+class EmbeddingMatrix:
+    """
+    Node embeddings of one index as a contiguous, memory-mapped matrix.
+
+    Rows are L2-normalized so cosine similarity is a dot product, and are stored as
+    float32 or as int8 with one float32 scale per row. Files are only appended to and
+    the row count lives in a small meta file that is replaced atomically, so readers in
+    other processes map the same page-cached file and never see a partial append.
+    A compaction writes a new generation of files and switches the meta file to it.
+    When an id was appended more than once, only its latest row is searched.
+    """
+
+    def __init__(self, directory: str, name: str = "node_embeddings", quantize: bool = False):
+        self.directory = directory
+        self.name = name
+        self.quantize = quantize
+        self.meta_path = os.path.join(directory, f"{name}.meta.json")
+        self.meta = None
+        self.meta_mtime = None
+        self.ids: List[str] = []
+        self.matrix = None
+        self.scales = None
+        self.superseded = None
+
+    # Files
+
+    def _path(self, generation: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"{self.name}.{generation}.{suffix}")
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            with open(self.meta_path, "r") as meta_file:
+                return json.load(meta_file)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, meta: dict):
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as meta_file:
+            json.dump(meta, meta_file)
+            meta_file.flush()
+            os.fsync(meta_file.fileno())
+        os.replace(tmp_path, self.meta_path)
+
+    @contextmanager
+    def _write_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{self.name}.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _encode(self, vectors) -> Tuple[bytes, Optional[bytes]]:
+        rows = normalize_rows(vectors)
+        if not self.quantize:
+            return rows.astype(np.float32).tobytes(), None
+        scales = np.abs(rows).max(axis=1) / 127.0
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        quantized = np.clip(np.rint(rows / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized.tobytes(), scales.tobytes()
+
+    # Writing
+
+    def is_compatible(self) -> bool:
+        """False when the files were written with a different quantization and need a rebuild."""
+        meta = self._read_meta()
+        return meta is None or meta["dtype"] == ("int8" if self.quantize else "float32")
+
+    @property
+    def last_seq(self) -> int:
+        meta = self._read_meta()
+        return meta["last_seq"] if meta else 0
+
+    def append(self, ids: List[str], vectors, last_seq: int):
+        """Append rows for ids; last_seq is the source position the matrix is now synced to."""
+        with self._write_lock():
+            meta = self._read_meta()
+            if meta is None or (vectors is not None and len(ids) and meta["dim"] != len(vectors[0])):
+                self._write_generation(ids, vectors, last_seq, (meta or {}).get("generation", 0) + 1, meta)
+                return
+            if ids:
+                data, scales = self._encode(vectors)
+                generation = meta["generation"]
+                with open(self._path(generation, "bin"), "ab") as data_file:
+                    data_file.write(data)
+                if scales is not None:
+                    with open(self._path(generation, "scale"), "ab") as scale_file:
+                        scale_file.write(scales)
+                with open(self._path(generation, "ids"), "a") as ids_file:
+                    ids_file.write("".join(f"{node_id}\n" for node_id in ids))
+                meta["rows"] += len(ids)
+            meta["last_seq"] = last_seq
+            self._write_meta(meta)
+
+    def rebuild(self, ids: List[str], vectors, last_seq: int):
+        """Rewrite the matrix from scratch, dropping rows of deleted nodes."""
+        with self._write_lock():
+            meta = self._read_meta()
+            self._write_generation(ids, vectors, last_seq, (meta or {}).get("generation", 0) + 1, meta)
+
+    def _write_generation(self, ids, vectors, last_seq, generation, previous_meta):
+        dim = len(vectors[0]) if len(ids) else (previous_meta or {}).get("dim", 0)
+        data, scales = self._encode(vectors) if len(ids) else (b"", b"" if self.quantize else None)
+        with open(self._path(generation, "bin"), "wb") as data_file:
+            data_file.write(data)
+        if scales is not None:
+            with open(self._path(generation, "scale"), "wb") as scale_file:
+                scale_file.write(scales)
+        with open(self._path(generation, "ids"), "w") as ids_file:
+            ids_file.write("".join(f"{node_id}\n" for node_id in ids))
+        self._write_meta({
+            "generation": generation,
+            "rows": len(ids),
+            "dim": dim,
+            "dtype": "int8" if self.quantize else "float32",
+            "last_seq": last_seq,
+        })
+        if previous_meta:
+            # Readers that still map the old generation keep their open file handles.
+            for suffix in ("bin", "scale", "ids"):
+                try:
+                    os.remove(self._path(previous_meta["generation"], suffix))
+                except FileNotFoundError:
+                    pass
+
+    # Reading
+
+    def refresh(self) -> bool:
+        """Remap the files if the meta file changed since the last call. Returns whether rows exist."""
+        try:
+            mtime = os.stat(self.meta_path).st_mtime_ns
+        except FileNotFoundError:
+            self.meta, self.matrix, self.ids, self.superseded = None, None, [], None
+            return False
+        if mtime != self.meta_mtime:
+            meta = self._read_meta()
+            rows, dim, generation = meta["rows"], meta["dim"], meta["generation"]
+            dtype = np.int8 if meta["dtype"] == "int8" else np.float32
+            if rows and dim:
+                self.matrix = np.memmap(self._path(generation, "bin"), dtype=dtype, mode="r", shape=(rows, dim))
+                self.scales = (
+                    np.memmap(self._path(generation, "scale"), dtype=np.float32, mode="r", shape=(rows,))
+                    if dtype == np.int8 else None
+                )
+                with open(self._path(generation, "ids"), "r") as ids_file:
+                    self.ids = ids_file.read().split("\n")[:rows]
+                latest = {node_id: row for row, node_id in enumerate(self.ids)}
+                self.superseded = None
+                if len(latest) < rows:
+                    self.superseded = np.ones(rows, dtype=bool)
+                    self.superseded[list(latest.values())] = False
+            else:
+                self.matrix, self.scales, self.ids, self.superseded = None, None, [], None
+            self.meta, self.meta_mtime = meta, mtime
+        return self.matrix is not None
+
+    @property
+    def rows(self) -> int:
+        return len(self.ids)
+
+    def search(self, queries, top_k: int) -> List[List[Tuple[str, float]]]:
+        """
+        Cosine top-k for a batch of query vectors.
+
+        Every query is scored in the same matrix multiply, block by block, keeping a
+        running top-k per query. Returns (node_id, score) lists in descending score.
+        """
+        queries = normalize_rows(queries)
+        if not self.refresh() or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+        top_k = min(top_k, self.rows)
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, self.rows, SEARCH_BLOCK_ROWS):
+            block = self.matrix[start:start + SEARCH_BLOCK_ROWS]
+            scores = (np.asarray(block, dtype=np.float32) @ queries.T).T
+            if self.scales is not None:
+                scores *= self.scales[start:start + SEARCH_BLOCK_ROWS]
+            if self.superseded is not None:
+                scores[:, self.superseded[start:start + SEARCH_BLOCK_ROWS]] = -np.inf
+            rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            if scores.shape[1] > top_k:
+                keep = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                rows = np.take_along_axis(rows, keep, axis=1)
+            best_scores, best_rows = scores, rows
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [
+            [(self.ids[row], float(score)) for row, score in zip(query_rows, query_scores) if score > -np.inf]
+            for query_rows, query_scores in zip(best_rows, best_scores)
+        ]
+
+    def stats(self) -> dict:
+        self.refresh()
+        return {
+            "rows": self.rows,
+            "dim": (self.meta or {}).get("dim", 0),
+            "dtype": (self.meta or {}).get("dtype"),
+            "generation": (self.meta or {}).get("generation"),
+        }
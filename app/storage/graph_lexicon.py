@@ -0,0 +1,267 @@
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+LEXICON_FILE = "graph_lexicon.npz"
+LEADING_ARTICLES = ("the ", "a ", "an ")
+
+def normalize_entity(name: str) -> str:
+    """Lowercase, with punctuation and underscores turned into single spaces."""
+    return " ".join(re.sub(r"[\W_]+", " ", name.lower()).split())
+
+def entity_aliases(name: str, acronyms: bool = True) -> List[str]:
+    """Normalized surface forms an entity can be referred to by."""
+    normalized = normalize_entity(name)
+    if not normalized:
+        return []
+    aliases = {normalized}
+    for article in LEADING_ARTICLES:
+        if normalized.startswith(article):
+            aliases.add(normalized[len(article):])
+    for alias in list(aliases):
+        words = alias.split()
+        if len(words[-1]) > 3 and words[-1].endswith("s") and not words[-1].endswith("ss"):
+            aliases.add(" ".join(words[:-1] + [words[-1][:-1]]))
+        if acronyms and len(words) >= 2:
+            aliases.add("".join(word[0] for word in words))
+    return sorted(aliases)
+
+def trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+def _csr(groups: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    indptr = np.zeros(len(groups) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(group) for group in groups])
+    indices = np.fromiter((item for group in groups for item in group), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, indices
+
+class GraphLexicon:
+    """
+    Entity lexicon and adjacency of one knowledge graph, precomputed at index time.
+
+    Entities are linked from keywords without an LLM: first by exact normalized name or
+    alias (plural-stripped, article-stripped, acronym), then by trigram Jaccard similarity
+    over a trigram -> entity postings table. Entity-to-entity relations are kept as an
+    undirected compressed sparse row adjacency, so a k-hop neighbourhood is a few array
+    slices per hop. Everything is stored as NumPy arrays in a single .npz file.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.entity_ids: List[str] = arrays["entity_ids"].tolist()
+        self.entity_positions = {entity_id: i for i, entity_id in enumerate(self.entity_ids)}
+        self.aliases = dict(zip(arrays["alias_keys"].tolist(), range(len(arrays["alias_keys"]))))
+        self.trigram_keys = {key: i for i, key in enumerate(arrays["trigram_keys"].tolist())}
+        self.relation_labels: List[str] = arrays["relation_labels"].tolist()
+        self.chunk_ids: List[str] = arrays["chunk_ids"].tolist()
+
+    # Building
+
+    @classmethod
+    def build(cls, entity_ids: List[str], relations: List[Tuple[str, str, str, Optional[str]]]) -> "GraphLexicon":
+        """
+        Args:
+            entity_ids: Ids (names) of the entity nodes
+            relations: (source_id, label, target_id, source_chunk_id) rows of the graph
+        """
+        positions = {entity_id: i for i, entity_id in enumerate(entity_ids)}
+
+        alias_targets: Dict[str, List[int]] = {}
+        for i, entity_id in enumerate(entity_ids):
+            for alias in entity_aliases(entity_id):
+                alias_targets.setdefault(alias, []).append(i)
+        alias_keys = sorted(alias_targets)
+        alias_indptr, alias_indices = _csr([alias_targets[key] for key in alias_keys])
+
+        trigram_postings: Dict[str, List[int]] = {}
+        trigram_counts = np.zeros(len(entity_ids), dtype=np.int32)
+        for i, entity_id in enumerate(entity_ids):
+            entity_trigrams = trigrams(normalize_entity(entity_id))
+            trigram_counts[i] = len(entity_trigrams)
+            for trigram in entity_trigrams:
+                trigram_postings.setdefault(trigram, []).append(i)
+        trigram_keys = sorted(trigram_postings)
+        trigram_indptr, trigram_indices = _csr([trigram_postings[key] for key in trigram_keys])
+
+        labels, chunk_ids = {}, {}
+        edge_sources, edge_labels, edge_targets, edge_chunks = [], [], [], []
+        for source_id, label, target_id, chunk_id in relations:
+            if source_id not in positions or target_id not in positions:
+                continue
+            edge_sources.append(positions[source_id])
+            edge_targets.append(positions[target_id])
+            edge_labels.append(labels.setdefault(label, len(labels)))
+            edge_chunks.append(chunk_ids.setdefault(chunk_id, len(chunk_ids)) if chunk_id else -1)
+
+        neighbours: List[List[int]] = [[] for _ in entity_ids]
+        neighbour_edges: List[List[int]] = [[] for _ in entity_ids]
+        for edge, (source, target) in enumerate(zip(edge_sources, edge_targets)):
+            neighbours[source].append(target)
+            neighbour_edges[source].append(edge)
+            if target != source:
+                neighbours[target].append(source)
+                neighbour_edges[target].append(edge)
+        adjacency_indptr, adjacency_indices = _csr(neighbours)
+        _, adjacency_edges = _csr(neighbour_edges)
+
+        return cls({
+            "entity_ids": np.array(entity_ids, dtype=str),
+            "alias_keys": np.array(alias_keys, dtype=str),
+            "alias_indptr": alias_indptr,
+            "alias_indices": alias_indices,
+            "trigram_keys": np.array(trigram_keys, dtype=str),
+            "trigram_indptr": trigram_indptr,
+            "trigram_indices": trigram_indices,
+            "trigram_counts": trigram_counts,
+            "relation_labels": np.array(list(labels), dtype=str),
+            "chunk_ids": np.array(list(chunk_ids), dtype=str),
+            "edge_sources": np.array(edge_sources, dtype=np.int32),
+            "edge_labels": np.array(edge_labels, dtype=np.int32),
+            "edge_targets": np.array(edge_targets, dtype=np.int32),
+            "edge_chunks": np.array(edge_chunks, dtype=np.int32),
+            "adjacency_indptr": adjacency_indptr,
+            "adjacency_indices": adjacency_indices,
+            "adjacency_edges": adjacency_edges,
+        })
+
+    @classmethod
+    def build_from_store(cls, store) -> "GraphLexicon":
+        """Build from a SQLitePropertyGraphStore in two indexed reads."""
+        with store.lock:
+            entity_ids = [row[0] for row in store.db.execute("SELECT id FROM nodes WHERE kind = 'entity' ORDER BY seq")]
+            relations = store.db.execute("SELECT source_id, label, target_id, source_chunk_id FROM relations").fetchall()
+        return cls.build(entity_ids, relations)
+
+    def save(self, persist_dir: str):
+        path = os.path.join(persist_dir, LEXICON_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as lexicon_file:
+            np.savez(lexicon_file, **self.arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, persist_dir: str) -> Optional["GraphLexicon"]:
+        try:
+            with np.load(os.path.join(persist_dir, LEXICON_FILE)) as data:
+                return cls({key: data[key] for key in data.files})
+        except FileNotFoundError:
+            return None
+
+    # Entity linking
+
+    def _alias_matches(self, alias: str) -> List[int]:
+        i = self.aliases.get(alias)
+        if i is None:
+            return []
+        indptr = self.arrays["alias_indptr"]
+        return self.arrays["alias_indices"][indptr[i]:indptr[i + 1]].tolist()
+
+    def link(self, keyword: str, limit: int = 3, min_similarity: float = 0.5) -> List[Tuple[str, float]]:
+        """Entity ids a keyword refers to, with a similarity score in [0, 1]."""
+        exact = []
+        # Keywords are not expanded to acronyms, which would match unrelated short entity names.
+        for alias in entity_aliases(keyword, acronyms=False):
+            exact.extend(self._alias_matches(alias))
+        if exact:
+            return [(self.entity_ids[i], 1.0) for i in dict.fromkeys(exact)][:limit]
+
+        keyword_trigrams = [self.trigram_keys[t] for t in trigrams(normalize_entity(keyword)) if t in self.trigram_keys]
+        if not keyword_trigrams or not self.entity_ids:
+            return []
+        indptr, indices = self.arrays["trigram_indptr"], self.arrays["trigram_indices"]
+        postings = np.concatenate([indices[indptr[t]:indptr[t + 1]] for t in keyword_trigrams])
+        shared = np.bincount(postings, minlength=len(self.entity_ids))
+        total = len(trigrams(normalize_entity(keyword))) + self.arrays["trigram_counts"] - shared
+        similarity = shared / np.maximum(total, 1)
+        candidates = np.flatnonzero(similarity >= min_similarity)
+        if not len(candidates):
+            return []
+        best = candidates[np.argsort(-similarity[candidates])[:limit]]
+        return [(self.entity_ids[i], float(similarity[i])) for i in best]
+
+    def link_keywords(self, graph_query: str, limit_per_keyword: int = 3) -> List[str]:
+        """Entity ids for a comma-separated keyword list such as SubQueryResult.graph_query."""
+        linked = []
+        for keyword in graph_query.split(","):
+            if keyword.strip():
+                linked.extend(entity_id for entity_id, _ in self.link(keyword, limit=limit_per_keyword))
+        return list(dict.fromkeys(linked))
+
+    # Traversal
+
+    def expand(self, entity_ids: List[str], depth: int = 2, limit: int = 30,
+               ignore_labels: Optional[List[str]] = None) -> List[Tuple[str, str, str, Optional[str]]]:
+        """
+        Relations within depth hops of the given entities, closest first.
+
+        Returns (source_id, label, target_id, source_chunk_id) tuples.
+        """
+        ignored = {self.relation_labels.index(label) for label in (ignore_labels or []) if label in self.relation_labels}
+        indptr = self.arrays["adjacency_indptr"]
+        neighbours, neighbour_edges = self.arrays["adjacency_indices"], self.arrays["adjacency_edges"]
+        edge_labels = self.arrays["edge_labels"]
+        frontier = np.array([self.entity_positions[e] for e in entity_ids if e in self.entity_positions], dtype=np.int64)
+        visited = np.zeros(len(self.entity_ids), dtype=bool)
+        visited[frontier] = True
+        seen_edges = set()
+        edges = []
+        for _ in range(depth):
+            if not len(frontier) or len(edges) >= limit:
+                break
+            next_frontier = []
+            for node in frontier:
+                start, end = indptr[node], indptr[node + 1]
+                for neighbour, edge in zip(neighbours[start:end], neighbour_edges[start:end]):
+                    if edge in seen_edges or int(edge_labels[edge]) in ignored:
+                        continue
+                    seen_edges.add(edge)
+                    edges.append(int(edge))
+                    if not visited[neighbour]:
+                        visited[neighbour] = True
+                        next_frontier.append(neighbour)
+            frontier = np.array(next_frontier, dtype=np.int64)
+        sources, targets = self.arrays["edge_sources"], self.arrays["edge_targets"]
+        chunks = self.arrays["edge_chunks"]
+        return [
+            (
+                self.entity_ids[sources[edge]],
+                self.relation_labels[edge_labels[edge]],
+                self.entity_ids[targets[edge]],
+                self.chunk_ids[chunks[edge]] if chunks[edge] >= 0 else None,
+            )
+            for edge in edges[:limit]
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "entities": len(self.entity_ids),
+            "aliases": len(self.aliases),
+            "trigrams": len(self.trigram_keys),
+            "edges": int(len(self.arrays["edge_sources"])),
+        }
+
+_lexicons = {}
+_lexicons_lock = threading.Lock()
+
+def load_graph_lexicon(persist_dir: str) -> Optional[GraphLexicon]:
+    """The lexicon of persist_dir, reloaded when the file on disk changes."""
+    path = os.path.join(persist_dir, LEXICON_FILE)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _lexicons_lock:
+        cached = _lexicons.get(persist_dir)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    lexicon = GraphLexicon.load(persist_dir)
+    with _lexicons_lock:
+        _lexicons[persist_dir] = (mtime, lexicon)
+    return lexicon
@@ -0,0 +1,287 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from app.config import get_settings
+from app.storage.disk_store import indexing_directory
+from app.storage.embedding_matrix import normalize_rows
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Vectors below this count are searched exhaustively, above it through the IVF lists
+IVF_MIN_VECTORS = 4096
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 50000
+# Lists are retrained once the index has grown this much since the last training
+RETRAIN_GROWTH = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    id TEXT PRIMARY KEY,
+    list_id INTEGER NOT NULL DEFAULT 0,
+    vector BLOB NOT NULL,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vectors_list_id ON vectors (list_id);
+CREATE TABLE IF NOT EXISTS centroids (
+    list_id INTEGER PRIMARY KEY,
+    vector BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ivf_state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+FILTER_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+def filter_clause(filter: Optional[Dict[str, Any]]) -> Tuple[str, list]:
+    """
+    SQL for a Pinecone-style metadata filter: {"key": value}, {"key": {"$op": value}},
+    {"key": {"$in": [...]}}, {"key": {"$nin": [...]}} and top-level "$and" / "$or" lists.
+    """
+    if not filter:
+        return "1", []
+    clauses, params = [], []
+    for key, condition in filter.items():
+        if key in ("$and", "$or"):
+            parts = [filter_clause(part) for part in condition]
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(clause for clause, _ in parts) + ")")
+            params.extend(param for _, part_params in parts for param in part_params)
+            continue
+        path = f"$.{key}"
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, value in condition.items():
+            if operator in ("$in", "$nin"):
+                marks = ",".join("?" * len(value))
+                negate = "NOT " if operator == "$nin" else ""
+                clauses.append(f"json_extract(metadata, ?) {negate}IN ({marks})")
+                params.extend([path, *value])
+            elif operator in FILTER_OPERATORS:
+                clauses.append(f"json_extract(metadata, ?) {FILTER_OPERATORS[operator]} ?")
+                params.extend([path, value])
+            else:
+                raise ValueError(f"Unsupported metadata filter operator: {operator}")
+    return " AND ".join(clauses), params
+
+def kmeans(vectors: np.ndarray, clusters: int, iterations: int = KMEANS_ITERATIONS) -> np.ndarray:
+    """Spherical k-means over normalized rows, returning normalized centroids."""
+    rng = np.random.default_rng(0)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)]
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = np.bincount(assignment, minlength=clusters) == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+class LocalVectorStore(VectorStore):
+    """
+    LangChain vector store kept in one SQLite file per index, with an IVF-flat index.
+
+    Vectors are stored L2-normalized so scores are cosine similarities, like the cosine
+    Pinecone indexes. Small indexes are searched exhaustively; from IVF_MIN_VECTORS on,
+    vectors are bucketed under k-means centroids and a query scans only the nprobe
+    closest lists. Metadata filters are applied in SQL before scoring.
+    """
+
+    def __init__(self, db_path: str, embedding: Embeddings, nprobe: int = None):
+        self.db_path = db_path
+        self.embedding = embedding
+        self.nprobe = nprobe or get_settings().LOCAL_VECTOR_NPROBE
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+        self.centroids = None
+        self.centroids_version = None
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    # IVF lists
+
+    def _state(self, key: str) -> int:
+        row = self.db.execute("SELECT value FROM ivf_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _load_centroids(self) -> Optional[np.ndarray]:
+        version = self._state("version")
+        if version != self.centroids_version:
+            rows = self.db.execute("SELECT vector FROM centroids ORDER BY list_id").fetchall()
+            self.centroids = np.stack([np.frombuffer(row[0], dtype=np.float32) for row in rows]) if rows else None
+            self.centroids_version = version
+        return self.centroids
+
+    def _assign(self, vectors: np.ndarray) -> List[int]:
+        centroids = self._load_centroids()
+        if centroids is None:
+            return [0] * len(vectors)
+        return np.argmax(vectors @ centroids.T, axis=1).tolist()
+
+    def _maybe_train(self):
+        (count,) = self.db.execute("SELECT COUNT(*) FROM vectors").fetchone()
+        trained_at = self._state("trained_at")
+        if count < IVF_MIN_VECTORS or (trained_at and count < trained_at * RETRAIN_GROWTH):
+            return
+        self.train(count)
+
+    def train(self, count: int = None):
+        """(Re)build the IVF lists: k-means over a sample, then reassign every vector."""
+        with self.lock:
+            if count is None:
+                (count,) = self.db.execute("SELECT COUNT(*) FROM vectors").fetchone()
+            clusters = max(1, int(np.sqrt(count)))
+            sample = self.db.execute(
+                "SELECT vector FROM vectors ORDER BY RANDOM() LIMIT ?", (min(count, KMEANS_SAMPLE),)
+            ).fetchall()
+            centroids = kmeans(np.stack([np.frombuffer(row[0], dtype=np.float32) for row in sample]), clusters)
+            self.db.execute("DELETE FROM centroids")
+            self.db.executemany(
+                "INSERT INTO centroids (list_id, vector) VALUES (?, ?)",
+                [(i, centroid.astype(np.float32).tobytes()) for i, centroid in enumerate(centroids)],
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO ivf_state (key, value) VALUES ('version', ?), ('trained_at', ?)",
+                (self._state("version") + 1, count),
+            )
+            # Assignments are collected before updating so the table is not modified under the cursor.
+            assignments = []
+            cursor = self.db.execute("SELECT id, vector FROM vectors")
+            while batch := cursor.fetchmany(10000):
+                vectors = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in batch])
+                assignment = np.argmax(vectors @ centroids.T, axis=1).tolist()
+                assignments.extend((list_id, row[0]) for list_id, row in zip(assignment, batch))
+            self.db.executemany("UPDATE vectors SET list_id = ? WHERE id = ?", assignments)
+            self.db.commit()
+            logger.info(f"Trained {clusters} IVF lists over {count} vectors in {self.db_path}")
+
+    # VectorStore
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = normalize_rows(self.embedding.embed_documents(texts)).astype(np.float32)
+        with self.lock:
+            list_ids = self._assign(vectors)
+            self.db.executemany(
+                "INSERT OR REPLACE INTO vectors (id, list_id, vector, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (vector_id, list_id, vector.tobytes(), text, json.dumps(metadata, default=str))
+                    for vector_id, list_id, vector, text, metadata in zip(ids, list_ids, vectors, texts, metadatas)
+                ],
+            )
+            self.db.commit()
+            self._maybe_train()
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self.lock:
+            for start in range(0, len(ids), 900):
+                chunk = ids[start:start + 900]
+                self.db.execute(f"DELETE FROM vectors WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            self.db.commit()
+        return True
+
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT id, text, metadata FROM vectors WHERE id IN ({','.join('?' * len(ids))})", list(ids)
+            ).fetchall()
+        by_id = {row[0]: Document(page_content=row[1], metadata=json.loads(row[2])) for row in rows}
+        return [by_id[vector_id] for vector_id in ids if vector_id in by_id]
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        query = normalize_rows(embedding)[0]
+        where, params = filter_clause(filter)
+        with self.lock:
+            centroids = self._load_centroids()
+            if centroids is not None:
+                probes = np.argsort(-(centroids @ query))[:self.nprobe].tolist()
+                where += f" AND list_id IN ({','.join('?' * len(probes))})"
+                params = params + probes
+            rows = self.db.execute(f"SELECT id, vector FROM vectors WHERE {where}", params).fetchall()
+        if not rows:
+            return []
+        scores = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) @ query
+        top = np.argsort(-scores)[:k]
+        documents = self.get_by_ids([rows[i][0] for i in top])
+        return [(document, float(scores[i])) for document, i in zip(documents, top)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k, filter, **kwargs)
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [document for document, _ in self.similarity_search_by_vector_with_score(embedding, k, filter, **kwargs)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k, filter, **kwargs)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        db_path: str = "vectors.sqlite",
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(db_path, embedding)
+        store.add_texts(texts, metadatas, **kwargs)
+        return store
+
+class LocalVectorBackend:
+    """Serves one LocalVectorStore per index from the indexing directory, in place of PineconeStore."""
+
+    def __init__(self):
+        self.stores = {}
+        self.lock = threading.Lock()
+        self.storage_path = indexing_directory + "/local_vectors"
+
+    def get_vector_store(self, index_name):
+        with self.lock:
+            if index_name not in self.stores:
+                # Imported here so the store module stays free of model setup
+                from app.initialization import gemini_langchain_embeddings
+                self.stores[index_name] = LocalVectorStore(
+                    f"{self.storage_path}/{index_name}.sqlite", gemini_langchain_embeddings
+                )
+            return self.stores[index_name]
+
+local_vector_backend = LocalVectorBackend()
@@ -0,0 +1,205 @@
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager, suppress
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.stores import ByteStore
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Record header: tombstone flag, key length, value length
+RECORD_HEADER = struct.Struct("<BII")
+LIVE = 0
+TOMBSTONE = 1
+# Segments are rewritten once this fraction of their bytes is overwritten or deleted records
+COMPACTION_RATIO = 0.5
+COMPACTION_MIN_BYTES = 1024 * 1024
+
+def has_files(directory: str) -> bool:
+    """Whether a directory exists and holds at least one file, at any depth."""
+    return any(files for _, _, files in os.walk(directory))
+
+class PackedByteStore(ByteStore):
+    """
+    ByteStore kept in a single append-only segment file per index.
+
+    Every mset / mdelete appends records (a delete appends a tombstone), and an
+    in-memory offset index maps each key to the span of its latest value. Reads go
+    through a memory map of the segment, so mget hydrates any number of keys without
+    a syscall per key. Appends from other processes are picked up by scanning the
+    tail of the segment; a compaction rewrites only the live records and swaps the
+    file in atomically, which readers detect by its inode.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.RLock()
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        self.scanned = 0
+        self.dead_bytes = 0
+        self.inode = None
+        self.map = None
+        self.map_size = 0
+        if not os.path.exists(path):
+            open(path, "ab").close()
+
+    @contextmanager
+    def _write_lock(self):
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reset(self):
+        if self.map is not None:
+            self.map.close()
+        self.offsets, self.scanned, self.dead_bytes, self.map, self.map_size = {}, 0, 0, None, 0
+
+    def _refresh(self):
+        """Bring the offset index and memory map up to the segment's current size."""
+        stat = os.stat(self.path)
+        if stat.st_ino != self.inode:
+            self._reset()
+            self.inode = stat.st_ino
+        if stat.st_size == self.map_size:
+            return
+        if self.map is not None:
+            self.map.close()
+        with open(self.path, "rb") as segment:
+            self.map = mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else None
+        self.map_size = stat.st_size
+        self._scan()
+
+    def _scan(self):
+        position = self.scanned
+        while position + RECORD_HEADER.size <= self.map_size:
+            flag, key_length, value_length = RECORD_HEADER.unpack_from(self.map, position)
+            end = position + RECORD_HEADER.size + key_length + value_length
+            if end > self.map_size:
+                # A record still being written by another process
+                break
+            key = self.map[position + RECORD_HEADER.size:position + RECORD_HEADER.size + key_length].decode("utf-8")
+            previous = self.offsets.pop(key, None)
+            if previous is not None:
+                self.dead_bytes += RECORD_HEADER.size + len(key.encode("utf-8")) + previous[1]
+            if flag == LIVE:
+                self.offsets[key] = (end - value_length, value_length)
+            else:
+                self.dead_bytes += end - position
+            position = end
+        self.scanned = position
+
+    def _append(self, records: Sequence[Tuple[int, str, bytes]]):
+        payload = bytearray()
+        for flag, key, value in records:
+            encoded_key = key.encode("utf-8")
+            payload += RECORD_HEADER.pack(flag, len(encoded_key), len(value))
+            payload += encoded_key
+            payload += value
+        with self.lock, self._write_lock():
+            with open(self.path, "ab") as segment:
+                segment.write(payload)
+                segment.flush()
+                os.fsync(segment.fileno())
+            self._refresh()
+            if self.dead_bytes > COMPACTION_MIN_BYTES and self.dead_bytes > self.map_size * COMPACTION_RATIO:
+                self._compact_locked()
+
+    # ByteStore
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        with self.lock:
+            self._refresh()
+            values = []
+            for key in keys:
+                span = self.offsets.get(key)
+                values.append(self.map[span[0]:span[0] + span[1]] if span else None)
+            return values
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, bytes]]) -> None:
+        if key_value_pairs:
+            self._append([(LIVE, key, value) for key, value in key_value_pairs])
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        with self.lock:
+            self._refresh()
+            present = [key for key in keys if key in self.offsets]
+        if present:
+            self._append([(TOMBSTONE, key, b"") for key in present])
+
+    def yield_keys(self, *, prefix: Optional[str] = None) -> Iterator[str]:
+        with self.lock:
+            self._refresh()
+            keys = list(self.offsets)
+        for key in keys:
+            if prefix is None or key.startswith(prefix):
+                yield key
+
+    # Maintenance
+
+    def compact(self):
+        """Rewrite the segment with only the latest live value of every key."""
+        with self.lock, self._write_lock():
+            self._refresh()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        temp_path = f"{self.path}.compacting"
+        with open(temp_path, "wb") as segment:
+            for key, (offset, length) in self.offsets.items():
+                encoded_key = key.encode("utf-8")
+                segment.write(RECORD_HEADER.pack(LIVE, len(encoded_key), length))
+                segment.write(encoded_key)
+                segment.write(self.map[offset:offset + length])
+            segment.flush()
+            os.fsync(segment.fileno())
+        reclaimed = self.dead_bytes
+        os.replace(temp_path, self.path)
+        self._refresh()
+        logger.info(f"Compacted {self.path}: {len(self.offsets)} keys, {reclaimed} bytes reclaimed")
+
+    def import_directory(self, directory: str) -> int:
+        """Load a LocalFileStore directory (one file per key) into the segment."""
+        pairs = []
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                file_path = os.path.join(root, file_name)
+                with open(file_path, "rb") as file:
+                    pairs.append((os.path.relpath(file_path, directory).replace(os.sep, "/"), file.read()))
+        self.mset(pairs)
+        return len(pairs)
+
+    @classmethod
+    def from_directory(cls, path: str, legacy_directory: str) -> "PackedByteStore":
+        """
+        Open the segment at path, migrating a LocalFileStore directory into it the first time.
+
+        The migration is written to a temporary segment and moved into place, so an
+        interrupted migration is simply retried. The legacy directory is left untouched.
+        """
+        if not os.path.exists(path) and has_files(legacy_directory):
+            temp_path = f"{path}.migrating"
+            with suppress(FileNotFoundError):
+                os.remove(temp_path)
+            migrated = cls(temp_path).import_directory(legacy_directory)
+            os.replace(temp_path, path)
+            with suppress(FileNotFoundError):
+                os.remove(f"{temp_path}.lock")
+            logger.info(f"Migrated {migrated} docstore entries from {legacy_directory} to {path}")
+        return cls(path)
+
+    def stats(self) -> dict:
+        with self.lock:
+            self._refresh()
+            return {
+                "keys": len(self.offsets),
+                "segment_bytes": self.map_size,
+                "dead_bytes": self.dead_bytes,
+            }
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from app.config import get_settings
+from app.storage.disk_store import indexing_directory
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ParseCache:
+    """
+    Disk-backed, content-addressed cache of parsed markdown.
+
+    Entries are keyed by the SHA-256 of the file bytes plus the parse options and
+    evicted least-recently-used first once the cache grows past max_bytes.
+    File modification times track recency, so the order survives restarts.
+    """
+
+    def __init__(self, cache_directory: str = None, max_bytes: int = None):
+        self.cache_directory = cache_directory or indexing_directory + "/parse_cache"
+        self.max_bytes = max_bytes or get_settings().PARSE_CACHE_MAX_BYTES
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.cache_directory, exist_ok=True)
+        self.size_bytes = sum(entry.stat().st_size for entry in os.scandir(self.cache_directory) if entry.is_file())
+
+    @staticmethod
+    def make_key(content_hash: str, options: dict) -> str:
+        """Combine a hex SHA-256 of the file bytes with the parse options into a cache key."""
+        options_hash = hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()
+        return hashlib.sha256(f"{content_hash}:{options_hash}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_directory, f"{key}.md")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as cached:
+                content = cached.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return content
+
+    def put(self, key: str, content: str):
+        path = self._path(key)
+        data = content.encode("utf-8")
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as cached:
+            cached.write(data)
+        with self.lock:
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+            self.size_bytes += len(data) - previous_size
+            self._evict()
+
+    def _evict(self):
+        if self.size_bytes <= self.max_bytes:
+            return
+        entries = sorted(
+            (entry for entry in os.scandir(self.cache_directory) if entry.name.endswith(".md")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if self.size_bytes <= self.max_bytes:
+                break
+            size = entry.stat().st_size
+            os.remove(entry.path)
+            self.size_bytes -= size
+            self.evictions += 1
+            logger.info(f"Evicted parse cache entry {entry.name}")
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+_parse_cache = None
+_parse_cache_lock = threading.Lock()
+
+def get_parse_cache() -> ParseCache:
+    """The process-wide parse cache, created with its directory on first use."""
+    global _parse_cache
+    with _parse_cache_lock:
+        if _parse_cache is None:
+            _parse_cache = ParseCache()
+        return _parse_cache
@@ -1,8 +1,11 @@
 from pinecone import Pinecone, ServerlessSpec
 from langchain_pinecone import PineconeVectorStore
 import logging
+import threading
+import time
 from dotenv import load_dotenv
-import os   
+import os
+from app.config import get_settings
 from app.initialization import gemini_langchain_embeddings
 
 load_dotenv()
@@ -11,35 +14,129 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class PineconeRegistry:
+    """
+    Process-wide Pinecone client and index handles.
+
+    Index existence is cached for a TTL and refreshed with a single list_indexes call,
+    so queries and memory operations make no control-plane calls. Indexes are created
+    at most once and handed out only after Pinecone reports them ready.
+    """
+
+    def __init__(self, ttl_seconds: float, ready_timeout_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.ready_timeout_seconds = ready_timeout_seconds
+        self.lock = threading.Lock()
+        self.client = None
+        self.handles = {}
+        self.index_locks = {}
+        self.vector_stores = {}
+        self.known_indexes = set()
+        self.known_at = 0.0
+        self.handle_hits = 0
+        self.list_calls = 0
+        self.created = 0
+
+    def _client(self):
+        if self.client is None:
+            self.client = Pinecone(api_key=os.getenv("PINE_CONE_API_KEY"))
+            logger.info("Pinecone initialized")
+        return self.client
+
+    def _refresh_known_indexes(self):
+        self.known_indexes = {index["name"] for index in self._client().list_indexes()}
+        self.known_at = time.monotonic()
+        self.list_calls += 1
+
+    def _wait_until_ready(self, index_name):
+        deadline = time.monotonic() + self.ready_timeout_seconds
+        delay = 0.5
+        while not self._client().describe_index(index_name).status["ready"]:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Pinecone index {index_name} was not ready after {self.ready_timeout_seconds}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+    def get_index(self, index_name):
+        with self.lock:
+            fresh = time.monotonic() - self.known_at < self.ttl_seconds
+            if fresh and index_name in self.handles:
+                self.handle_hits += 1
+                return self.handles[index_name]
+            index_lock = self.index_locks.setdefault(index_name, threading.Lock())
+
+        # Creating and waiting for an index holds only that index's lock.
+        with index_lock:
+            with self.lock:
+                if time.monotonic() - self.known_at >= self.ttl_seconds or index_name not in self.known_indexes:
+                    self._refresh_known_indexes()
+                exists = index_name in self.known_indexes
+            if not exists:
+                self._client().create_index(
+                    name=index_name,
+                    dimension=768, # Replace with your model dimensions
+                    metric="cosine", # Replace with your model metric
+                    spec=ServerlessSpec(
+                        cloud="aws",
+                        region="us-east-1"
+                    )
+                )
+                self._wait_until_ready(index_name)
+                logger.info(f"Index {index_name} created")
+            with self.lock:
+                if not exists:
+                    self.known_indexes.add(index_name)
+                    self.created += 1
+                if index_name not in self.handles:
+                    self.handles[index_name] = self._client().Index(index_name)
+                return self.handles[index_name]
+
+    def get_vector_store(self, index_name):
+        index = self.get_index(index_name)
+        with self.lock:
+            if index_name not in self.vector_stores:
+                self.vector_stores[index_name] = PineconeVectorStore(index=index, embedding=gemini_langchain_embeddings)
+            return self.vector_stores[index_name]
+
+    def close(self):
+        with self.lock:
+            for handle in self.handles.values():
+                close = getattr(handle, "close", None)
+                if close:
+                    close()
+            self.handles.clear()
+            self.vector_stores.clear()
+            self.known_indexes.clear()
+            self.known_at = 0.0
+            logger.info("Pinecone index handles closed")
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "handles": len(self.handles),
+                "handle_hits": self.handle_hits,
+                "list_indexes_calls": self.list_calls,
+                "indexes_created": self.created,
+            }
+
+pinecone_registry = PineconeRegistry(
+    ttl_seconds=get_settings().PINECONE_INDEX_TTL_SECONDS,
+    ready_timeout_seconds=get_settings().PINECONE_READY_TIMEOUT_SECONDS,
+)
+
 class PineconeStore:
     def __init__(self):
-        self.initialized_pinecone = Pinecone(api_key=os.getenv("PINE_CONE_API_KEY"))
-        logger.info("Pinecone initialized")
+        self.registry = pinecone_registry
 
     def get_index(self, index_name):
         # Replace underscores with hyphens in index name
         index_name = index_name.replace("_", "-")
-        indexes_list = self.initialized_pinecone.list_indexes()
-        if index_name not in [index["name"] for index in indexes_list]:
-            self.initialized_pinecone.create_index(
-                name=index_name,
-                dimension=768, # Replace with your model dimensions
-                metric="cosine", # Replace with your model metric
-                spec=ServerlessSpec(
-                    cloud="aws",
-                    region="us-east-1"
-                ) 
-            )
-            logger.info(f"Index {index_name} created")
-            return self.initialized_pinecone.Index(index_name)
-        else:
-            logger.info(f"Index {index_name} already exists")
-            return self.initialized_pinecone.Index(index_name)
+        return self.registry.get_index(index_name)
 
     def get_vector_store(self, index_name):
-        return PineconeVectorStore(index=self.get_index(index_name), embedding=gemini_langchain_embeddings)
+        return self.registry.get_vector_store(index_name.replace("_", "-"))
 
 # Example usage
 # pinecone_store = PineconeStore(api_key='your_api_key', environment='us-west1')
 # pinecone_store.create_index('my_index')
-# vector_store = pinecone_store.get_vector_store('my_index')
\ No newline at end of file
+# vector_store = pinecone_store.get_vector_store('my_index')
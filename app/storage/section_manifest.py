@@ -0,0 +1,42 @@
+import hashlib
+import json
+import logging
+import os
+from app.storage.disk_store import indexing_directory
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+manifest_directory = indexing_directory + "/section_manifests"
+
+class SectionManifest:
+    """
+    Per-file record of the indexed sections of a document.
+
+    Each entry holds the section's content hash, its doc_id, the vector ids upserted
+    for it and its summary, so a new revision of the file only needs the changed
+    sections enriched and the removed ones retracted.
+    """
+
+    @staticmethod
+    def _path(index_name, file_name):
+        file_key = hashlib.sha256(file_name.encode("utf-8")).hexdigest()
+        return f"{manifest_directory}/{index_name}/{file_key}.json"
+
+    @staticmethod
+    def load(index_name, file_name):
+        try:
+            with open(SectionManifest._path(index_name, file_name), "r", encoding="utf-8") as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            return {"file_name": file_name, "sections": []}
+
+    @staticmethod
+    def save(index_name, file_name, sections):
+        path = SectionManifest._path(index_name, file_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as manifest_file:
+            json.dump({"file_name": file_name, "sections": sections}, manifest_file)
+        os.replace(f"{path}.tmp", path)
+        logger.info(f"Section manifest saved for file {file_name} in index {index_name}")
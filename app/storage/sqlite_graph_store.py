@@ -0,0 +1,452 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from llama_index.core.graph_stores.types import (
+    ChunkNode,
+    EntityNode,
+    LabelledNode,
+    PropertyGraphStore,
+    Relation,
+    Triplet,
+)
+from llama_index.core.vector_stores.types import VectorStoreQuery
+from .embedding_matrix import EmbeddingMatrix
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+GRAPH_DB_FILE = "graph.sqlite"
+# Property PropertyGraphIndex stamps on extracted nodes and relations with the id of the chunk they came from
+TRIPLET_SOURCE_KEY = "triplet_source_id"
+# SQLite limits the number of bound parameters per statement
+MAX_QUERY_PARAMS = 900
+# Share of embedding matrix rows belonging to deleted nodes that triggers a rebuild
+MATRIX_COMPACTION_RATIO = 0.25
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    label TEXT NOT NULL,
+    name TEXT,
+    ref_doc_id TEXT,
+    source_chunk_id TEXT,
+    body TEXT NOT NULL,
+    embedding BLOB
+);
+CREATE INDEX IF NOT EXISTS nodes_name ON nodes (name);
+CREATE INDEX IF NOT EXISTS nodes_ref_doc_id ON nodes (ref_doc_id);
+CREATE INDEX IF NOT EXISTS nodes_source_chunk_id ON nodes (source_chunk_id);
+CREATE TABLE IF NOT EXISTS relations (
+    source_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    target_id TEXT NOT NULL,
+    source_chunk_id TEXT,
+    properties TEXT NOT NULL,
+    PRIMARY KEY (source_id, label, target_id)
+);
+CREATE INDEX IF NOT EXISTS relations_target ON relations (target_id);
+CREATE INDEX IF NOT EXISTS relations_label ON relations (label);
+CREATE INDEX IF NOT EXISTS relations_source_chunk_id ON relations (source_chunk_id);
+"""
+
+def _chunks(values: List[Any], size: int = MAX_QUERY_PARAMS):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _placeholders(values) -> str:
+    return ",".join("?" * len(values))
+
+class SQLitePropertyGraphStore(PropertyGraphStore):
+    """
+    Property graph store kept in one SQLite file per index.
+
+    Nodes, relations and node embeddings live in indexed tables, so an ingestion writes
+    only the rows it adds and triplet lookups by entity name or relation label use an
+    index instead of scanning the graph. Writes made inside `transaction()` are committed
+    together.
+
+    Node embeddings are mirrored into a memory-mapped EmbeddingMatrix next to the database,
+    which answers vector queries. Rows are appended in insertion order after every commit;
+    `seq` never reuses values, so the matrix only has to remember the last one it holds.
+    Re-embedding a node gives it a new `seq`, so its new vector is appended as well and
+    supersedes the old row.
+    """
+
+    supports_structured_queries: bool = False
+    supports_vector_queries: bool = True
+
+    def __init__(self, db_path: str, quantize_embeddings: bool = False):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.lock = threading.RLock()
+        self.transaction_depth = 0
+        self.db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+        self.embedding_matrix = EmbeddingMatrix(os.path.dirname(db_path) or ".", quantize=quantize_embeddings)
+        self.sync_embedding_matrix()
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str, quantize_embeddings: bool = False) -> "SQLitePropertyGraphStore":
+        return cls(os.path.join(persist_dir, GRAPH_DB_FILE), quantize_embeddings=quantize_embeddings)
+
+    @property
+    def client(self) -> Any:
+        return self.db
+
+    @contextmanager
+    def transaction(self):
+        """Group every write made inside the block into a single commit."""
+        with self.lock:
+            self.transaction_depth += 1
+            try:
+                yield self
+            except Exception:
+                self.transaction_depth -= 1
+                if self.transaction_depth == 0:
+                    self.db.rollback()
+                raise
+            self.transaction_depth -= 1
+            self._commit()
+
+    def _commit(self):
+        if self.transaction_depth == 0:
+            self.db.commit()
+            self.sync_embedding_matrix()
+
+    @staticmethod
+    def _vectors(rows) -> np.ndarray:
+        return np.stack([np.frombuffer(blob, dtype=np.float32) for blob in rows])
+
+    def sync_embedding_matrix(self):
+        """Append embeddings of nodes added since the last sync, rebuilding when too many rows are dead."""
+        with self.lock:
+            matrix = self.embedding_matrix
+            (max_seq,) = self.db.execute("SELECT COALESCE(MAX(seq), 0) FROM nodes").fetchone()
+            if not matrix.is_compatible():
+                return self.rebuild_embedding_matrix()
+            last_seq = matrix.last_seq
+            if max_seq < last_seq:
+                # The database was replaced under the matrix, e.g. by a migration.
+                return self.rebuild_embedding_matrix()
+            if max_seq > last_seq:
+                rows = self.db.execute(
+                    "SELECT id, embedding FROM nodes WHERE seq > ? AND embedding IS NOT NULL ORDER BY seq", (last_seq,)
+                ).fetchall()
+                matrix.append([row[0] for row in rows], self._vectors([row[1] for row in rows]) if rows else None, max_seq)
+            matrix.refresh()
+            if matrix.rows:
+                (live,) = self.db.execute("SELECT COUNT(*) FROM nodes WHERE embedding IS NOT NULL").fetchone()
+                if matrix.rows - live > MATRIX_COMPACTION_RATIO * matrix.rows:
+                    self.rebuild_embedding_matrix()
+
+    def rebuild_embedding_matrix(self):
+        with self.lock:
+            (max_seq,) = self.db.execute("SELECT COALESCE(MAX(seq), 0) FROM nodes").fetchone()
+            rows = self.db.execute("SELECT id, embedding FROM nodes WHERE embedding IS NOT NULL ORDER BY seq").fetchall()
+            self.embedding_matrix.rebuild(
+                [row[0] for row in rows], self._vectors([row[1] for row in rows]) if rows else None, max_seq
+            )
+            logger.info(f"Rebuilt embedding matrix of {self.db_path}: {self.embedding_matrix.stats()}")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    # Serialization
+
+    @staticmethod
+    def _node_row(node: LabelledNode) -> tuple:
+        properties = node.properties or {}
+        kind = "chunk" if isinstance(node, ChunkNode) else "entity"
+        body = node.model_dump(exclude={"embedding"})
+        embedding = np.asarray(node.embedding, dtype=np.float32).tobytes() if node.embedding else None
+        return (
+            node.id,
+            kind,
+            node.label,
+            getattr(node, "name", None),
+            properties.get("ref_doc_id"),
+            properties.get(TRIPLET_SOURCE_KEY),
+            json.dumps(body, default=str),
+            embedding,
+        )
+
+    @staticmethod
+    def _node_from_row(kind: str, body: str) -> LabelledNode:
+        data = json.loads(body)
+        return ChunkNode(**data) if kind == "chunk" else EntityNode(**data)
+
+    @staticmethod
+    def _relation_from_row(source_id: str, label: str, target_id: str, properties: str) -> Relation:
+        return Relation(label=label, source_id=source_id, target_id=target_id, properties=json.loads(properties))
+
+    def _nodes_by_id(self, ids) -> Dict[str, LabelledNode]:
+        nodes = {}
+        for chunk in _chunks(set(ids)):
+            rows = self.db.execute(
+                f"SELECT id, kind, body FROM nodes WHERE id IN ({_placeholders(chunk)})", chunk
+            ).fetchall()
+            for node_id, kind, body in rows:
+                nodes[node_id] = self._node_from_row(kind, body)
+        return nodes
+
+    def _to_triplets(self, rows) -> List[Triplet]:
+        """Hydrate relation rows into triplets, skipping relations whose endpoint is gone."""
+        nodes = self._nodes_by_id([row[0] for row in rows] + [row[2] for row in rows])
+        triplets = []
+        for source_id, label, target_id, properties in rows:
+            if source_id in nodes and target_id in nodes:
+                relation = self._relation_from_row(source_id, label, target_id, properties)
+                triplets.append((nodes[source_id], relation, nodes[target_id]))
+        return triplets
+
+    @staticmethod
+    def _property_clause(column: str, properties: dict) -> Tuple[str, list]:
+        clauses, params = [], []
+        for key, value in properties.items():
+            clauses.append(f"json_extract({column}, ?) = ?")
+            params.extend([f"$.{key}", value])
+        return " AND ".join(clauses), params
+
+    # PropertyGraphStore
+
+    def get(self, properties: Optional[dict] = None, ids: Optional[List[str]] = None) -> List[LabelledNode]:
+        with self.lock:
+            query, params = "SELECT kind, body FROM nodes", []
+            clauses = []
+            for key, value in (properties or {}).items():
+                if key == "ref_doc_id":
+                    clauses.append("ref_doc_id = ?")
+                    params.append(value)
+                else:
+                    clause, clause_params = self._property_clause("body", {f"properties.{key}": value})
+                    clauses.append(clause)
+                    params.extend(clause_params)
+            if ids is not None:
+                if not ids:
+                    return []
+                found = self._nodes_by_id(ids)
+                nodes = [found[node_id] for node_id in dict.fromkeys(ids) if node_id in found]
+                if not properties:
+                    return nodes
+                return [node for node in nodes if all(node.properties.get(k) == v for k, v in properties.items())]
+            if clauses:
+                query += " WHERE " + " AND ".join(clauses)
+            return [self._node_from_row(kind, body) for kind, body in self.db.execute(query, params).fetchall()]
+
+    def get_triplets(
+        self,
+        entity_names: Optional[List[str]] = None,
+        relation_names: Optional[List[str]] = None,
+        properties: Optional[dict] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[Triplet]:
+        if not (entity_names or relation_names or properties or ids):
+            return []
+        with self.lock:
+            clauses, params = [], []
+            endpoint_ids = list(entity_names or []) + list(ids or [])
+            if endpoint_ids:
+                marks = _placeholders(endpoint_ids)
+                clauses.append(f"(r.source_id IN ({marks}) OR r.target_id IN ({marks}))")
+                params.extend(endpoint_ids + endpoint_ids)
+            if relation_names:
+                clauses.append(f"r.label IN ({_placeholders(relation_names)})")
+                params.extend(relation_names)
+            if properties:
+                relation_clause, relation_params = self._property_clause("r.properties", properties)
+                node_properties = {f"properties.{k}": v for k, v in properties.items()}
+                source_clause, source_params = self._property_clause("s.body", node_properties)
+                target_clause, target_params = self._property_clause("t.body", node_properties)
+                clauses.append(f"(({relation_clause}) OR ({source_clause}) OR ({target_clause}))")
+                params.extend(relation_params + source_params + target_params)
+            rows = self.db.execute(
+                "SELECT r.source_id, r.label, r.target_id, r.properties FROM relations r "
+                "JOIN nodes s ON s.id = r.source_id JOIN nodes t ON t.id = r.target_id "
+                "WHERE " + " AND ".join(clauses),
+                params,
+            ).fetchall()
+            return self._to_triplets(rows)
+
+    def get_rel_map(
+        self,
+        graph_nodes: List[LabelledNode],
+        depth: int = 2,
+        limit: int = 30,
+        ignore_rels: Optional[List[str]] = None,
+    ) -> List[Triplet]:
+        """Breadth-first expansion around graph_nodes, one indexed query per hop."""
+        ignore_rels = list(ignore_rels or [])
+        with self.lock:
+            seen_nodes = {node.id for node in graph_nodes}
+            frontier = list(seen_nodes)
+            seen_relations = set()
+            rows = []
+            for _ in range(depth):
+                if not frontier or len(rows) >= limit:
+                    break
+                next_frontier = []
+                for chunk in _chunks(frontier, MAX_QUERY_PARAMS // 2):
+                    marks = _placeholders(chunk)
+                    query = (
+                        "SELECT source_id, label, target_id, properties FROM relations "
+                        f"WHERE (source_id IN ({marks}) OR target_id IN ({marks}))"
+                    )
+                    params = chunk + chunk
+                    if ignore_rels:
+                        query += f" AND label NOT IN ({_placeholders(ignore_rels)})"
+                        params += ignore_rels
+                    for row in self.db.execute(query, params).fetchall():
+                        key = row[:3]
+                        if key in seen_relations:
+                            continue
+                        seen_relations.add(key)
+                        rows.append(row)
+                        for node_id in (row[0], row[2]):
+                            if node_id not in seen_nodes:
+                                seen_nodes.add(node_id)
+                                next_frontier.append(node_id)
+                frontier = next_frontier
+            return self._to_triplets(rows[:limit])
+
+    def upsert_nodes(self, nodes: List[LabelledNode]) -> None:
+        if not nodes:
+            return
+        rows = [self._node_row(node) for node in nodes]
+        with self.lock:
+            # A node with an embedding replaces its row, which assigns it a new seq so the
+            # next matrix sync appends the new vector.
+            self.db.executemany(
+                "INSERT OR REPLACE INTO nodes (id, kind, label, name, ref_doc_id, source_chunk_id, body, embedding) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[-1] is not None],
+            )
+            # An upsert without an embedding keeps the one already stored for the node, and its seq.
+            self.db.executemany(
+                "INSERT INTO nodes (id, kind, label, name, ref_doc_id, source_chunk_id, body, embedding) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+                "kind = excluded.kind, label = excluded.label, name = excluded.name, "
+                "ref_doc_id = excluded.ref_doc_id, source_chunk_id = excluded.source_chunk_id, "
+                "body = excluded.body",
+                [row for row in rows if row[-1] is None],
+            )
+            self._commit()
+
+    def upsert_relations(self, relations: List[Relation]) -> None:
+        if not relations:
+            return
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO relations (source_id, label, target_id, source_chunk_id, properties) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        relation.source_id,
+                        relation.label,
+                        relation.target_id,
+                        (relation.properties or {}).get(TRIPLET_SOURCE_KEY),
+                        json.dumps(relation.properties or {}, default=str),
+                    )
+                    for relation in relations
+                ],
+            )
+            self._commit()
+
+    def delete(
+        self,
+        entity_names: Optional[List[str]] = None,
+        relation_names: Optional[List[str]] = None,
+        properties: Optional[dict] = None,
+        ids: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Delete matching triplets and nodes.
+
+        Deleting chunk nodes also deletes the relations extracted from those chunks, so
+        retracting a section by ref_doc_id leaves no dangling extracted paths behind.
+        """
+        with self.lock:
+            if entity_names or relation_names or ids:
+                triplets = self.get_triplets(
+                    entity_names=entity_names, relation_names=relation_names, properties=properties, ids=ids
+                )
+                self.db.executemany(
+                    "DELETE FROM relations WHERE source_id = ? AND label = ? AND target_id = ?",
+                    [(relation.source_id, relation.label, relation.target_id) for _, relation, _ in triplets],
+                )
+            elif properties:
+                # Relations touching matching nodes go with the nodes below.
+                clause, params = self._property_clause("properties", properties)
+                self.db.execute(f"DELETE FROM relations WHERE {clause}", params)
+            node_ids = list(entity_names or [])
+            if properties or ids:
+                node_ids += [node.id for node in self.get(properties=properties, ids=ids)]
+            for chunk in _chunks(set(node_ids), MAX_QUERY_PARAMS // 3):
+                marks = _placeholders(chunk)
+                self.db.execute(
+                    f"DELETE FROM relations WHERE source_id IN ({marks}) OR target_id IN ({marks}) "
+                    f"OR source_chunk_id IN ({marks})",
+                    chunk * 3,
+                )
+                self.db.execute(f"DELETE FROM nodes WHERE id IN ({marks})", chunk)
+            if node_ids:
+                # Entities that no remaining relation refers to were only mentioned by deleted chunks.
+                self.db.execute(
+                    "DELETE FROM nodes WHERE kind = 'entity' AND NOT EXISTS "
+                    "(SELECT 1 FROM relations WHERE source_id = nodes.id OR target_id = nodes.id)"
+                )
+            self._commit()
+
+    def structured_query(self, query: str, param_map: Optional[Dict[str, Any]] = None) -> Any:
+        raise NotImplementedError("SQLitePropertyGraphStore does not support structured queries")
+
+    def vector_query(self, query: VectorStoreQuery, **kwargs: Any) -> Tuple[List[LabelledNode], List[float]]:
+        if query.query_embedding is None:
+            return [], []
+        top_k = query.similarity_top_k
+        # Rows of deleted nodes stay in the matrix until compaction, so ask for a few more.
+        (matches,) = self.embedding_matrix.search([query.query_embedding], top_k * 2)
+        with self.lock:
+            nodes = self._nodes_by_id([node_id for node_id, _ in matches])
+        live = [(nodes[node_id], score) for node_id, score in matches if node_id in nodes][:top_k]
+        return [node for node, _ in live], [score for _, score in live]
+
+    def get_schema(self, refresh: bool = False) -> str:
+        with self.lock:
+            labels = self.db.execute("SELECT DISTINCT label FROM relations").fetchall()
+        return ", ".join(label for (label,) in labels)
+
+    def persist(self, persist_path: str, fs=None) -> None:
+        # Every write is already committed to the database file.
+        return None
+
+    def import_graph(self, nodes: List[LabelledNode], triplets: List[Triplet], embeddings: Optional[dict] = None):
+        """Copy a graph loaded from another store, attaching embeddings keyed by node id."""
+        embeddings = embeddings or {}
+        for node in nodes:
+            if node.embedding is None and node.id in embeddings:
+                node.embedding = embeddings[node.id]
+        with self.transaction():
+            self.upsert_nodes(nodes)
+            self.upsert_relations([relation for _, relation, _ in triplets])
+
+    def stats(self) -> dict:
+        with self.lock:
+            node_count, embedded = self.db.execute("SELECT COUNT(*), COUNT(embedding) FROM nodes").fetchone()
+            (relation_count,) = self.db.execute("SELECT COUNT(*) FROM relations").fetchone()
+        return {
+            "nodes": node_count,
+            "embedded_nodes": embedded,
+            "relations": relation_count,
+            "embedding_matrix": self.embedding_matrix.stats(),
+        }
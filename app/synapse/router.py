@@ -2,6 +2,13 @@ from fastapi import APIRouter
 from typing import Dict, Any
 
 from app.data_layer.db_config import MongoDBConfig
+from app.storage.parse_cache import get_parse_cache
+from app.storage.disk_store import index_cache
+from app.core.common.rate_limiter import rate_limiter_metrics
+from app.core.common.embedding_cache import get_embedding_store
+from app.core.common.multivector_retriever import retriever_pool
+from app.core.reasoner.table_service import table_service
+from app.config import get_settings
 
 router = APIRouter()
 
@@ -36,3 +43,25 @@ async def system_info() -> Dict[str, Any]:
             "pattern_recognition"
         ]
     }
+
+
+@router.get("/metrics")
+async def metrics() -> Dict[str, Any]:
+    """
+    Get cache and throughput metrics of the running process
+    """
+    return {
+        "parse_cache": get_parse_cache().stats(),
+        "rate_limiters": rate_limiter_metrics(),
+        "embedding_cache": get_embedding_store().stats(),
+        "index_cache": index_cache.stats(),
+        "retriever_pool": retriever_pool.stats(),
+        "tables": table_service.stats(),
+        "pinecone": pinecone_stats(),
+    }
+
+def pinecone_stats() -> Dict[str, Any]:
+    if get_settings().VECTOR_STORE_BACKEND != "pinecone":
+        return {}
+    from app.storage.pinecone import pinecone_registry
+    return pinecone_registry.stats()
@@ -0,0 +1,52 @@
+from langchain_core.embeddings import Embeddings
+
+from app.core.common import embedding_cache
+from app.core.common.embedding_cache import CachedEmbeddings, EmbeddingStore
+
+
+class CountingEmbeddings(Embeddings):
+    model = "counting"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_repeated_embed_documents_reaches_the_model_once(tmp_path):
+    model = CountingEmbeddings()
+    embeddings = CachedEmbeddings(model, store=EmbeddingStore(db_path=str(tmp_path / "embeddings.sqlite")))
+
+    first = embeddings.embed_documents(["alpha", "beta", "alpha"])
+    second = embeddings.embed_documents(["beta", "alpha"])
+
+    assert model.calls == [["alpha", "beta"]]
+    assert first == [[5.0, 1.0], [4.0, 1.0], [5.0, 1.0]]
+    assert second == [[4.0, 1.0], [5.0, 1.0]]
+
+
+def test_vectors_survive_a_new_store_on_the_same_file(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    CachedEmbeddings(CountingEmbeddings(), store=EmbeddingStore(db_path=path)).embed_documents(["alpha"])
+    model = CountingEmbeddings()
+
+    assert CachedEmbeddings(model, store=EmbeddingStore(db_path=path)).embed_documents(["alpha"]) == [[5.0, 1.0]]
+    assert model.calls == []
+
+
+def test_store_is_opened_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "_embedding_store", None)
+    monkeypatch.setattr(
+        embedding_cache, "EmbeddingStore", lambda: EmbeddingStore(db_path=str(tmp_path / "embeddings.sqlite"))
+    )
+    embeddings = CachedEmbeddings(CountingEmbeddings())
+    assert embedding_cache._embedding_store is None
+
+    embeddings.embed_query("alpha")
+
+    assert embedding_cache._embedding_store is embeddings.store
@@ -0,0 +1,51 @@
+import numpy as np
+
+from app.storage import embedding_matrix
+from app.storage.embedding_matrix import EmbeddingMatrix, normalize_rows
+
+
+def random_matrix(tmp_path, name, vectors, quantize):
+    matrix = EmbeddingMatrix(str(tmp_path), name=name, quantize=quantize)
+    matrix.append([f"node-{i}" for i in range(len(vectors))], vectors, last_seq=len(vectors))
+    return matrix
+
+
+def test_blocked_float32_search_matches_brute_force(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_matrix, "SEARCH_BLOCK_ROWS", 64)
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((500, 32)).astype(np.float32)
+    queries = rng.standard_normal((4, 32)).astype(np.float32)
+    matrix = random_matrix(tmp_path, "exact", vectors, quantize=False)
+
+    expected = normalize_rows(queries) @ normalize_rows(vectors).T
+    for query_scores, matches in zip(expected, matrix.search(queries, 10)):
+        top = np.argsort(-query_scores)[:10]
+        assert [node_id for node_id, _ in matches] == [f"node-{i}" for i in top]
+        assert np.allclose([score for _, score in matches], query_scores[top], atol=1e-5)
+
+
+def test_int8_top_k_agrees_with_float32(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((2000, 64)).astype(np.float32)
+    # Queries near stored vectors, so each has a clear nearest neighbour
+    queries = vectors[:20] + 0.3 * rng.standard_normal((20, 64)).astype(np.float32)
+    exact = random_matrix(tmp_path, "exact", vectors, quantize=False).search(queries, 10)
+    quantized = random_matrix(tmp_path, "quantized", vectors, quantize=True).search(queries, 10)
+
+    for i, (exact_matches, quantized_matches) in enumerate(zip(exact, quantized)):
+        assert quantized_matches[0][0] == exact_matches[0][0] == f"node-{i}"
+        overlap = {node_id for node_id, _ in exact_matches} & {node_id for node_id, _ in quantized_matches}
+        assert len(overlap) >= 8
+        assert abs(quantized_matches[0][1] - exact_matches[0][1]) < 0.01
+
+
+def test_only_the_latest_row_of_a_reappended_id_is_searched(tmp_path):
+    matrix = EmbeddingMatrix(str(tmp_path))
+    matrix.append(["a", "b"], [[1.0, 0.0], [0.0, 1.0]], last_seq=2)
+    matrix.append(["a"], [[0.0, -1.0]], last_seq=3)
+
+    (matches,) = matrix.search([[1.0, 1.0]], 3)
+
+    # The first row of "a" would score 0.71 and rank first
+    assert [node_id for node_id, _ in matches] == ["b", "a"]
+    assert np.allclose([score for _, score in matches], [0.7071, -0.7071], atol=1e-4)
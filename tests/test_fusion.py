@@ -0,0 +1,21 @@
+from app.core.reasoner.retrievers.fusion import reciprocal_rank_fusion
+
+
+def test_keys_found_by_both_retrievers_rise_to_the_top():
+    dense = [("a", "dense a"), ("b", "dense b"), ("c", "dense c")]
+    sparse = [("c", "sparse c"), ("d", "sparse d"), ("a", "sparse a")]
+
+    fused = reciprocal_rank_fusion([dense, sparse], k=60)
+
+    # a: 1/61 + 1/63, c: 1/63 + 1/61 tie and keep first-seen order; b: 1/62, d: 1/62
+    assert [key for key, _ in fused] == ["a", "c", "b", "d"]
+    assert dict(fused) == {"a": "dense a", "b": "dense b", "c": "dense c", "d": "sparse d"}
+
+
+def test_small_k_favours_top_ranks_over_agreement():
+    first = [("x", "x"), ("v", "v"), ("y", "y")]
+    second = [("z", "z"), ("w", "w"), ("y", "y")]
+
+    # k=0: x and z score 1, y 2/3, v and w 1/2
+    assert [key for key, _ in reciprocal_rank_fusion([first, second], k=0)] == ["x", "z", "y", "v", "w"]
+    assert [key for key, _ in reciprocal_rank_fusion([first, second], k=60)] == ["y", "x", "z", "v", "w"]
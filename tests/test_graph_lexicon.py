@@ -0,0 +1,50 @@
+import pytest
+
+from app.storage.graph_lexicon import GraphLexicon
+
+
+@pytest.fixture
+def lexicon():
+    return GraphLexicon.build(
+        ["The Reserve Bank", "Interest Rates", "Inflation", "Mortgage Lender"],
+        [
+            ("The Reserve Bank", "SETS", "Interest Rates", "chunk-1"),
+            ("Interest Rates", "AFFECT", "Inflation", "chunk-2"),
+            ("Mortgage Lender", "TRACKS", "Interest Rates", None),
+        ],
+    )
+
+
+def test_keywords_link_to_entities_by_alias(lexicon):
+    assert lexicon.link("reserve bank") == [("The Reserve Bank", 1.0)]
+    assert lexicon.link("interest rate") == [("Interest Rates", 1.0)]
+    assert lexicon.link("RB") == [("The Reserve Bank", 1.0)]
+
+
+def test_misspelled_keywords_link_by_trigram_similarity(lexicon):
+    ((entity_id, similarity),) = lexicon.link("inflaton")
+    assert entity_id == "Inflation"
+    assert 0.5 <= similarity < 1.0
+    assert lexicon.link("weather") == []
+
+
+def test_link_keywords_deduplicates_across_keywords(lexicon):
+    assert lexicon.link_keywords("Reserve Bank, the reserve bank, inflation") == ["The Reserve Bank", "Inflation"]
+
+
+def test_expand_walks_relations_closest_first(lexicon):
+    assert lexicon.expand(["The Reserve Bank"], depth=1) == [
+        ("The Reserve Bank", "SETS", "Interest Rates", "chunk-1"),
+    ]
+    assert lexicon.expand(["The Reserve Bank"], depth=2, ignore_labels=["TRACKS"]) == [
+        ("The Reserve Bank", "SETS", "Interest Rates", "chunk-1"),
+        ("Interest Rates", "AFFECT", "Inflation", "chunk-2"),
+    ]
+
+
+def test_save_and_load_round_trip(lexicon, tmp_path):
+    lexicon.save(str(tmp_path))
+    loaded = GraphLexicon.load(str(tmp_path))
+
+    assert loaded.stats() == lexicon.stats()
+    assert loaded.link("inflaton") == lexicon.link("inflaton")
@@ -0,0 +1,61 @@
+import pytest
+
+index_job_service = pytest.importorskip("app.data_layer.services.index_job_service")
+
+from app.data_layer.models.index_job import IndexJob
+
+
+@pytest.fixture
+def job_service(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        index_job_service.SQLiteConfig, "__init__",
+        lambda self: setattr(self, "db_path", str(tmp_path / "jobs.sqlite")),
+    )
+    return index_job_service.IndexJobService()
+
+
+def queue_job(job_service, user_id="user"):
+    return job_service.insert_job(IndexJob(user_id=user_id, file_name="a.pdf", file_path="/tmp/a.pdf"))
+
+
+def test_jobs_with_a_live_heartbeat_are_not_requeued(job_service):
+    job = queue_job(job_service)
+    job_service.claim_next_job(max_jobs_per_user=1, owner="other-process")
+
+    assert job_service.requeue_stale_jobs(stale_after_seconds=60) == 0
+    assert job_service.get_job(job.id).status == "running"
+
+
+def test_jobs_with_a_stale_heartbeat_are_requeued(job_service, monkeypatch):
+    job = queue_job(job_service)
+    job_service.claim_next_job(max_jobs_per_user=1, owner="dead-process")
+    now = index_job_service.time.time()
+    monkeypatch.setattr(index_job_service.time, "time", lambda: now + 120)
+
+    assert job_service.heartbeat("live-process") == 0
+    assert job_service.requeue_stale_jobs(stale_after_seconds=60) == 1
+    requeued = job_service.get_job(job.id)
+    assert requeued.status == "queued"
+    assert requeued.stages[-1].name == "requeued"
+    assert job_service.claim_next_job(max_jobs_per_user=1, owner="live-process").id == job.id
+
+
+def test_heartbeat_keeps_a_long_job_alive(job_service, monkeypatch):
+    queue_job(job_service)
+    job_service.claim_next_job(max_jobs_per_user=1, owner="live-process")
+    now = index_job_service.time.time()
+    monkeypatch.setattr(index_job_service.time, "time", lambda: now + 120)
+
+    assert job_service.heartbeat("live-process") == 1
+    assert job_service.requeue_stale_jobs(stale_after_seconds=60) == 0
+
+
+def test_release_only_hands_back_the_jobs_of_its_owner(job_service):
+    mine = queue_job(job_service, user_id="a")
+    theirs = queue_job(job_service, user_id="b")
+    job_service.claim_next_job(max_jobs_per_user=1, owner="me")
+    job_service.claim_next_job(max_jobs_per_user=1, owner="them")
+
+    assert job_service.release_jobs("me") == 1
+    assert job_service.get_job(mine.id).status == "queued"
+    assert job_service.get_job(theirs.id).status == "running"
@@ -0,0 +1,76 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.storage import local_vector_store
+from app.storage.local_vector_store import LocalVectorStore
+
+
+class TableEmbeddings(Embeddings):
+    """Embeds the text "i" as row i of a fixed matrix."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[int(text)].tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def clustered_vectors(seed=0, clusters=8, per_cluster=50, dim=16):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    return np.concatenate([
+        center + 0.1 * rng.standard_normal((per_cluster, dim)) for center in centers
+    ]).astype(np.float32)
+
+
+def store_with(tmp_path, vectors, nprobe):
+    store = LocalVectorStore(str(tmp_path / "vectors.sqlite"), TableEmbeddings(vectors), nprobe=nprobe)
+    store.add_texts(
+        [str(i) for i in range(len(vectors))],
+        metadatas=[{"parity": i % 2} for i in range(len(vectors))],
+        ids=[f"v{i}" for i in range(len(vectors))],
+    )
+    return store
+
+
+def exact_top_k(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:k].tolist()
+
+
+def test_ivf_search_recalls_the_neighbours_of_a_clustered_query(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_vector_store, "IVF_MIN_VECTORS", 100)
+    vectors = clustered_vectors()
+    store = store_with(tmp_path, vectors, nprobe=4)
+    # 400 vectors are bucketed into 20 lists, 4 of which are scanned per query
+    assert len(store._load_centroids()) == 20
+
+    for i in (3, 120, 377):
+        results = store.similarity_search_by_vector_with_score(vectors[i].tolist(), k=10)
+        found = [int(document.page_content) for document, _ in results]
+        assert found[0] == i and results[0][1] > 0.999
+        assert len(set(found) & set(exact_top_k(vectors, vectors[i], 10))) >= 8
+
+
+def test_probing_every_list_equals_exhaustive_search(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_vector_store, "IVF_MIN_VECTORS", 100)
+    vectors = clustered_vectors(seed=1)
+    store = store_with(tmp_path, vectors, nprobe=1000)
+    query = np.random.default_rng(2).standard_normal(vectors.shape[1]).astype(np.float32)
+
+    results = store.similarity_search_by_vector(query.tolist(), k=10)
+
+    assert [int(document.page_content) for document in results] == exact_top_k(vectors, query, 10)
+
+
+def test_metadata_filter_is_applied_before_scoring(tmp_path):
+    vectors = clustered_vectors(clusters=2, per_cluster=10)
+    store = store_with(tmp_path, vectors, nprobe=1)
+
+    results = store.similarity_search_by_vector(vectors[0].tolist(), k=3, filter={"parity": {"$eq": 1}})
+
+    assert len(results) == 3
+    assert all(document.metadata["parity"] == 1 for document in results)
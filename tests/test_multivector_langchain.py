@@ -0,0 +1,44 @@
+import pytest
+
+multivector_langchain = pytest.importorskip("app.core.builder.preprocessors.multivector_langchain")
+
+from langchain_core.documents import Document
+
+from app.core.builder.preprocessors.multivector_langchain import MultiVectorLangchain, SectionEnrichment
+
+
+class StubModel:
+    """Chat model stand-in whose combined structured output fails to parse for one section."""
+
+    model = "stub"
+
+    def __call__(self, prompt):
+        return f"summary of {self.section(prompt)}"
+
+    def with_structured_output(self, schema):
+        def structured(prompt):
+            section = self.section(prompt)
+            if schema is SectionEnrichment:
+                if section == "broken":
+                    return None
+                return SectionEnrichment(summary=f"summary of {section}", questions=[f"what is {section}?"])
+            return schema(questions=[f"what is {section}?"])
+        return structured
+
+    @staticmethod
+    def section(prompt):
+        return prompt.to_string().rsplit("\n", 1)[-1]
+
+
+def test_a_section_without_structured_output_is_retried_separately():
+    docs = [Document(page_content=text) for text in ("alpha", "broken", "gamma")]
+    mv = MultiVectorLangchain(docs, ["a", "b", "c"], "file.pdf", StubModel(), "doc_id")
+
+    summary_docs, question_docs = mv.generate_enrichments(docs)
+
+    assert {(d.metadata["doc_id"], d.page_content) for d in summary_docs} == {
+        ("a", "summary of alpha"), ("b", "summary of broken"), ("c", "summary of gamma"),
+    }
+    assert {(d.metadata["doc_id"], d.page_content) for d in question_docs} == {
+        ("a", "what is alpha?"), ("b", "what is broken?"), ("c", "what is gamma?"),
+    }
@@ -0,0 +1,34 @@
+import os
+
+from app.storage.packed_byte_store import PackedByteStore
+
+
+def test_from_directory_with_empty_legacy_directory(tmp_path):
+    legacy_directory = tmp_path / "vector_docstore" / "user"
+    legacy_directory.mkdir(parents=True)
+    path = tmp_path / "packed_docstore" / "user.seg"
+
+    store = PackedByteStore.from_directory(str(path), str(legacy_directory))
+    store.mset([("a", b"A")])
+
+    assert store.mget(["a"]) == [b"A"]
+    assert not os.path.exists(f"{path}.migrating")
+    # Opening again must not fail nor re-run a migration
+    assert PackedByteStore.from_directory(str(path), str(legacy_directory)).mget(["a"]) == [b"A"]
+
+
+def test_from_directory_migrates_populated_legacy_directory(tmp_path):
+    legacy_directory = tmp_path / "vector_docstore" / "user"
+    legacy_directory.mkdir(parents=True)
+    (legacy_directory / "doc-1").write_bytes(b"first")
+    (legacy_directory / "doc-2").write_bytes(b"second")
+    path = tmp_path / "packed_docstore" / "user.seg"
+
+    store = PackedByteStore.from_directory(str(path), str(legacy_directory))
+
+    assert store.mget(["doc-1", "doc-2", "missing"]) == [b"first", b"second", None]
+    assert sorted(store.yield_keys()) == ["doc-1", "doc-2"]
+    assert not os.path.exists(f"{path}.migrating")
+    assert not os.path.exists(f"{path}.migrating.lock")
+    # The legacy directory is left untouched
+    assert sorted(os.listdir(legacy_directory)) == ["doc-1", "doc-2"]
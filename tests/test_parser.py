@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+parser = pytest.importorskip("app.core.builder.parser")
+Parser = parser.Parser
+
+POLL_SETTINGS = SimpleNamespace(
+    PARSER_POLL_INITIAL_SECONDS=0.25,
+    PARSER_POLL_MAX_SECONDS=2.0,
+    PARSER_POLL_TIMEOUT_SECONDS=10.0,
+    PARSER_UPLOAD_CONCURRENCY=2,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake monotonic clock advanced by asyncio.sleep, with jitter pinned to its upper bound."""
+    clock = SimpleNamespace(now=0.0, sleeps=[])
+
+    async def sleep(seconds):
+        clock.sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(parser, "get_settings", lambda: POLL_SETTINGS)
+    monkeypatch.setattr(parser.time, "monotonic", lambda: clock.now)
+    monkeypatch.setattr(parser.asyncio, "sleep", sleep)
+    monkeypatch.setattr(parser.random, "uniform", lambda low, high: high)
+    return clock
+
+
+def llamaparse_client(statuses):
+    """A client whose job status endpoint answers with the given statuses, then the last one forever."""
+    polls = []
+
+    def handler(request):
+        assert request.url.path == "/job/job-1"
+        polls.append(request)
+        return httpx.Response(200, json={"status": statuses[min(len(polls), len(statuses)) - 1]})
+
+    client = httpx.AsyncClient(base_url="http://llamaparse.test", transport=httpx.MockTransport(handler))
+    return client, polls
+
+
+def poll(client):
+    return asyncio.run(Parser._poll_job(client, "job-1", {}, "file.pdf"))
+
+
+def test_poll_checks_quickly_then_backs_off_exponentially(clock):
+    client, polls = llamaparse_client(["PENDING"] * 6 + ["SUCCESS"])
+
+    poll(client)
+
+    assert len(polls) == 7
+    assert clock.sleeps == [0.25, 0.5, 1.0, 2.0, 2.0, 2.0]
+
+
+def test_poll_returns_without_sleeping_when_already_done(clock):
+    client, polls = llamaparse_client(["SUCCESS"])
+
+    poll(client)
+
+    assert len(polls) == 1
+    assert clock.sleeps == []
+
+
+def test_poll_gives_up_at_the_overall_deadline(clock):
+    client, polls = llamaparse_client(["PENDING"])
+
+    with pytest.raises(TimeoutError):
+        poll(client)
+
+    assert clock.now == pytest.approx(POLL_SETTINGS.PARSER_POLL_TIMEOUT_SECONDS)
+    # The last sleep is cut short to end exactly at the deadline
+    assert clock.sleeps == [0.25, 0.5, 1.0, 2.0, 2.0, 2.0, 2.0, 0.25]
+
+
+def test_poll_raises_on_failed_job(clock):
+    client, _ = llamaparse_client(["PENDING", "FAILED"])
+
+    with pytest.raises(ValueError):
+        poll(client)
+
+
+def test_load_many_caps_concurrent_uploads(monkeypatch):
+    monkeypatch.setattr(parser, "get_settings", lambda: POLL_SETTINGS)
+    in_flight, peak = 0, 0
+
+    async def load_data(file):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"parsed_content": file}
+
+    monkeypatch.setattr(Parser, "load_data", staticmethod(load_data))
+
+    results = asyncio.run(Parser.load_many(["a", "b", "c", "d", "e"]))
+
+    assert [result["parsed_content"] for result in results] == ["a", "b", "c", "d", "e"]
+    assert peak == POLL_SETTINGS.PARSER_UPLOAD_CONCURRENCY
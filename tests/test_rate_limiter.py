@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from app.core.common import rate_limiter
+from app.core.common.rate_limiter import RateLimiter
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff sleeps instead of waiting them out, jitter at its upper bound."""
+    recorded = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds):
+        recorded.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", sleep)
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: high)
+    return recorded
+
+
+def limiter(**kwargs):
+    options = dict(requests_per_minute=600, tokens_per_minute=100000, max_concurrency=8)
+    options.update(kwargs)
+    return RateLimiter("test", **options)
+
+
+def test_429_is_retried_with_growing_backoff_and_halves_concurrency(sleeps):
+    guard = limiter()
+    outcomes = [ResourceExhausted("429 quota"), ResourceExhausted("429 quota"), "answer"]
+
+    async def call():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert asyncio.run(guard.call(call)) == "answer"
+    assert sleeps == [1.0, 2.0]
+    metrics = guard.metrics()
+    assert (metrics["throttled"], metrics["completed"], metrics["in_flight"]) == (2, 1, 0)
+    # 4 halved twice to 1, then one additive step
+    assert metrics["concurrency_limit"] == 2.0
+
+
+def test_other_errors_are_not_retried(sleeps):
+    guard = limiter()
+
+    async def call():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(guard.call(call))
+    assert sleeps == []
+    assert guard.metrics()["failed"] == 1
+
+
+def test_concurrency_recovers_additively_after_a_429():
+    guard = limiter(max_concurrency=8)
+    guard.in_flight = 1
+    guard.release("throttled")
+    assert guard.concurrency_limit == 2.0
+
+    limits = []
+    while guard.concurrency_limit < guard.max_concurrency:
+        guard.in_flight = 1
+        guard.release("success")
+        limits.append(guard.concurrency_limit)
+
+    assert limits == sorted(limits)
+    assert guard.concurrency_limit == 8
+    # Growth slows as the limit rises: roughly limit**2 / 2 successes to climb back
+    assert 25 <= len(limits) <= 35
+
+
+def test_request_bucket_refills_over_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    guard = limiter(requests_per_minute=2)
+
+    assert guard._try_acquire(1) and guard._try_acquire(1)
+    assert not guard._try_acquire(1)
+    now[0] += 30.0
+    assert guard._try_acquire(1)
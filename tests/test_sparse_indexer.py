@@ -0,0 +1,33 @@
+import pytest
+
+sparse_indexer = pytest.importorskip("app.core.builder.indexer.sparse_indexer")
+
+
+@pytest.fixture
+def indexer(tmp_path, monkeypatch):
+    monkeypatch.setattr(sparse_indexer, "indexing_directory", str(tmp_path))
+    monkeypatch.setattr(sparse_indexer, "_loaded_indexes", {})
+    backfills = []
+
+    def backfill(index_name):
+        backfills.append(index_name)
+        return sparse_indexer.BM25Index.empty().updated([("stored", "a section kept in the vector docstore")])
+
+    monkeypatch.setattr(sparse_indexer.SparseIndexer, "_backfill", staticmethod(backfill))
+    indexer = sparse_indexer.SparseIndexer()
+    indexer.backfills = backfills
+    return indexer
+
+
+def test_readding_after_removing_everything_does_not_backfill(indexer):
+    indexer.index("user", "first section about apples", ["first"])
+    assert indexer.backfills == ["user"]
+
+    indexer.index("user", removed_doc_ids=["stored", "first"])
+    assert len(indexer.get_index_from_storage("user")) == 0
+
+    index = indexer.index("user", "second section about pears", ["second"])
+
+    assert indexer.backfills == ["user"]
+    assert index.doc_ids == ["second"]
+    assert [doc_id for doc_id, _, _ in index.search("pears apples docstore")] == ["second"]
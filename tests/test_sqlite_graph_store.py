@@ -0,0 +1,31 @@
+from llama_index.core.graph_stores.types import ChunkNode, EntityNode, Relation
+
+from app.storage.sqlite_graph_store import SQLitePropertyGraphStore, TRIPLET_SOURCE_KEY
+
+
+def extracted(source, label, target, chunk):
+    return Relation(source_id=source, label=label, target_id=target, properties={TRIPLET_SOURCE_KEY: chunk.id})
+
+
+def test_delete_by_ref_doc_id_removes_its_chunks_relations_and_orphan_entities(tmp_path):
+    store = SQLitePropertyGraphStore(str(tmp_path / "graph.sqlite"))
+    first = ChunkNode(text="Alice knows Bob", id_="chunk-1", properties={"ref_doc_id": "doc-1"})
+    second = ChunkNode(text="Bob knows Carol", id_="chunk-2", properties={"ref_doc_id": "doc-2"})
+    alice, bob, carol = (
+        EntityNode(name=name, label="PERSON", properties={TRIPLET_SOURCE_KEY: chunk.id})
+        for name, chunk in (("Alice", first), ("Bob", first), ("Carol", second))
+    )
+    store.upsert_nodes([first, second, alice, bob, carol])
+    store.upsert_relations([
+        extracted("Alice", "KNOWS", "Bob", first),
+        extracted("Bob", "KNOWS", "Carol", second),
+    ])
+
+    store.delete(properties={"ref_doc_id": "doc-1"})
+
+    assert {node.id for node in store.get()} == {"chunk-2", "Bob", "Carol"}
+    assert [(s.id, r.label, t.id) for s, r, t in store.get_triplets(entity_names=["Bob"])] == [
+        ("Bob", "KNOWS", "Carol")
+    ]
+    assert store.stats()["relations"] == 1
+    store.close()
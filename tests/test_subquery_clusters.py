@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+
+from app.core.reasoner.subquery_clusters import cluster_by_similarity, collapse_subqueries, merge_graph_queries
+
+
+class SubQuery(BaseModel):
+    sub_query: str
+    graph_query: str
+
+
+def test_clusters_join_the_first_similar_representative_in_input_order():
+    vectors = [[1.0, 0.0], [0.0, 1.0], [0.99, 0.05], [0.0, 0.0], [0.05, 0.99]]
+
+    assert cluster_by_similarity(vectors, threshold=0.95) == [[0, 2], [1, 4], [3]]
+    assert cluster_by_similarity(vectors, threshold=1.01) == [[0], [1], [2], [3], [4]]
+    assert cluster_by_similarity([], threshold=0.95) == []
+
+
+def test_graph_keywords_are_merged_case_insensitively():
+    assert merge_graph_queries(["Inflation, interest rates", "interest Rates,  , GDP"]) == "Inflation, interest rates, GDP"
+
+
+def test_near_paraphrases_collapse_into_their_first_subquery():
+    subqueries = [
+        SubQuery(sub_query="What drives inflation?", graph_query="inflation"),
+        SubQuery(sub_query="Who sets interest rates?", graph_query="interest rates"),
+        SubQuery(sub_query="What causes inflation?", graph_query="inflation, prices"),
+    ]
+    vectors = [[1.0, 0.0], [0.0, 1.0], [0.98, 0.1]]
+
+    collapsed = collapse_subqueries(subqueries, vectors, threshold=0.95)
+
+    assert [(subquery.sub_query, subquery.graph_query, vector, merged) for subquery, vector, merged in collapsed] == [
+        ("What drives inflation?", "inflation, prices", [1.0, 0.0], ["What causes inflation?"]),
+        ("Who sets interest rates?", "interest rates", [0.0, 1.0], []),
+    ]
+    # The input subqueries are left untouched
+    assert subqueries[0].graph_query == "inflation"